@@ -0,0 +1,331 @@
+"""
+Неинтерактивная разметка примеров: python -m annotate
+Конвейер ingest -> prepare -> classify -> write с параллельностью, ограничением частоты
+и продолжением прерванного прогона. Подходит для cron и CI: без input(), код возврата
+ненулевой, если остались неразмеченные примеры.
+
+Пример:
+    python -m annotate --provider deepseek --input ../31.xlsx --concurrency 8 --rate 5 --resume
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+import pandas as pd
+
+from cassette import Cassette, CassetteMissError
+from profiling import add_profile_arguments, profiler_from_args, stage
+from ratelimit import RateLimiter
+from results_store import ResultsStore
+from scheduling import run_scheduled
+from universal_classifier import UniversalMathErrorClassifier, calculate_metrics
+
+SHEET_NAME = 'Рабочий лист 1'
+
+
+def load_data(path, sheet_name=SHEET_NAME):
+    """Загружает данные из Excel, CSV или JSONL"""
+    print(f"Загрузка данных из {path}...")
+
+    if path.endswith('.csv'):
+        df = pd.read_csv(path)
+    elif path.endswith('.jsonl'):
+        df = pd.read_json(path, lines=True)
+    else:
+        df = pd.read_excel(path, sheet_name=sheet_name)
+
+    print(f"Загружено строк: {len(df)}")
+    return df
+
+
+def prepare_examples(df):
+    """Подготавливает примеры для классификации"""
+    examples = []
+
+    for idx, row in df.iterrows():
+        # Пропускаем пустые строки
+        if pd.isna(row.get('problem_statement')) or pd.isna(row.get('R1_REPLICA_OUT')):
+            continue
+
+        example = {
+            'id': int(row.get('id', idx + 1)) if not pd.isna(row.get('id')) else idx + 1,
+            'task_text': str(row.get('problem_statement', '')),
+            'dialogue_history': str(row.get('full_dialog_student', '')),
+            'ai_response': str(row.get('R1_REPLICA_OUT', '')),
+            'ground_truth': row.get('Ground truth') if 'Ground truth' in row and not pd.isna(row.get('Ground truth')) else None
+        }
+
+        examples.append(example)
+
+    print(f"[OK] Подготовлено примеров: {len(examples)}")
+    return examples
+
+
+def load_checkpoint(path: str) -> Dict[int, Dict]:
+    """Успешно размеченные примеры прерванного прогона (неудачные будут повторены)"""
+    done = {}
+    if not os.path.exists(path):
+        return done
+
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Оборванная последняя строка после аварийного завершения
+                continue
+            if entry['assessment'] != -1:
+                done[entry['id']] = entry
+    return done
+
+
+def classify_examples(examples: List[Dict], classifier: UniversalMathErrorClassifier, concurrency: int = 1,
+                      rate_limit: float = None, checkpoint_path: str = None, resume: bool = False,
+                      explain_positives: bool = False) -> List[Dict]:
+    """
+    Размечает примеры пулом потоков; каждый результат сразу дописывается в checkpoint
+
+    Args:
+        examples: Подготовленные примеры
+        classifier: Классификатор
+        concurrency: Число одновременных запросов
+        rate_limit: Запросов в секунду (None — без ограничения)
+        checkpoint_path: JSONL с результатами по мере готовности
+        resume: Пропустить примеры, уже успешно размеченные в checkpoint
+        explain_positives: В компактном режиме запросить обоснование для найденных ошибок
+
+    Returns:
+        Результаты в порядке examples
+    """
+    done = load_checkpoint(checkpoint_path) if resume and checkpoint_path else {}
+    pending = [e for e in examples if e['id'] not in done]
+    if done:
+        print(f"[OK] Продолжение прогона: готово {len(examples) - len(pending)}, осталось {len(pending)}")
+
+    limiter = RateLimiter(rate_limit)
+
+    def classify_example(example):
+        limiter.acquire()
+        result = classifier.classify(
+            task_text=example['task_text'],
+            dialogue_history=example['dialogue_history'],
+            ai_response=example['ai_response']
+        )
+        if explain_positives and classifier.output_mode == 'compact' and result['assessment'] == 1:
+            result = classifier.explain(result, example['task_text'], example['dialogue_history'],
+                                        example['ai_response'])
+        return {
+            'id': example['id'],
+            'assessment': result['assessment'],
+            'reasoning': result['reasoning'],
+            'error_type': result.get('error_type'),
+            'ground_truth': int(example['ground_truth']) if example.get('ground_truth') is not None else None
+        }
+
+    checkpoint = open(checkpoint_path, 'a' if resume else 'w', encoding='utf-8') if checkpoint_path else None
+    if checkpoint and checkpoint.tell() > 0:
+        # После аварийного завершения последняя строка могла оборваться без перевода строки
+        with open(checkpoint_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                checkpoint.write('\n')
+    finished = []
+    started = time.perf_counter()
+
+    def report(i, example, entry):
+        finished.append(i)
+        if checkpoint:
+            checkpoint.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            checkpoint.flush()
+        status = '[X]' if entry['assessment'] == -1 else '[OK]'
+        rate = len(finished) / (time.perf_counter() - started)
+        print(f"[{len(finished)}/{len(pending)}] {status} ID {example['id']}: {entry['assessment']} ({rate:.2f} прим./с)")
+
+    try:
+        fresh = run_scheduled(pending, classify_example, concurrency=concurrency, on_done=report)
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    done.update((entry['id'], entry) for entry in fresh)
+    return [done[e['id']] for e in examples]
+
+
+def evaluate(results: List[Dict]):
+    """Метрики по примерам с ground truth (None, если таких нет)"""
+    labeled_results = [r for r in results if r['ground_truth'] is not None]
+    if not labeled_results:
+        print("\n Нет примеров с ground truth для расчета метрик")
+        return None
+
+    predictions = [r['assessment'] for r in labeled_results]
+    ground_truth = [int(r['ground_truth']) for r in labeled_results]
+    metrics = calculate_metrics(predictions, ground_truth)
+
+    print("\n" + "=" * 80)
+    print(" МЕТРИКИ КАЧЕСТВА")
+    print("=" * 80)
+    print(f"Accuracy:  {metrics['accuracy']:.2%}")
+    print(f"Precision: {metrics['precision']:.2%}")
+    print(f"Recall:    {metrics['recall']:.2%}")
+    print(f"F1-Score:  {metrics['f1_score']:.2%}")
+    print("\nConfusion Matrix:")
+    print(f"  TP: {metrics['confusion_matrix']['true_positive']}")
+    print(f"  TN: {metrics['confusion_matrix']['true_negative']}")
+    print(f"  FP: {metrics['confusion_matrix']['false_positive']}")
+    print(f"  FN: {metrics['confusion_matrix']['false_negative']}")
+    return metrics
+
+
+def save_results(results, metrics, output_dir, provider, model=None, prompt_version=None):
+    """Сохраняет результаты: JSON и таблица последнего прогона, история прогонов в results.db"""
+
+    # JSON результаты
+    output_file = os.path.join(output_dir, f'results_{provider}.json')
+    output_data = {
+        'provider': provider,
+        'model': model,
+        'prompt_hash': prompt_version,
+        'total_examples': len(results),
+        'metrics': metrics,
+        'results': results
+    }
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(output_data, f, ensure_ascii=False, indent=2)
+
+    print(f"\n Результаты сохранены в {output_file}")
+
+    # Таблица Markdown
+    table_file = os.path.join(output_dir, f'results_table_{provider}.md')
+    with open(table_file, 'w', encoding='utf-8') as f:
+        f.write(f"# Результаты разметки (провайдер: {provider.upper()})\n\n")
+
+        if metrics:
+            f.write("## Метрики качества\n\n")
+            f.write(f"- **Accuracy**: {metrics['accuracy']:.2%}\n")
+            f.write(f"- **Precision**: {metrics['precision']:.2%}\n")
+            f.write(f"- **Recall**: {metrics['recall']:.2%}\n")
+            f.write(f"- **F1-Score**: {metrics['f1_score']:.2%}\n\n")
+            f.write("### Confusion Matrix\n\n")
+            f.write(f"- True Positive: {metrics['confusion_matrix']['true_positive']}\n")
+            f.write(f"- True Negative: {metrics['confusion_matrix']['true_negative']}\n")
+            f.write(f"- False Positive: {metrics['confusion_matrix']['false_positive']}\n")
+            f.write(f"- False Negative: {metrics['confusion_matrix']['false_negative']}\n\n")
+
+        f.write("## Результаты разметки\n\n")
+        f.write("| ID | Оценка | Краткое пояснение | Тип ошибки |\n")
+        f.write("|----|--------|-------------------|------------|\n")
+
+        for r in results:
+            error_type = r['error_type'] if r['error_type'] else '-'
+            reasoning = r['reasoning'].replace('|', '\\|')[:150]
+            f.write(f"| {r['id']} | {r['assessment']} | {reasoning} | {error_type} |\n")
+
+    print(f" Таблица сохранена в {table_file}")
+
+    store = ResultsStore(os.path.join(output_dir, 'results.db'))
+    run_id = store.add_run(results, provider, model, prompt_version)
+    store.close()
+    print(f" Прогон {run_id} добавлен в results.db")
+
+
+def run(args) -> int:
+    """Конвейер разметки; возвращает код выхода"""
+    with stage("load"):
+        df = load_data(args.input)
+    with stage("prepare"):
+        examples = prepare_examples(df)
+    if args.limit:
+        examples = examples[:args.limit]
+
+    if not examples:
+        print("[ERROR] Не найдено примеров для разметки")
+        return 1
+
+    if args.dry_run:
+        from cost_planner import plan_run, print_plan
+        print_plan(plan_run(examples, args.provider, args.model, args.output_mode, args.concurrency,
+                            args.rate, budget_usd=args.budget))
+        return 0
+
+    cassette = None
+    if args.record:
+        cassette = Cassette(args.record, mode='record')
+    elif args.replay:
+        cassette = Cassette(args.replay, mode='replay')
+
+    classifier = UniversalMathErrorClassifier(
+        provider=args.provider,
+        model=args.model,
+        base_url=args.base_url,
+        output_mode=args.output_mode,
+        cassette=cassette
+    )
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    checkpoint_path = os.path.join(args.output_dir, f'results_{args.provider}.partial.jsonl')
+    try:
+        results = classify_examples(
+            examples, classifier,
+            concurrency=args.concurrency,
+            rate_limit=args.rate,
+            checkpoint_path=checkpoint_path,
+            resume=args.resume,
+            explain_positives=args.explain_positives
+        )
+    except CassetteMissError as e:
+        print(f"\n[X] {e.args[0]}. Промпт или параметры изменились после записи: перезапишите кассету (--record)")
+        return 1
+
+    with stage("metrics"):
+        metrics = evaluate(results)
+    with stage("save"):
+        save_results(results, metrics, args.output_dir, args.provider, classifier.model,
+                     classifier.prompt_version())
+
+    failed = sum(r['assessment'] == -1 for r in results)
+    if failed:
+        print(f"\n[X] Не размечено примеров: {failed}. Повторите с --resume")
+        return 1
+
+    os.remove(checkpoint_path)
+    print("\n[DONE] Все примеры размечены")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Неинтерактивная разметка примеров (cron, CI)")
+    parser.add_argument('--provider', default='deepseek', choices=['deepseek', 'claude', 'openai', 'custom', 'local'])
+    parser.add_argument('--model', default=None)
+    parser.add_argument('--base-url', default=None, help="Например, https://api.artemox.com/v1 для прокси Deepseek")
+    parser.add_argument('--input', default='../31.xlsx', help="Excel, CSV или JSONL с примерами")
+    parser.add_argument('--output-dir', default=os.path.dirname(os.path.abspath(__file__)))
+    parser.add_argument('--output-mode', default='full', choices=['full', 'compact', 'logprob'])
+    parser.add_argument('--explain-positives', action='store_true',
+                        help="В компактном режиме запросить обоснование для найденных ошибок")
+    parser.add_argument('--concurrency', type=int, default=1, help="Одновременных запросов к API")
+    parser.add_argument('--rate', type=float, default=None, help="Ограничение, запросов в секунду")
+    parser.add_argument('--limit', type=int, default=None, help="Разметить только первые N примеров")
+    parser.add_argument('--resume', action='store_true', help="Продолжить прерванный прогон из checkpoint")
+    parser.add_argument('--dry-run', action='store_true', help="Только прогноз времени и стоимости, без вызовов API")
+    parser.add_argument('--budget', type=float, default=None, help="Бюджет прогона в USD для dry-run")
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument('--record', metavar='CASSETTE', help="Записать ответы API в кассету (.jsonl.gz)")
+    cassette_group.add_argument('--replay', metavar='CASSETTE', help="Воспроизвести ответы из кассеты, без сети")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        parser.error(f"файл {args.input} не найден")
+
+    with profiler_from_args(args):
+        return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,46 +3,14 @@
 Читает данные из Excel, запускает классификатор и сохраняет результаты
 """
 
-import pandas as pd
+import argparse
 import sys
 import os
 from classifier import MathErrorClassifier, calculate_metrics
+from annotate import load_data, prepare_examples
+from profiling import add_profile_arguments, profiler_from_args, stage
 import json
 
-def load_data(excel_path):
-    """Загружает данные из Excel файла"""
-    print(f"Загрузка данных из {excel_path}...")
-
-    # Читаем лист "Рабочий лист 1"
-    df = pd.read_excel(excel_path, sheet_name='Рабочий лист 1')
-
-    print(f"Загружено строк: {len(df)}")
-    print(f"Столбцы: {df.columns.tolist()}")
-
-    return df
-
-def prepare_examples(df):
-    """Подготавливает примеры для классификации"""
-    examples = []
-
-    for idx, row in df.iterrows():
-        # Пропускаем пустые строки
-        if pd.isna(row.get('problem_statement')) or pd.isna(row.get('R1_REPLICA_OUT')):
-            continue
-
-        example = {
-            'id': int(row.get('id', idx + 1)) if not pd.isna(row.get('id')) else idx + 1,
-            'task_text': str(row.get('problem_statement', '')),
-            'dialogue_history': str(row.get('full_dialog_student', '')),
-            'ai_response': str(row.get('R1_REPLICA_OUT', '')),
-            'ground_truth': row.get('Ground truth') if 'Ground truth' in row and not pd.isna(row.get('Ground truth')) else None
-        }
-
-        examples.append(example)
-
-    print(f"Подготовлено примеров для классификации: {len(examples)}")
-    return examples
-
 def annotate_examples(examples, classifier):
     """Размечает примеры с помощью классификатора"""
     print("\nНачинаем разметку примеров...")
@@ -93,7 +61,8 @@ def calculate_and_save_metrics(results, output_dir):
         predictions = [r['assessment'] for r in labeled_results]
         ground_truth = [int(r['ground_truth']) for r in labeled_results]
 
-        metrics = calculate_metrics(predictions, ground_truth)
+        with stage("metrics"):
+            metrics = calculate_metrics(predictions, ground_truth)
 
         print("\n" + "=" * 80)
         print("МЕТРИКИ КАЧЕСТВА")
@@ -120,14 +89,14 @@ def calculate_and_save_metrics(results, output_dir):
         'results': results
     }
 
-    with open(output_file, 'w', encoding='utf-8') as f:
+    with stage("save"), open(output_file, 'w', encoding='utf-8') as f:
         json.dump(output_data, f, ensure_ascii=False, indent=2)
 
     print(f"\nРезультаты сохранены в {output_file}")
 
     # Сохраняем таблицу для сдачи
     table_file = os.path.join(output_dir, 'results_table.md')
-    with open(table_file, 'w', encoding='utf-8') as f:
+    with stage("save"), open(table_file, 'w', encoding='utf-8') as f:
         f.write("# Результаты разметки примеров 1-45\n\n")
         f.write("| ID | Оценка | Краткое пояснение | Тип ошибки |\n")
         f.write("|----|--------|-------------------|------------|\n")
@@ -141,6 +110,19 @@ def calculate_and_save_metrics(results, output_dir):
     return metrics
 
 def main():
+    parser = argparse.ArgumentParser(description="Разметка примеров через Claude")
+    parser.add_argument('--dry-run', action='store_true', help="Только прогноз времени и стоимости, без вызовов API")
+    parser.add_argument('--budget', type=float, default=None, help="Бюджет прогона в USD для dry-run")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    with profiler_from_args(args):
+        run(args)
+
+
+def run(args):
+    """Прогон разметки по аргументам командной строки"""
+
     # Путь к Excel файлу
     excel_path = '../31.xlsx'
 
@@ -149,15 +131,22 @@ def main():
         return
 
     # Загрузка данных
-    df = load_data(excel_path)
+    with stage("load"):
+        df = load_data(excel_path)
 
     # Подготовка примеров
-    examples = prepare_examples(df)
+    with stage("prepare"):
+        examples = prepare_examples(df)
 
     if len(examples) == 0:
         print("Ошибка: не найдено примеров для разметки")
         return
 
+    if args.dry_run:
+        from cost_planner import plan_run, print_plan
+        print_plan(plan_run(examples, 'claude', budget_usd=args.budget))
+        return
+
     # Инициализация классификатора
     print("\nИнициализация классификатора Claude Sonnet 4.5...")
     classifier = MathErrorClassifier()
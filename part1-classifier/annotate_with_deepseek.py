@@ -3,42 +3,12 @@
 Работает с любой LLM: Claude, Deepseek, OpenAI
 """
 
-import pandas as pd
+import argparse
 import sys
 import os
 from universal_classifier import UniversalMathErrorClassifier, calculate_metrics
-import json
-
-def load_data(excel_path):
-    """Загружает данные из Excel файла"""
-    print(f"Загрузка данных из {excel_path}...")
-
-    df = pd.read_excel(excel_path, sheet_name='Рабочий лист 1')
-
-    print(f"Загружено строк: {len(df)}")
-    return df
-
-def prepare_examples(df):
-    """Подготавливает примеры для классификации"""
-    examples = []
-
-    for idx, row in df.iterrows():
-        # Пропускаем пустые строки
-        if pd.isna(row.get('problem_statement')) or pd.isna(row.get('R1_REPLICA_OUT')):
-            continue
-
-        example = {
-            'id': int(row.get('id', idx + 1)) if not pd.isna(row.get('id')) else idx + 1,
-            'task_text': str(row.get('problem_statement', '')),
-            'dialogue_history': str(row.get('full_dialog_student', '')),
-            'ai_response': str(row.get('R1_REPLICA_OUT', '')),
-            'ground_truth': row.get('Ground truth') if 'Ground truth' in row and not pd.isna(row.get('Ground truth')) else None
-        }
-
-        examples.append(example)
-
-    print(f"[OK] Подготовлено примеров: {len(examples)}")
-    return examples
+from annotate import load_data, prepare_examples, save_results
+from profiling import add_profile_arguments, profiler_from_args, stage
 
 def annotate_examples(examples, classifier):
     """Размечает примеры с помощью классификатора"""
@@ -81,52 +51,21 @@ def annotate_examples(examples, classifier):
 
     return results
 
-def save_results(results, metrics, output_dir, provider):
-    """Сохраняет результаты"""
-
-    # JSON результаты
-    output_file = os.path.join(output_dir, f'results_{provider}.json')
-    output_data = {
-        'provider': provider,
-        'total_examples': len(results),
-        'metrics': metrics,
-        'results': results
-    }
-
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
-
-    print(f"\n Результаты сохранены в {output_file}")
-
-    # Таблица Markdown
-    table_file = os.path.join(output_dir, f'results_table_{provider}.md')
-    with open(table_file, 'w', encoding='utf-8') as f:
-        f.write(f"# Результаты разметки (провайдер: {provider.upper()})\n\n")
-
-        if metrics:
-            f.write("## Метрики качества\n\n")
-            f.write(f"- **Accuracy**: {metrics['accuracy']:.2%}\n")
-            f.write(f"- **Precision**: {metrics['precision']:.2%}\n")
-            f.write(f"- **Recall**: {metrics['recall']:.2%}\n")
-            f.write(f"- **F1-Score**: {metrics['f1_score']:.2%}\n\n")
-            f.write("### Confusion Matrix\n\n")
-            f.write(f"- True Positive: {metrics['confusion_matrix']['true_positive']}\n")
-            f.write(f"- True Negative: {metrics['confusion_matrix']['true_negative']}\n")
-            f.write(f"- False Positive: {metrics['confusion_matrix']['false_positive']}\n")
-            f.write(f"- False Negative: {metrics['confusion_matrix']['false_negative']}\n\n")
+def main():
+    parser = argparse.ArgumentParser(description="Разметка примеров через Claude, Deepseek или OpenAI")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Прогноз времени и стоимости для всех провайдеров, без вызовов API")
+    parser.add_argument('--budget', type=float, default=None, help="Бюджет прогона в USD для dry-run")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
 
-        f.write("## Результаты разметки\n\n")
-        f.write("| ID | Оценка | Краткое пояснение | Тип ошибки |\n")
-        f.write("|----|--------|-------------------|------------|\n")
+    with profiler_from_args(args):
+        run(args)
 
-        for r in results:
-            error_type = r['error_type'] if r['error_type'] else '-'
-            reasoning = r['reasoning'].replace('|', '\\|')[:150]
-            f.write(f"| {r['id']} | {r['assessment']} | {reasoning} | {error_type} |\n")
 
-    print(f" Таблица сохранена в {table_file}")
+def run(args):
+    """Прогон разметки по аргументам командной строки"""
 
-def main():
     print("\n" + "=" * 80)
     print(" УНИВЕРСАЛЬНЫЙ КЛАССИФИКАТОР МАТЕМАТИЧЕСКИХ ОШИБОК")
     print("=" * 80)
@@ -138,19 +77,28 @@ def main():
         print(f"[ERROR] Ошибка: файл {excel_path} не найден")
         return
 
+    if args.dry_run:
+        from cost_planner import plan_run, print_plan
+        examples = prepare_examples(load_data(excel_path))
+        for provider in ('deepseek', 'claude', 'openai'):
+            print_plan(plan_run(examples, provider, budget_usd=args.budget))
+        return
+
     # Выбор провайдера
     print("\n Доступные провайдеры:")
     print("1. Deepseek (deepseek-chat) - дешевый и быстрый ")
     print("2. Claude (claude-sonnet-4-5) - лучшая математика")
     print("3. OpenAI (gpt-4o)")
+    print("4. Локальный OpenAI-compatible сервер (llama.cpp, vLLM) - бесплатно, офлайн")
 
-    provider_choice = input("\nВыберите провайдер (1-3) или нажмите Enter для Deepseek: ").strip()
+    provider_choice = input("\nВыберите провайдер (1-4) или нажмите Enter для Deepseek: ").strip()
 
     # Конфигурация провайдеров: (provider, api_key, base_url)
     provider_map = {
         '1': ('deepseek', os.environ.get('DEEPSEEK_API_KEY'), 'https://api.artemox.com/v1'),
         '2': ('claude', os.environ.get('ANTHROPIC_API_KEY'), None),
         '3': ('openai', os.environ.get('OPENAI_API_KEY'), None),
+        '4': ('custom', os.environ.get('CUSTOM_API_KEY', 'not-needed'), os.environ.get('CUSTOM_BASE_URL')),
         '': ('deepseek', os.environ.get('DEEPSEEK_API_KEY'), 'https://api.artemox.com/v1')  # по умолчанию
     }
 
@@ -165,8 +113,10 @@ def main():
         return
 
     # Загрузка данных
-    df = load_data(excel_path)
-    examples = prepare_examples(df)
+    with stage("load"):
+        df = load_data(excel_path)
+    with stage("prepare"):
+        examples = prepare_examples(df)
 
     if len(examples) == 0:
         print("[ERROR] Не найдено примеров для разметки")
@@ -188,7 +138,8 @@ def main():
         predictions = [r['assessment'] for r in labeled_results]
         ground_truth = [int(r['ground_truth']) for r in labeled_results]
 
-        metrics = calculate_metrics(predictions, ground_truth)
+        with stage("metrics"):
+            metrics = calculate_metrics(predictions, ground_truth)
 
         print("\n" + "=" * 80)
         print(" МЕТРИКИ КАЧЕСТВА")
@@ -208,7 +159,8 @@ def main():
 
     # Сохранение
     output_dir = os.path.dirname(os.path.abspath(__file__))
-    save_results(results, metrics, output_dir, provider)
+    with stage("save"):
+        save_results(results, metrics, output_dir, provider, classifier.model, classifier.prompt_version())
 
     print("\n" + "=" * 80)
     print("[DONE] ГОТОВО! Все результаты сохранены.")
@@ -0,0 +1,48 @@
+"""
+Бенчмарк пропускной способности локального OpenAI-compatible сервера (provider="custom")
+Прогоняет примеры при разной параллельности и печатает примеров/с, латентность и токены/с
+
+Пример запуска llama.cpp:
+    llama-server -m model.gguf --port 8080 --parallel 4 --ctx-size 32768
+"""
+
+import argparse
+import time
+
+from annotate import load_data, prepare_examples
+from universal_classifier import UniversalMathErrorClassifier
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пропускная способность локального сервера")
+    parser.add_argument("--base-url", default=None, help="По умолчанию CUSTOM_BASE_URL или http://localhost:8080/v1")
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--output-mode", default="compact", choices=["full", "compact", "logprob"])
+    parser.add_argument("--excel", default="../31.xlsx")
+    parser.add_argument("--limit", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    examples = prepare_examples(load_data(args.excel))[:args.limit]
+
+    print("\n" + "=" * 80)
+    print(f"{'Параллельность':>15}{'Примеров/с':>12}{'Латентность, с':>16}{'Вых. токенов/с':>16}{'Сбои':>6}")
+    for concurrency in args.concurrency:
+        # Новый экземпляр на каждый замер: без общего singleflight и счетчиков
+        classifier = UniversalMathErrorClassifier(
+            provider="custom", base_url=args.base_url, model=args.model, output_mode=args.output_mode
+        )
+        started = time.perf_counter()
+        results = classifier.classify_batch(examples, verbose=False, concurrency=concurrency)
+        wall = time.perf_counter() - started
+
+        usage = classifier.telemetry()["usage"]
+        failed = sum(r["assessment"] == -1 for r in results)
+        latency = usage["latency_s"] / usage["calls"] if usage["calls"] else 0.0
+        print(f"{concurrency:>15}{len(examples) / wall:>12.3f}{latency:>16.2f}"
+              f"{usage['output_tokens'] / wall:>16.1f}{failed:>6}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
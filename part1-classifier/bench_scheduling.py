@@ -0,0 +1,79 @@
+"""
+Бенчмарк порядка отправки: FIFO против longest-first на скошенных данных
+Запрос к API имитируется задержкой, пропорциональной оценке размера промпта,
+поэтому бенчмарк не требует ключей и сети. Данные берутся в двух порядках:
+перемешанные (как обычная выгрузка) и по возрастанию размера (худший случай для FIFO)
+"""
+
+import argparse
+import random
+import time
+
+from scheduling import estimate_example_size, run_scheduled
+
+
+ORDERS = ("shuffled", "sorted")
+
+
+def make_skewed_examples(count: int, seed: int = 0, order: str = "shuffled"):
+    """
+    Примеры с длинным хвостом: большинство диалогов короткие, несколько очень длинных
+
+    Args:
+        order: shuffled — случайный порядок; sorted — по возрастанию размера,
+               длинные диалоги в конце выгрузки (худший случай для FIFO)
+    """
+    rng = random.Random(seed)
+    examples = []
+    for i in range(count):
+        length = int(rng.paretovariate(1.2) * 400)
+        examples.append({
+            "id": i + 1,
+            "task_text": "Задача",
+            "dialogue_history": "Ученик: " + "д" * min(length, 40000),
+            "ai_response": "Ответ",
+        })
+    if order == "sorted":
+        examples.sort(key=estimate_example_size)
+    else:
+        rng.shuffle(examples)
+    return examples
+
+
+def fake_classify(seconds_per_1k_tokens: float):
+    """Имитация вызова API: фиксированная задержка + время на размер промпта"""
+    def classify(example):
+        time.sleep(0.01 + estimate_example_size(example) / 1000 * seconds_per_1k_tokens)
+        return {"id": example["id"], "assessment": 0}
+    return classify
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк планирования пакетной классификации")
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seconds-per-1k", type=float, default=0.02, help="Имитируемая задержка на 1k токенов")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    classify = fake_classify(args.seconds_per_1k)
+    for order in ORDERS:
+        examples = make_skewed_examples(args.count, args.seed, order)
+        sizes = sorted(estimate_example_size(e) for e in examples)
+        print(f"\nПорядок {order}: примеров {len(examples)}, медиана {sizes[len(sizes) // 2]} токенов, "
+              f"максимум {sizes[-1]}")
+
+        timings = {}
+        for strategy in ("fifo", "longest_first"):
+            started = time.perf_counter()
+            results = run_scheduled(examples, classify, concurrency=args.concurrency, strategy=strategy)
+            timings[strategy] = time.perf_counter() - started
+            assert [r["id"] for r in results] == [e["id"] for e in examples]
+            print(f"  {strategy:<14} {timings[strategy]:.2f} с")
+
+        gain = 1 - timings["longest_first"] / timings["fifo"]
+        print(f"  Сокращение общего времени: {gain:.0%} (параллельность {args.concurrency})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Кассеты запросов к LLM: запись и воспроизведение
+В режиме record каждый ответ API сохраняется в сжатый JSONL (gzip), в режиме replay
+ответы отдаются из памяти без сети и ключей — прогоны детерминированы и бесплатны.
+"""
+
+import gzip
+import json
+import os
+import threading
+from typing import Dict
+
+
+class CassetteMissError(KeyError):
+    """В кассете нет записи для запроса (промпт или параметры изменились после записи)"""
+
+
+class Cassette:
+    """Файл кассеты: ключ запроса -> ответ модели и расход токенов"""
+
+    MODES = ("record", "replay")
+
+    def __init__(self, path: str, mode: str = "replay"):
+        """
+        Args:
+            path: Путь к файлу кассеты (.jsonl.gz)
+            mode: record — писать ответы API; replay — только читать
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Неизвестный режим кассеты: {mode}. Поддерживаются: record, replay")
+        if mode == "replay" and not os.path.exists(path):
+            raise FileNotFoundError(f"Кассета не найдена: {path}")
+
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.stats = {"hits": 0, "misses": 0, "recorded": 0}
+
+        if os.path.exists(path):
+            # Файл может состоять из нескольких gzip-блоков (дозапись), gzip читает их подряд
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self._entries[record["key"]] = record
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Dict:
+        """
+        Запись для запроса
+
+        Raises:
+            CassetteMissError: если запроса нет в кассете
+        """
+        record = self._entries.get(key)
+        with self._lock:
+            self.stats["hits" if record is not None else "misses"] += 1
+        if record is None:
+            raise CassetteMissError(f"Нет записи в кассете {self.path} для запроса {key[:12]}")
+        return record
+
+    def put(self, key: str, response: str, input_tokens: int = 0, output_tokens: int = 0):
+        """Сохраняет ответ и сразу дописывает его в файл"""
+        record = {"key": key, "response": response, "input_tokens": input_tokens, "output_tokens": output_tokens}
+        with self._lock:
+            self._entries[key] = record
+            self.stats["recorded"] += 1
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
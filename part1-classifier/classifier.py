@@ -8,6 +8,8 @@ import os
 from typing import Dict, List, Tuple
 from anthropic import Anthropic
 
+from profiling import stage
+
 # Промпт-шаблон для классификации
 CLASSIFICATION_PROMPT = """Ты — эксперт по проверке математической корректности ответов ИИ-репетитора.
 
@@ -78,32 +80,35 @@ class MathErrorClassifier:
         Returns:
             Dict с полями: assessment (0/1), reasoning, error_type
         """
-        prompt = CLASSIFICATION_PROMPT.format(
-            task_text=task_text,
-            dialogue_history=dialogue_history,
-            ai_response=ai_response
-        )
-
-        try:
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=1024,
-                messages=[{"role": "user", "content": prompt}]
+        with stage("prompt"):
+            prompt = CLASSIFICATION_PROMPT.format(
+                task_text=task_text,
+                dialogue_history=dialogue_history,
+                ai_response=ai_response
             )
 
-            response_text = message.content[0].text.strip()
-
-            # Попытка извлечь JSON из ответа
-            if "```json" in response_text:
-                json_start = response_text.find("```json") + 7
-                json_end = response_text.find("```", json_start)
-                response_text = response_text[json_start:json_end].strip()
-            elif "{" in response_text:
-                json_start = response_text.find("{")
-                json_end = response_text.rfind("}") + 1
-                response_text = response_text[json_start:json_end]
-
-            result = json.loads(response_text)
+        try:
+            with stage("api_wait"):
+                message = self.client.messages.create(
+                    model=self.model,
+                    max_tokens=1024,
+                    messages=[{"role": "user", "content": prompt}]
+                )
+
+            with stage("parse"):
+                response_text = message.content[0].text.strip()
+
+                # Попытка извлечь JSON из ответа
+                if "```json" in response_text:
+                    json_start = response_text.find("```json") + 7
+                    json_end = response_text.find("```", json_start)
+                    response_text = response_text[json_start:json_end].strip()
+                elif "{" in response_text:
+                    json_start = response_text.find("{")
+                    json_end = response_text.rfind("}") + 1
+                    response_text = response_text[json_start:json_end]
+
+                result = json.loads(response_text)
 
             # Валидация результата
             if "assessment" not in result:
@@ -0,0 +1,68 @@
+"""
+Сравнение режимов вывода: полный (оценка + обоснование) и компактный
+(только метка, обоснование лениво — только для найденных ошибок)
+Считает латентность, токены и стоимость на пример
+"""
+
+import argparse
+import time
+
+from annotate import load_data, prepare_examples
+from universal_classifier import UniversalMathErrorClassifier
+
+
+def run_mode(classifier, examples, explain_positives=False):
+    """Прогон примеров в одном режиме: результаты и расход"""
+    started = time.perf_counter()
+    results = classifier.classify_batch(examples, verbose=False, explain_positives=explain_positives)
+    wall = time.perf_counter() - started
+
+    usage = classifier.telemetry()["usage"]
+    n = len(examples)
+    return results, {
+        "wall_s_per_item": wall / n,
+        "api_calls": usage["calls"],
+        "input_tokens_per_item": usage["input_tokens"] / n,
+        "output_tokens_per_item": usage["output_tokens"] / n,
+        "cost_usd_per_item": usage["cost_usd"] / n,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение полного и компактного режимов вывода")
+    parser.add_argument("--provider", default="deepseek")
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--base-url", default=None)
+    parser.add_argument("--excel", default="../31.xlsx")
+    parser.add_argument("--limit", type=int, default=10, help="Сколько примеров прогнать")
+    args = parser.parse_args()
+
+    examples = prepare_examples(load_data(args.excel))[:args.limit]
+
+    report = {}
+    labels = {}
+    for mode in ("full", "compact"):
+        classifier = UniversalMathErrorClassifier(
+            provider=args.provider,
+            model=args.model,
+            base_url=args.base_url,
+            output_mode=mode
+        )
+        results, report[mode] = run_mode(classifier, examples, explain_positives=(mode == "compact"))
+        labels[mode] = [r["assessment"] for r in results]
+
+    agreement = sum(a == b for a, b in zip(labels["full"], labels["compact"])) / len(examples)
+
+    print("\n" + "=" * 80)
+    print(f" СРАВНЕНИЕ РЕЖИМОВ ({len(examples)} примеров)")
+    print("=" * 80)
+    print(f"{'Метрика':<28}{'full':>14}{'compact':>14}")
+    for key in ("wall_s_per_item", "api_calls", "input_tokens_per_item", "output_tokens_per_item",
+                "cost_usd_per_item"):
+        print(f"{key:<28}{report['full'][key]:>14.4f}{report['compact'][key]:>14.4f}")
+    print(f"\nСовпадение меток: {agreement:.0%}")
+    print("(compact включает explain для найденных ошибок)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Планировщик стоимости и времени разметки (dry-run)
+Рендерит все промпты, считает токены и по лимитам частоты и параллельности
+прогнозирует время, токены и стоимость для провайдера — без вызовов API
+"""
+
+import re
+from typing import Dict, List
+
+from universal_classifier import DEFAULT_MODELS, MAX_TOKENS, PROMPT_TEMPLATES, estimate_cost
+
+# Профили провайдеров для прогноза: окно контекста, задержка до первого токена,
+# скорость генерации и чтения промпта (токенов/с)
+PROVIDER_PROFILES = {
+    "claude": {"context_window": 200_000, "ttft_s": 1.5, "output_tps": 60, "prefill_tps": 8000},
+    "deepseek": {"context_window": 64_000, "ttft_s": 1.0, "output_tps": 30, "prefill_tps": 5000},
+    "openai": {"context_window": 128_000, "ttft_s": 0.6, "output_tps": 80, "prefill_tps": 10000},
+    # llama.cpp / vLLM-CPU на локальной машине: 7-8B модель, квантование Q4
+    "custom": {"context_window": 8_192, "ttft_s": 0.5, "output_tps": 10, "prefill_tps": 150},
+}
+
+# Ожидаемая длина ответа по режимам (обоснование в 2-3 предложения ~ 150 токенов)
+EXPECTED_OUTPUT_TOKENS = {
+    "full": 150,
+    "compact": 15,
+    "logprob": 1,
+}
+
+CYRILLIC_RE = re.compile(r"[а-яА-ЯёЁ]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Оценка числа токенов без токенизатора: кириллица токенизируется плотнее латиницы
+    (~2.5 символа на токен против ~4)
+    """
+    cyrillic = len(CYRILLIC_RE.findall(text))
+    return int(cyrillic / 2.5 + (len(text) - cyrillic) / 4) + 1
+
+
+def get_token_counter(provider: str, model: str):
+    """
+    Счетчик токенов для провайдера: tiktoken для OpenAI (если установлен), иначе оценка
+
+    Returns:
+        (функция text -> int, название метода)
+    """
+    if provider == "openai":
+        try:
+            import tiktoken
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("o200k_base")
+            return (lambda text: len(encoding.encode(text))), "tiktoken"
+        except ImportError:
+            pass
+    return estimate_tokens, "оценка"
+
+
+def plan_run(examples: List[Dict], provider: str, model: str = None, output_mode: str = "full",
+             concurrency: int = 1, rate_limit: float = None, delay_s: float = 0.0,
+             budget_usd: float = None) -> Dict:
+    """
+    Прогноз прогона разметки
+
+    Args:
+        examples: Подготовленные примеры (task_text, dialogue_history, ai_response, id)
+        provider: Провайдер (claude, deepseek, openai)
+        model: Модель (если None — по умолчанию для провайдера)
+        output_mode: Режим вывода классификатора (full, compact, logprob)
+        concurrency: Число одновременных запросов
+        rate_limit: Ограничение, запросов в секунду (None — без ограничения)
+        delay_s: Пауза после каждого запроса (как time.sleep в run_annotation.py)
+        budget_usd: Бюджет прогона в USD (None — не проверять)
+
+    Returns:
+        Dict с прогнозом и списком проблемных примеров
+    """
+    model = model or DEFAULT_MODELS.get(provider, provider)
+    profile = PROVIDER_PROFILES.get(provider, PROVIDER_PROFILES["openai"])
+    count_tokens, method = get_token_counter(provider, model)
+    max_output = MAX_TOKENS[output_mode]
+    expected_output = min(EXPECTED_OUTPUT_TOKENS[output_mode], max_output)
+
+    items = []
+    for example in examples:
+        prompt = PROMPT_TEMPLATES[output_mode].format(
+            task_text=example["task_text"],
+            dialogue_history=example["dialogue_history"],
+            ai_response=example["ai_response"]
+        )
+        input_tokens = count_tokens(prompt)
+        items.append({
+            "id": example["id"],
+            "input_tokens": input_tokens,
+            "latency_s": profile["ttft_s"] + input_tokens / profile["prefill_tps"]
+                         + expected_output / profile["output_tps"],
+            "cost_usd": estimate_cost(model, input_tokens, expected_output),
+        })
+
+    n = len(items)
+    input_tokens = sum(i["input_tokens"] for i in items)
+    output_tokens = expected_output * n
+    busy_s = sum(i["latency_s"] + delay_s for i in items)
+    wall_s = busy_s / max(1, concurrency)
+    if rate_limit:
+        wall_s = max(wall_s, n / rate_limit)
+    cost_usd = estimate_cost(model, input_tokens, output_tokens)
+
+    # Проблемные примеры: не влезают в контекст или аномально дорогие
+    flagged = []
+    median_tokens = sorted(i["input_tokens"] for i in items)[n // 2] if n else 0
+    for item in items:
+        if item["input_tokens"] + max_output > profile["context_window"]:
+            flagged.append({**item, "reason": f"не влезает в контекст {profile['context_window']} токенов"})
+        elif median_tokens and item["input_tokens"] > 5 * median_tokens:
+            flagged.append({**item, "reason": f"в {item['input_tokens'] / median_tokens:.0f}× длиннее медианы"})
+
+    over_budget = budget_usd is not None and cost_usd > budget_usd
+    if over_budget:
+        # Самые дорогие примеры, без которых прогон укладывается в бюджет
+        excess = cost_usd - budget_usd
+        for item in sorted(items, key=lambda i: i["cost_usd"], reverse=True):
+            if excess <= 0:
+                break
+            if not any(f["id"] == item["id"] for f in flagged):
+                flagged.append({**item, "reason": "превышение бюджета"})
+            excess -= item["cost_usd"]
+
+    return {
+        "provider": provider,
+        "model": model,
+        "output_mode": output_mode,
+        "token_method": method,
+        "examples": n,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "max_input_tokens": max((i["input_tokens"] for i in items), default=0),
+        "cost_usd": cost_usd,
+        "wall_time_s": wall_s,
+        "concurrency": concurrency,
+        "rate_limit": rate_limit,
+        "budget_usd": budget_usd,
+        "over_budget": over_budget,
+        "flagged": flagged,
+    }
+
+
+def print_plan(plan: Dict):
+    """Печать прогноза в стиле скриптов разметки"""
+    print("\n" + "=" * 80)
+    print(f" DRY-RUN: {plan['provider'].upper()} ({plan['model']}, режим {plan['output_mode']})")
+    print("=" * 80)
+    print(f"Примеров:          {plan['examples']}")
+    print(f"Входные токены:    {plan['input_tokens']:,} ({plan['token_method']}, "
+          f"максимум {plan['max_input_tokens']:,} на пример)")
+    print(f"Выходные токены:   {plan['output_tokens']:,} (ожидаемо)")
+    print(f"Стоимость:         ${plan['cost_usd']:.4f}")
+    rate = f"{plan['rate_limit']} запр/с" if plan["rate_limit"] else "без лимита"
+    print(f"Время:             ~{plan['wall_time_s'] / 60:.1f} мин "
+          f"(параллельность {plan['concurrency']}, {rate})")
+
+    if plan["over_budget"]:
+        print(f"\n[X] Бюджет ${plan['budget_usd']:.4f} превышен")
+    if plan["flagged"]:
+        print("\n[X] Проблемные примеры:")
+        for item in plan["flagged"]:
+            print(f"   ID {item['id']}: {item['input_tokens']:,} токенов, ${item['cost_usd']:.4f} — {item['reason']}")
+    else:
+        print("\n[OK] Все примеры укладываются в контекст")
@@ -0,0 +1,290 @@
+"""
+Корпус диалогов с заранее разобранными репликами
+full_dialog_student один раз разбирается на реплики (ученик / ИИ-помощник) с номером реплики,
+числами и выражениями и сохраняется в колоночный бинарный файл со смещениями.
+Файл открывается через mmap: окно истории, числа реплик и хэши для дедупликации
+читаются срезами без повторного разбора текста.
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import re
+import struct
+from array import array
+from typing import Dict, List, NamedTuple
+
+STUDENT = 0
+TUTOR = 1
+SPEAKERS = {"Ученик:": STUDENT, "ИИ-помощник:": TUTOR}
+SPEAKER_NAMES = {STUDENT: "Ученик", TUTOR: "ИИ-помощник"}
+
+MAGIC = b"DLGCORP1"
+ALIGN = 8
+
+NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:[.,]\d+)?(?![\w])")
+LATEX_RE = re.compile(r"\$\$?([^$]+?)\$\$?")
+# Выражения без LaTeX: "5 * 3 = 15", "2023 : 343 ≈ 5,9"
+PLAIN_EXPRESSION_RE = re.compile(r"\d[\d\s.,+\-*/×·:^()]*?[=≈]\s*-?\d+(?:[.,]\d+)?")
+
+# Колонки: имя -> typecode array
+COLUMNS = {
+    "dialogue_ids": "q",      # ID примера
+    "dialogue_turns": "I",    # смещения реплик диалога, n_dialogues + 1
+    "turn_speaker": "B",
+    "turn_index": "H",        # номер реплики внутри диалога
+    "turn_hash": "Q",         # хэш нормализованного текста реплики
+    "text_offsets": "Q",      # смещения текста реплик в text, n_turns + 1
+    "text": "B",              # UTF-8 текст реплик подряд
+    "number_offsets": "I",    # смещения чисел реплики в numbers, n_turns + 1
+    "numbers": "d",
+    "expr_offsets": "I",      # смещения выражений реплики, n_turns + 1
+    "expr_text_offsets": "Q", # смещения текста выражений в expr_text, n_expressions + 1
+    "expr_text": "B",
+}
+
+
+class Turn(NamedTuple):
+    speaker: int
+    index: int
+    text: str
+    numbers: List[float]
+    expressions: List[str]
+
+
+def extract_numbers(text: str) -> List[float]:
+    """Числа реплики (десятичная запятая допускается)"""
+    return [float(m.group().replace(",", ".")) for m in NUMBER_RE.finditer(text)]
+
+
+def extract_expressions(text: str) -> List[str]:
+    """Формулы в $...$ и выражения с '=' в обычном тексте"""
+    expressions = [m.group(1).strip() for m in LATEX_RE.finditer(text)]
+    plain = LATEX_RE.sub(" ", text)
+    expressions.extend(m.group().strip() for m in PLAIN_EXPRESSION_RE.finditer(plain))
+    return expressions
+
+
+def turn_hash(text: str) -> int:
+    """64-битный хэш реплики без учета регистра и пробелов"""
+    normalized = " ".join(text.lower().split())
+    return int.from_bytes(hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def parse_dialogue(text: str) -> List[Turn]:
+    """
+    Разбор full_dialog_student на реплики
+
+    Реплика начинается строкой "Ученик:" или "ИИ-помощник:", строки реплики идут
+    с отступом в два пробела. Текст до первой метки считается репликой ученика.
+    """
+    turns = []
+    speaker, lines = STUDENT, []
+
+    def flush():
+        body = "\n".join(lines).strip()
+        if body:
+            turns.append(Turn(speaker, len(turns), body, extract_numbers(body), extract_expressions(body)))
+
+    for line in text.split("\n"):
+        marker = SPEAKERS.get(line.strip())
+        if marker is not None:
+            flush()
+            speaker, lines = marker, []
+        else:
+            lines.append(line[2:] if line.startswith("  ") else line)
+    flush()
+    return turns
+
+
+def build_corpus(examples: List[Dict], path: str) -> Dict:
+    """
+    Разбирает диалоги примеров и записывает колоночный файл корпуса
+
+    Args:
+        examples: Примеры с полями id и dialogue_history
+        path: Путь к файлу корпуса
+
+    Returns:
+        Заголовок файла (число диалогов, реплик, расположение колонок)
+    """
+    columns = {name: array(code) for name, code in COLUMNS.items()}
+    for name in ("dialogue_turns", "text_offsets", "number_offsets", "expr_offsets", "expr_text_offsets"):
+        columns[name].append(0)
+
+    for example in examples:
+        columns["dialogue_ids"].append(int(example["id"]))
+        for turn in parse_dialogue(example["dialogue_history"]):
+            encoded = turn.text.encode("utf-8")
+            columns["turn_speaker"].append(turn.speaker)
+            columns["turn_index"].append(min(turn.index, 0xFFFF))
+            columns["turn_hash"].append(turn_hash(turn.text))
+            columns["text"].frombytes(encoded)
+            columns["text_offsets"].append(len(columns["text"]))
+            columns["numbers"].extend(turn.numbers)
+            columns["number_offsets"].append(len(columns["numbers"]))
+            for expression in turn.expressions:
+                columns["expr_text"].frombytes(expression.encode("utf-8"))
+                columns["expr_text_offsets"].append(len(columns["expr_text"]))
+            columns["expr_offsets"].append(len(columns["expr_text_offsets"]) - 1)
+        columns["dialogue_turns"].append(len(columns["turn_speaker"]))
+
+    # Заголовок: JSON с расположением колонок; данные колонок выровнены по 8 байт
+    layout, position = {}, 0
+    for name, values in columns.items():
+        layout[name] = [position, len(values)]
+        position += -(-len(values) * values.itemsize // ALIGN) * ALIGN
+    header = {
+        "dialogues": len(columns["dialogue_ids"]),
+        "turns": len(columns["turn_speaker"]),
+        "columns": layout,
+        "typecodes": COLUMNS,
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = -(-(len(MAGIC) + 4 + len(header_bytes)) // ALIGN) * ALIGN
+
+    with open(path, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+        f.write(b"\0" * (data_start - f.tell()))
+        for name, values in columns.items():
+            raw = values.tobytes()
+            f.write(raw + b"\0" * (-len(raw) % ALIGN))
+    return header
+
+
+class DialogueCorpus:
+    """Корпус диалогов, открытый через mmap: колонки — memoryview без копирования"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} не является файлом корпуса диалогов")
+
+        (header_size,) = struct.unpack_from("<I", self._mmap, len(MAGIC))
+        header_start = len(MAGIC) + 4
+        self.header = json.loads(self._mmap[header_start:header_start + header_size])
+        data_start = -(-(header_start + header_size) // ALIGN) * ALIGN
+
+        self._view = view = memoryview(self._mmap)
+        self.columns = {}
+        for name, (offset, length) in self.header["columns"].items():
+            code = self.header["typecodes"][name]
+            size = array(code).itemsize
+            start = data_start + offset
+            self.columns[name] = view[start:start + length * size].cast(code)
+        self._positions = {example_id: i for i, example_id in enumerate(self.columns["dialogue_ids"])}
+
+    def __len__(self) -> int:
+        return self.header["dialogues"]
+
+    def close(self):
+        """
+        Закрывает корпус
+
+        turn_numbers и hashes возвращают срезы mmap без копирования: пока такой срез жив,
+        mmap закрыть нельзя. Срезы нужно освободить до close (del или release()) или
+        скопировать (list(...)); иначе закрытие отображения откладывается: повторный close после
+        освобождения срезов (или сборка мусора корпуса и срезов) закроет его.
+        """
+        for column in self.columns.values():
+            column.release()
+        self.columns.clear()
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # mmap держит свою копию дескриптора: файл можно закрыть и сейчас
+        self._file.close()
+
+    def position(self, example_id: int) -> int:
+        """Номер диалога по ID примера"""
+        return self._positions[example_id]
+
+    def turn_range(self, position: int) -> range:
+        """Глобальные номера реплик диалога"""
+        offsets = self.columns["dialogue_turns"]
+        return range(offsets[position], offsets[position + 1])
+
+    def turn_text(self, turn: int) -> str:
+        offsets = self.columns["text_offsets"]
+        return bytes(self.columns["text"][offsets[turn]:offsets[turn + 1]]).decode("utf-8")
+
+    def turn_numbers(self, turn: int) -> memoryview:
+        offsets = self.columns["number_offsets"]
+        return self.columns["numbers"][offsets[turn]:offsets[turn + 1]]
+
+    def turn_expressions(self, turn: int) -> List[str]:
+        offsets, bounds = self.columns["expr_offsets"], self.columns["expr_text_offsets"]
+        text = self.columns["expr_text"]
+        return [bytes(text[bounds[i]:bounds[i + 1]]).decode("utf-8") for i in range(offsets[turn], offsets[turn + 1])]
+
+    def turns(self, position: int, last: int = None) -> List[Turn]:
+        """
+        Реплики диалога
+
+        Args:
+            position: Номер диалога (см. position)
+            last: Только последние N реплик (окно истории)
+        """
+        turns = self.turn_range(position)
+        if last is not None:
+            turns = turns[-last:] if last else turns[:0]
+        return [
+            Turn(self.columns["turn_speaker"][t], self.columns["turn_index"][t], self.turn_text(t),
+                 list(self.turn_numbers(t)), self.turn_expressions(t))
+            for t in turns
+        ]
+
+    def history(self, position: int, last: int = None) -> str:
+        """Окно истории в исходном формате full_dialog_student"""
+        parts = []
+        for turn in self.turns(position, last):
+            body = "\n  ".join(turn.text.split("\n"))
+            parts.append(f"{SPEAKER_NAMES[turn.speaker]}:\n  {body}")
+        return "\n  ".join(parts)
+
+    def hashes(self, position: int) -> memoryview:
+        """Хэши реплик диалога (для поиска повторов и дедупликации)"""
+        turns = self.turn_range(position)
+        return self.columns["turn_hash"][turns.start:turns.stop]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Предобработка диалогов в колоночный корпус")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cmd = commands.add_parser("build", help="Разобрать диалоги из Excel")
+    cmd.add_argument("--excel", default="../31.xlsx")
+    cmd.add_argument("--out", default="dialogues.corpus")
+
+    cmd = commands.add_parser("show", help="Показать реплики примера")
+    cmd.add_argument("example_id", type=int)
+    cmd.add_argument("--corpus", default="dialogues.corpus")
+    cmd.add_argument("--last", type=int, default=None, help="Только последние N реплик")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        from annotate import load_data, prepare_examples
+
+        header = build_corpus(prepare_examples(load_data(args.excel)), args.out)
+        print(f"[OK] {args.out}: диалогов {header['dialogues']}, реплик {header['turns']}")
+        return
+
+    corpus = DialogueCorpus(args.corpus)
+    for turn in corpus.turns(corpus.position(args.example_id), args.last):
+        print(f"\n#{turn.index} {SPEAKER_NAMES[turn.speaker]} (чисел: {len(turn.numbers)}, "
+              f"выражений: {len(turn.expressions)})")
+        print(f"  {turn.text[:200]}")
+        for expression in turn.expressions[:5]:
+            print(f"  = {expression}")
+    corpus.close()
+
+
+if __name__ == "__main__":
+    main()
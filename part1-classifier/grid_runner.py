@@ -0,0 +1,223 @@
+"""
+Сетка сравнения: варианты промпта × провайдеры
+Все ячейки (вариант, провайдер, пример) выполняются параллельно с общим ограничением
+частоты запросов на провайдера и дисковым кэшем ответов: уже посчитанные ячейки
+повторно не запрашиваются. На выходе — таблица метрик, стоимости и латентности.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from typing import Dict, List, Tuple
+
+from ratelimit import AsyncRateLimiter
+from response_cache import ResponseCache
+from scheduling import dispatch_order
+from universal_classifier import (
+    CLASSIFICATION_PROMPT, UniversalMathErrorClassifier, calculate_metrics, estimate_cost, load_prompt_template
+)
+
+
+class GridRunner:
+    """Параллельный прогон сетки вариант × провайдер × пример"""
+
+    def __init__(self, variants: Dict[str, str], providers: List[str], cache: ResponseCache,
+                 concurrency: int = 8, rate_limits: Dict[str, float] = None, base_urls: Dict[str, str] = None):
+        """
+        Args:
+            variants: Имя варианта -> шаблон промпта
+            providers: Провайдеры (claude, deepseek, openai, ...)
+            cache: Дисковый кэш ответов
+            concurrency: Максимум одновременных запросов ко всем провайдерам
+            rate_limits: Провайдер -> запросов в секунду
+            base_urls: Провайдер -> base_url
+        """
+        self.cache = cache
+        self.concurrency = concurrency
+        rate_limits = rate_limits or {}
+        base_urls = base_urls or {}
+
+        self.classifiers = {}
+        for provider in providers:
+            for name, template in variants.items():
+                self.classifiers[(name, provider)] = UniversalMathErrorClassifier(
+                    provider=provider, base_url=base_urls.get(provider), prompt_template=template
+                )
+        self.limiters = {
+            provider: AsyncRateLimiter(rate_limits.get(provider, 0), burst=concurrency)
+            for provider in providers
+        }
+        # Стоимость и латентность — живых вызовов и (по записи в кэше) ответов, взятых из кэша
+        self.stats = {
+            cell: {"cache_hits": 0, "api_calls": 0, "latency_s": 0.0, "cost_usd": 0.0,
+                   "cached_with_usage": 0, "cached_latency_s": 0.0, "cached_cost_usd": 0.0}
+            for cell in self.classifiers
+        }
+
+    async def _run_cell(self, cell: Tuple[str, str], example: Dict, semaphore: asyncio.Semaphore) -> Dict:
+        """
+        Одна ячейка: ответ из кэша или запрос к API
+
+        В кэш вместе с ответом пишется usage исходного вызова (токены, стоимость, латентность),
+        чтобы повторный прогон показывал, сколько стоили ячейки, а не нули.
+        """
+        classifier = self.classifiers[cell]
+        stats = self.stats[cell]
+        key = classifier.cache_key(
+            classifier.build_prompt(example["task_text"], example["dialogue_history"], example["ai_response"])
+        )
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            stats["cache_hits"] += 1
+            usage = cached.pop("usage", None)
+            if usage is not None:
+                stats["cached_with_usage"] += 1
+                stats["cached_cost_usd"] += usage["cost_usd"]
+                stats["cached_latency_s"] += usage["latency_s"]
+            return cached
+
+        async with semaphore:
+            await self.limiters[cell[1]].acquire()
+            started = time.perf_counter()
+            result, (input_tokens, output_tokens) = await asyncio.get_running_loop().run_in_executor(
+                None, classifier.classify_with_usage,
+                example["task_text"], example["dialogue_history"], example["ai_response"]
+            )
+            latency = time.perf_counter() - started
+
+        usage = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cost_usd": estimate_cost(classifier.model, input_tokens, output_tokens),
+            "latency_s": latency,
+        }
+        stats["api_calls"] += 1
+        stats["latency_s"] += latency
+        stats["cost_usd"] += usage["cost_usd"]
+
+        result.pop("prompt_hash", None)
+        if result["assessment"] != -1:
+            self.cache.put(key, dict(result, usage=usage))
+        return result
+
+    async def run(self, examples: List[Dict]) -> Dict[Tuple[str, str], List[Dict]]:
+        """
+        Прогон всей сетки
+
+        Returns:
+            (вариант, провайдер) -> результаты в порядке examples
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        cells = list(self.classifiers)
+
+        # Семафор пропускает задачи в порядке создания: длинные диалоги — первыми
+        order = dispatch_order(examples, "longest_first")
+        jobs = [(cell, i) for i in order for cell in cells]
+        flat = await asyncio.gather(*(self._run_cell(cell, examples[i], semaphore) for cell, i in jobs))
+
+        results = {cell: [None] * len(examples) for cell in cells}
+        for (cell, i), result in zip(jobs, flat):
+            results[cell][i] = result
+        return results
+
+    def summarize(self, examples: List[Dict], results: Dict[Tuple[str, str], List[Dict]]) -> List[Dict]:
+        """Метрики, стоимость и латентность по каждой ячейке сетки"""
+        rows = []
+        for cell, cell_results in results.items():
+            pairs = [
+                (r["assessment"], int(e["ground_truth"]))
+                for r, e in zip(cell_results, examples)
+                if e.get("ground_truth") is not None and r["assessment"] != -1
+            ]
+            metrics = calculate_metrics([p for p, _ in pairs], [g for _, g in pairs]) if pairs else None
+            stats = self.stats[cell]
+            rows.append({
+                "variant": cell[0],
+                "provider": cell[1],
+                "model": self.classifiers[cell].model,
+                "metrics": metrics,
+                "failed": sum(r["assessment"] == -1 for r in cell_results),
+                "api_calls": stats["api_calls"],
+                "cache_hits": stats["cache_hits"],
+                "cost_usd": stats["cost_usd"],
+                "avg_latency_s": stats["latency_s"] / stats["api_calls"] if stats["api_calls"] else None,
+                "cached_cost_usd": stats["cached_cost_usd"],
+                "cached_avg_latency_s": (stats["cached_latency_s"] / stats["cached_with_usage"]
+                                         if stats["cached_with_usage"] else None),
+            })
+        return rows
+
+
+def save_table(rows: List[Dict], path: str):
+    """Сравнительная таблица в Markdown"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("# Сравнение вариантов промпта и провайдеров\n\n")
+        f.write("| Вариант | Провайдер | Модель | Accuracy | Precision | Recall | F1 | Сбои | "
+                "API | Кэш | Стоимость, $ | Латентность, с | Стоимость кэша, $ | Латентность кэша, с |\n")
+        f.write("|---------|-----------|--------|----------|-----------|--------|----|------|"
+                "-----|-----|--------------|----------------|-------------------|---------------------|\n")
+        for r in rows:
+            m = r["metrics"]
+            quality = (f"{m['accuracy']:.2%} | {m['precision']:.2%} | {m['recall']:.2%} | {m['f1_score']:.2%}"
+                       if m else "- | - | - | -")
+            latency = f"{r['avg_latency_s']:.2f}" if r["avg_latency_s"] is not None else "-"
+            cached_latency = f"{r['cached_avg_latency_s']:.2f}" if r["cached_avg_latency_s"] is not None else "-"
+            f.write(f"| {r['variant']} | {r['provider']} | {r['model']} | {quality} | {r['failed']} | "
+                    f"{r['api_calls']} | {r['cache_hits']} | {r['cost_usd']:.4f} | {latency} | "
+                    f"{r['cached_cost_usd']:.4f} | {cached_latency} |\n")
+    print(f" Таблица сохранена в {path}")
+
+
+def parse_mapping(items: List[str], cast=str) -> Dict:
+    """Разбор аргументов вида provider=value"""
+    mapping = {}
+    for item in items or []:
+        key, value = item.split("=", 1)
+        mapping[key] = cast(value)
+    return mapping
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сетка сравнения вариантов промпта и провайдеров")
+    parser.add_argument("--prompts", nargs="*", default=[],
+                        help="Файлы шаблонов (.md — первый блок кода); встроенный промпт добавляется как 'builtin'")
+    parser.add_argument("--providers", nargs="+", default=["deepseek"])
+    parser.add_argument("--excel", default="../31.xlsx")
+    parser.add_argument("--limit", type=int, default=None, help="Только первые N примеров")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", nargs="*", default=[], help="Лимиты, запросов/с: deepseek=5 claude=1")
+    parser.add_argument("--base-url", nargs="*", default=[], help="deepseek=https://api.artemox.com/v1")
+    parser.add_argument("--cache", default="grid_cache.jsonl")
+    parser.add_argument("--output", default="grid_results.md")
+    args = parser.parse_args()
+
+    from annotate import load_data, prepare_examples
+
+    variants = {"builtin": CLASSIFICATION_PROMPT.replace("{{", "{").replace("}}", "}")}
+    for path in args.prompts:
+        variants[os.path.splitext(os.path.basename(path))[0]] = load_prompt_template(path)
+
+    examples = prepare_examples(load_data(args.excel))[:args.limit]
+    cache = ResponseCache(args.cache)
+    runner = GridRunner(
+        variants, args.providers, cache,
+        concurrency=args.concurrency,
+        rate_limits=parse_mapping(args.rate, float),
+        base_urls=parse_mapping(args.base_url)
+    )
+
+    total = len(variants) * len(args.providers) * len(examples)
+    print(f"\n Ячеек: {total} ({len(variants)} вариантов × {len(args.providers)} провайдеров × "
+          f"{len(examples)} примеров), в кэше {len(cache)} ответов")
+
+    started = time.perf_counter()
+    results = asyncio.run(runner.run(examples))
+    print(f"[DONE] Сетка посчитана за {time.perf_counter() - started:.1f} с")
+
+    save_table(runner.summarize(examples, results), args.output)
+
+
+if __name__ == "__main__":
+    main()
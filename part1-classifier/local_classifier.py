@@ -0,0 +1,302 @@
+"""
+Локальная дистиллированная модель — быстрая первая ступень перед LLM
+Учится на ground truth и накопленной разметке LLM (results_<provider>.json):
+char n-gram TF-IDF по реплике + числовые признаки, логистическая регрессия
+с калиброванными вероятностями. Уверенные предсказания не доходят до API.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import re
+from typing import Dict, List, Tuple
+
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold
+from sklearn.pipeline import FeatureUnion, Pipeline
+from sklearn.preprocessing import FunctionTransformer, StandardScaler
+
+from universal_classifier import calculate_metrics
+
+DEFAULT_MODEL_PATH = "local_model.pkl"
+
+NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)?")
+OPERATOR_RE = re.compile(r"[=+×·*/:^−-]|\\frac|\\cdot|\\times")
+PRAISE_RE = re.compile(r"правильно|верно|отлично|молодец|хорошо", re.IGNORECASE)
+CORRECTION_RE = re.compile(r"неверно|ошиб|неправильно|проверим|проверь", re.IGNORECASE)
+
+
+def _reply_texts(examples: List[Dict]) -> List[str]:
+    """Текст реплики для char n-gram признаков"""
+    return [example["ai_response"] for example in examples]
+
+
+def _numeric_features(examples: List[Dict]) -> List[List[float]]:
+    """Ручные числовые признаки: вычисления в реплике и числа, которых не было в диалоге"""
+    rows = []
+    for example in examples:
+        reply = example["ai_response"]
+        context = example.get("task_text", "") + " " + example.get("dialogue_history", "")
+
+        reply_numbers = NUMBER_RE.findall(reply)
+        context_numbers = set(NUMBER_RE.findall(context))
+        new_numbers = [n for n in reply_numbers if n not in context_numbers]
+
+        rows.append([
+            len(reply) / 1000,
+            len(reply_numbers),
+            len(new_numbers),
+            len(new_numbers) / len(reply_numbers) if reply_numbers else 0.0,
+            reply.count("="),
+            len(OPERATOR_RE.findall(reply)),
+            reply.count("?"),
+            len(PRAISE_RE.findall(reply)),
+            len(CORRECTION_RE.findall(reply)),
+        ])
+    return rows
+
+
+def build_pipeline() -> Pipeline:
+    """Признаки + калиброванная логистическая регрессия"""
+    features = FeatureUnion([
+        ("reply_ngrams", Pipeline([
+            ("select", FunctionTransformer(_reply_texts)),
+            ("tfidf", TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4), sublinear_tf=True)),
+        ])),
+        ("numeric", Pipeline([
+            ("extract", FunctionTransformer(_numeric_features)),
+            ("scale", StandardScaler()),
+        ])),
+    ])
+    model = CalibratedClassifierCV(
+        LogisticRegression(class_weight="balanced", max_iter=1000),
+        method="sigmoid",
+        cv=3
+    )
+    return Pipeline([("features", features), ("model", model)])
+
+
+class LocalMathErrorModel:
+    """Локальный классификатор с интерфейсом classify/classify_batch как у LLM-классификатора"""
+
+    def __init__(self, pipeline: Pipeline = None):
+        self.pipeline = pipeline or build_pipeline()
+
+    def fit(self, examples: List[Dict], labels: List[int]) -> "LocalMathErrorModel":
+        """Обучение на примерах с полями task_text, dialogue_history, ai_response"""
+        self.pipeline.fit(examples, labels)
+        return self
+
+    def predict_proba(self, examples: List[Dict]) -> List[float]:
+        """Калиброванные вероятности P(ошибка) для каждого примера"""
+        return [float(p) for p in self.pipeline.predict_proba(examples)[:, 1]]
+
+    def classify(self, task_text: str, dialogue_history: str, ai_response: str) -> Dict:
+        """
+        Классифицирует ответ репетитора локальной моделью
+
+        Returns:
+            Dict с полями: assessment (0/1), reasoning, error_type, probability
+        """
+        probability = self.predict_proba([{
+            "task_text": task_text,
+            "dialogue_history": dialogue_history,
+            "ai_response": ai_response,
+        }])[0]
+        return {
+            "assessment": int(probability >= 0.5),
+            "reasoning": f"Локальная модель: P(ошибка) = {probability:.3f}",
+            "error_type": None,
+            "probability": probability,
+        }
+
+    def save(self, path: str = DEFAULT_MODEL_PATH):
+        with open(path, "wb") as f:
+            pickle.dump(self.pipeline, f)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_MODEL_PATH) -> "LocalMathErrorModel":
+        with open(path, "rb") as f:
+            return cls(pickle.load(f))
+
+
+class CascadeClassifier:
+    """Каскад: уверенные предсказания локальной модели, остальное — в LLM"""
+
+    def __init__(self, local_model: LocalMathErrorModel, llm_classifier, low: float = 0.1, high: float = 0.9):
+        """
+        Args:
+            local_model: Обученная локальная модель
+            llm_classifier: Классификатор второй ступени (UniversalMathErrorClassifier)
+            low: P(ошибка) <= low — локальный ответ 0 без вызова API
+            high: P(ошибка) >= high — локальный ответ 1 без вызова API
+        """
+        self.local_model = local_model
+        self.llm_classifier = llm_classifier
+        self.low = low
+        self.high = high
+        self.stats = {"local": 0, "llm": 0}
+
+    def classify(self, task_text: str, dialogue_history: str, ai_response: str) -> Dict:
+        """
+        Классифицирует ответ репетитора, обращаясь к LLM только в неуверенных случаях
+
+        Returns:
+            Dict с полями: assessment (0/1), reasoning, error_type, probability, stage
+        """
+        result = self.local_model.classify(task_text, dialogue_history, ai_response)
+        probability = result["probability"]
+
+        if probability <= self.low or probability >= self.high:
+            self.stats["local"] += 1
+            result["stage"] = "local"
+            return result
+
+        self.stats["llm"] += 1
+        result = self.llm_classifier.classify(task_text, dialogue_history, ai_response)
+        result["probability"] = probability
+        result["stage"] = "llm"
+        return result
+
+    def api_call_reduction(self) -> float:
+        """Доля примеров, обработанных без вызова API"""
+        total = self.stats["local"] + self.stats["llm"]
+        return self.stats["local"] / total if total else 0.0
+
+
+def load_llm_labels(results_files: List[str]) -> Dict[int, int]:
+    """Разметка LLM из results_<provider>.json: id -> assessment (ошибочные ответы -1 пропускаются)"""
+    labels = {}
+    for path in results_files:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        for r in data["results"]:
+            if r["assessment"] in (0, 1):
+                labels.setdefault(int(r["id"]), int(r["assessment"]))
+    return labels
+
+
+def collect_training_data(examples: List[Dict], llm_labels: Dict[int, int]) -> Tuple[List[Dict], List[int], List[str]]:
+    """
+    Метки для обучения: ground truth, если есть, иначе разметка LLM
+
+    Returns:
+        (примеры, метки, источник метки: "ground_truth"/"llm")
+    """
+    train, labels, sources = [], [], []
+    for example in examples:
+        if example.get("ground_truth") is not None:
+            labels.append(int(example["ground_truth"]))
+            sources.append("ground_truth")
+        elif example["id"] in llm_labels:
+            labels.append(llm_labels[example["id"]])
+            sources.append("llm")
+        else:
+            continue
+        train.append(example)
+    return train, labels, sources
+
+
+def cross_validated_proba(examples: List[Dict], labels: List[int], folds: int = 5) -> List[float]:
+    """Вероятности out-of-fold: каждый пример оценивается моделью, не видевшей его"""
+    probabilities = [0.0] * len(examples)
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=42)
+    for train_idx, test_idx in splitter.split(examples, labels):
+        model = LocalMathErrorModel().fit([examples[i] for i in train_idx], [labels[i] for i in train_idx])
+        for i, p in zip(test_idx, model.predict_proba([examples[i] for i in test_idx])):
+            probabilities[i] = p
+    return probabilities
+
+
+def cascade_report(examples: List[Dict], probabilities: List[float], llm_labels: Dict[int, int],
+                   bands: List[Tuple[float, float]]) -> List[Dict]:
+    """
+    Снижение числа вызовов API и цена по precision/recall для разных порогов уверенности
+    (оценка на примерах с ground truth и разметкой LLM)
+    """
+    rows = []
+    labelled = [
+        (example, p) for example, p in zip(examples, probabilities)
+        if example.get("ground_truth") is not None and example["id"] in llm_labels
+    ]
+    ground_truth = [int(example["ground_truth"]) for example, _ in labelled]
+    llm_only = [llm_labels[example["id"]] for example, _ in labelled]
+    baseline = calculate_metrics(llm_only, ground_truth)
+
+    for low, high in bands:
+        predictions, local_count = [], 0
+        for example, p in labelled:
+            if p <= low or p >= high:
+                predictions.append(int(p >= high))
+                local_count += 1
+            else:
+                predictions.append(llm_labels[example["id"]])
+        metrics = calculate_metrics(predictions, ground_truth)
+        rows.append({
+            "low": low,
+            "high": high,
+            "api_call_reduction": local_count / len(labelled) if labelled else 0.0,
+            "precision": metrics["precision"],
+            "recall": metrics["recall"],
+            "f1_score": metrics["f1_score"],
+            "precision_delta": metrics["precision"] - baseline["precision"],
+            "recall_delta": metrics["recall"] - baseline["recall"],
+        })
+    return [{"baseline": baseline}] + rows
+
+
+def save_report(report: List[Dict], path: str):
+    """Таблица отчета в Markdown"""
+    baseline = report[0]["baseline"]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("# Каскад: локальная модель + LLM\n\n")
+        f.write(f"Только LLM: precision {baseline['precision']:.2%}, recall {baseline['recall']:.2%}, "
+                f"F1 {baseline['f1_score']:.2%}\n\n")
+        f.write("| Порог (low / high) | Без API | Precision | Recall | F1 | ΔPrecision | ΔRecall |\n")
+        f.write("|--------------------|---------|-----------|--------|----|------------|---------|\n")
+        for r in report[1:]:
+            f.write(f"| {r['low']:.2f} / {r['high']:.2f} | {r['api_call_reduction']:.0%} | "
+                    f"{r['precision']:.2%} | {r['recall']:.2%} | {r['f1_score']:.2%} | "
+                    f"{r['precision_delta']:+.2%} | {r['recall_delta']:+.2%} |\n")
+    print(f" Отчет сохранен в {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Обучение локальной модели-первой ступени")
+    parser.add_argument("--excel", default="../31.xlsx", help="Размеченный лист с ground truth")
+    parser.add_argument("--results", nargs="*", default=["results_deepseek.json"],
+                        help="Накопленная разметка LLM (results_<provider>.json)")
+    parser.add_argument("--output", default=DEFAULT_MODEL_PATH, help="Куда сохранить модель")
+    parser.add_argument("--report", default="local_model_report.md", help="Отчет по каскаду")
+    args = parser.parse_args()
+
+    from annotate import load_data, prepare_examples
+
+    examples = prepare_examples(load_data(args.excel))
+    llm_labels = load_llm_labels([p for p in args.results if os.path.exists(p)])
+    train, labels, sources = collect_training_data(examples, llm_labels)
+    print(f"[OK] Обучающих примеров: {len(train)} "
+          f"(ground truth: {sources.count('ground_truth')}, LLM: {sources.count('llm')})")
+
+    probabilities = cross_validated_proba(train, labels)
+    bands = [(0.05, 0.95), (0.1, 0.9), (0.2, 0.8), (0.3, 0.7)]
+    report = cascade_report(train, probabilities, llm_labels, bands)
+    for r in report[1:]:
+        print(f"  {r['low']:.2f}/{r['high']:.2f}: без API {r['api_call_reduction']:.0%}, "
+              f"precision {r['precision']:.2%} ({r['precision_delta']:+.2%}), "
+              f"recall {r['recall']:.2%} ({r['recall_delta']:+.2%})")
+    save_report(report, args.report)
+
+    LocalMathErrorModel().fit(train, labels).save(args.output)
+    print(f"[DONE] Модель сохранена в {args.output}")
+
+
+if __name__ == "__main__":
+    # Запуск через модуль local_classifier, а не __main__: в pickle модели функции признаков
+    # должны ссылаться на local_classifier._reply_texts, иначе другой процесс ее не загрузит
+    import local_classifier
+
+    local_classifier.main()
@@ -0,0 +1,192 @@
+"""
+Профилирование скриптов разметки по стадиям
+Стадии (load, prepare, prompt, api_wait, parse, metrics, save) размечаются через stage();
+без активного профайлера stage() ничего не делает. По флагам дополнительно включаются
+cProfile, tracemalloc (пик памяти по стадиям) и сэмплер стеков для flamegraph.
+"""
+
+import argparse
+import cProfile
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Dict
+
+_active = None
+
+
+@contextmanager
+def stage(name: str):
+    """Стадия активного профайлера; без профайлера — пустой контекст"""
+    profiler = _active
+    if profiler is None:
+        yield
+        return
+    profiler._enter(name)
+    try:
+        yield
+    finally:
+        profiler._exit(name)
+
+
+class StageProfiler:
+    """
+    Время, число вызовов и пик памяти по стадиям; опционально cProfile и flamegraph
+
+    tracemalloc считает память процесса целиком, поэтому при параллельных стадиях
+    (classify_batch с concurrency > 1) пик памяти стадии приблизителен.
+    cProfile профилирует только поток, в котором запущен профайлер.
+    """
+
+    def __init__(self, memory: bool = False, cprofile_path: str = None, flamegraph_path: str = None,
+                 sample_interval: float = 0.005):
+        """
+        Args:
+            memory: Включить tracemalloc и считать пик памяти по стадиям
+            cprofile_path: Файл статистики cProfile (.prof, смотреть в snakeviz или pstats)
+            flamegraph_path: Файл collapsed stacks для flamegraph.pl / speedscope
+            sample_interval: Период сэмплирования стеков, с
+        """
+        self.memory = memory
+        self.cprofile_path = cprofile_path
+        self.flamegraph_path = flamegraph_path
+        self.sample_interval = sample_interval
+
+        self._lock = threading.Lock()
+        self._stacks = defaultdict(list)  # поток -> стек [имя, начало, база памяти, пик]
+        self.stats = defaultdict(lambda: {"calls": 0, "seconds": 0.0, "peak_bytes": 0})
+        self._samples = Counter()
+        self._profile = None
+        self._sampler = None
+        self._stop_sampling = threading.Event()
+        self._started = 0.0
+        self.wall_s = 0.0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        self.print_report()
+
+    def start(self):
+        global _active
+        _active = self
+        if self.memory:
+            tracemalloc.start()
+        if self.cprofile_path:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        if self.flamegraph_path:
+            self._sampler = threading.Thread(target=self._sample, daemon=True)
+            self._sampler.start()
+        self._started = time.perf_counter()
+
+    def stop(self):
+        global _active
+        self.wall_s = time.perf_counter() - self._started
+        _active = None
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self.cprofile_path)
+        if self._sampler is not None:
+            self._stop_sampling.set()
+            self._sampler.join()
+            self._write_collapsed()
+        if self.memory:
+            tracemalloc.stop()
+
+    def _enter(self, name: str):
+        stack = self._stacks[threading.get_ident()]
+        base = 0
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                # Пик, набранный внешней стадией до входа во вложенную, не должен потеряться
+                stack[-1][3] = max(stack[-1][3], peak)
+            tracemalloc.reset_peak()
+            base = current
+        stack.append([name, time.perf_counter(), base, base])
+
+    def _exit(self, name: str):
+        stack = self._stacks[threading.get_ident()]
+        _, started, base, peak = stack.pop()
+        elapsed = time.perf_counter() - started
+        if self.memory:
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            if stack:
+                stack[-1][3] = max(stack[-1][3], peak)
+        with self._lock:
+            record = self.stats[name]
+            record["calls"] += 1
+            record["seconds"] += elapsed
+            record["peak_bytes"] = max(record["peak_bytes"], peak - base)
+
+    def _sample(self):
+        """Сэмплер стеков всех потоков; стадия добавляется корнем стека"""
+        own = threading.get_ident()
+        while not self._stop_sampling.wait(self.sample_interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                    frame = frame.f_back
+                stages = [entry[0] for entry in list(self._stacks.get(thread_id, ()))]
+                self._samples[";".join(stages + names[::-1])] += 1
+
+    def _write_collapsed(self):
+        with open(self.flamegraph_path, "w", encoding="utf-8") as f:
+            for stack, count in self._samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def report(self) -> Dict:
+        return {"wall_s": self.wall_s, "stages": {name: dict(record) for name, record in self.stats.items()}}
+
+    def print_report(self):
+        print("\n" + "=" * 80)
+        print(f" ПРОФИЛЬ ПО СТАДИЯМ (всего {self.wall_s:.2f} с)")
+        print("=" * 80)
+        header = f"{'Стадия':<12}{'Вызовов':>9}{'Время, с':>11}{'Доля':>8}{'Среднее, мс':>13}"
+        if self.memory:
+            header += f"{'Пик памяти, МБ':>16}"
+        print(header)
+        for name, record in sorted(self.stats.items(), key=lambda item: -item[1]["seconds"]):
+            share = record["seconds"] / self.wall_s if self.wall_s else 0.0
+            line = (f"{name:<12}{record['calls']:>9}{record['seconds']:>11.3f}{share:>8.1%}"
+                    f"{record['seconds'] / record['calls'] * 1000:>13.2f}")
+            if self.memory:
+                line += f"{record['peak_bytes'] / 2 ** 20:>16.2f}"
+            print(line)
+        print("Доля параллельных стадий (api_wait) может превышать 100%: время суммируется по потокам")
+        if self.cprofile_path:
+            print(f"cProfile: {self.cprofile_path}")
+        if self.flamegraph_path:
+            print(f"Collapsed stacks: {self.flamegraph_path} ({sum(self._samples.values())} сэмплов)")
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser):
+    """Флаги профилирования, общие для скриптов разметки"""
+    group = parser.add_argument_group("профилирование")
+    group.add_argument('--profile', action='store_true', help="Время по стадиям прогона")
+    group.add_argument('--profile-memory', action='store_true', help="Пик памяти по стадиям (tracemalloc)")
+    group.add_argument('--profile-cprofile', metavar='FILE', default=None, help="Записать статистику cProfile")
+    group.add_argument('--profile-flamegraph', metavar='FILE', default=None,
+                       help="Записать collapsed stacks для flamegraph")
+
+
+def profiler_from_args(args):
+    """StageProfiler по флагам или пустой контекст, если профилирование не запрошено"""
+    if not (args.profile or args.profile_memory or args.profile_cprofile or args.profile_flamegraph):
+        return nullcontext()
+    return StageProfiler(
+        memory=args.profile_memory,
+        cprofile_path=args.profile_cprofile,
+        flamegraph_path=args.profile_flamegraph
+    )
@@ -0,0 +1,71 @@
+"""
+Ограничение частоты запросов к API (token bucket)
+Один лимитер на провайдера разделяется между всеми параллельными задачами
+"""
+
+import asyncio
+import threading
+import time
+
+
+class AsyncRateLimiter:
+    """Token bucket для asyncio: не больше rate запросов в секунду с допуском burst"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Args:
+            rate: Запросов в секунду (0 или None — без ограничения)
+            burst: Сколько запросов можно отправить подряд без ожидания
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Ждет, пока можно отправить следующий запрос"""
+        if not self.rate:
+            return
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class RateLimiter:
+    """Token bucket для пула потоков (scheduling.run_scheduled): не больше rate запросов в секунду"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Args:
+            rate: Запросов в секунду (0 или None — без ограничения)
+            burst: Сколько запросов можно отправить подряд без ожидания
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Блокирует поток, пока можно отправить следующий запрос"""
+        if not self.rate:
+            return
+
+        # Ожидание под блокировкой: потоки получают токены по очереди
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                time.sleep((1 - self._tokens) / self.rate)
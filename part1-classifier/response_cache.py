@@ -0,0 +1,49 @@
+"""
+Дисковый кэш ответов классификатора
+JSONL-файл: одна строка на ответ, ключ — канонический хэш промпта (provider, model, prompt).
+Уже полученные ответы не запрашиваются повторно между запусками.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+
+class ResponseCache:
+    """Кэш ответов с дозаписью в JSONL"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Оборванная последняя строка после аварийного завершения
+                        continue
+                    self._entries[record["key"]] = record["value"]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict]:
+        value = self._entries.get(key)
+        return dict(value) if value is not None else None
+
+    def put(self, key: str, value: Dict):
+        """Сохраняет ответ в памяти и сразу дописывает его в файл"""
+        with self._lock:
+            self._entries[key] = value
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "value": value}, ensure_ascii=False) + "\n")
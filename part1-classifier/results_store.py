@@ -0,0 +1,244 @@
+"""
+Хранилище результатов разметки (SQLite)
+Каждый прогон сохраняется отдельно с индексами по провайдеру, модели, хэшу промпта
+и ID примера — сравнение прогонов, поиск расхождений и метрики считаются запросами,
+а не ручным объединением results_<provider>.json.
+"""
+
+import argparse
+import json
+import sqlite3
+import time
+from typing import Dict, Iterable, List
+
+DEFAULT_DB_PATH = "results.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    provider TEXT NOT NULL,
+    model TEXT,
+    prompt_hash TEXT,
+    label TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_provider_model ON runs (provider, model, prompt_hash);
+CREATE INDEX IF NOT EXISTS idx_runs_prompt ON runs (prompt_hash);
+
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    example_id INTEGER NOT NULL,
+    assessment INTEGER NOT NULL,
+    ground_truth INTEGER,
+    error_type TEXT,
+    reasoning TEXT,
+    PRIMARY KEY (run_id, example_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_results_example ON results (example_id, run_id);
+"""
+
+
+class ResultsStore:
+    """Индексированное хранилище прогонов разметки"""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def add_run(self, results: Iterable[Dict], provider: str, model: str = None, prompt_hash: str = None,
+                label: str = None) -> int:
+        """
+        Сохраняет прогон
+
+        Args:
+            results: Результаты с полями id, assessment, ground_truth, error_type, reasoning
+            provider: Провайдер
+            model: Модель
+            prompt_hash: Хэш шаблона промпта (UniversalMathErrorClassifier.prompt_version())
+            label: Произвольная метка прогона
+
+        Returns:
+            run_id нового прогона
+        """
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (created_at, provider, model, prompt_hash, label) VALUES (?, ?, ?, ?, ?)",
+                (time.time(), provider, model, prompt_hash, label)
+            )
+            run_id = cursor.lastrowid
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (run_id, int(r["id"]), int(r["assessment"]),
+                     int(r["ground_truth"]) if r.get("ground_truth") is not None else None,
+                     r.get("error_type"), r.get("reasoning"))
+                    for r in results
+                )
+            )
+        return run_id
+
+    def import_json(self, path: str, label: str = None) -> int:
+        """Импорт results_<provider>.json, сохраненного скриптами разметки"""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return self.add_run(
+            data["results"], data.get("provider", "unknown"), data.get("model"),
+            data.get("prompt_hash"), label or path
+        )
+
+    def list_runs(self, provider: str = None, model: str = None, prompt_hash: str = None) -> List[Dict]:
+        """Прогоны с фильтрами по провайдеру, модели и хэшу промпта"""
+        query = "SELECT runs.*, COUNT(results.example_id) AS examples FROM runs LEFT JOIN results USING (run_id)"
+        conditions, params = [], []
+        for column, value in (("provider", provider), ("model", model), ("prompt_hash", prompt_hash)):
+            if value is not None:
+                conditions.append(f"runs.{column} = ?")
+                params.append(value)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " GROUP BY runs.run_id ORDER BY runs.run_id"
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def run_metrics(self, run_id: int) -> Dict:
+        """Метрики прогона по примерам с ground truth (в формате calculate_metrics)"""
+        row = self.conn.execute(
+            """
+            SELECT
+                SUM(assessment = 1 AND ground_truth = 1) AS tp,
+                SUM(assessment = 0 AND ground_truth = 0) AS tn,
+                SUM(assessment = 1 AND ground_truth = 0) AS fp,
+                SUM(assessment = 0 AND ground_truth = 1) AS fn,
+                SUM(assessment = -1) AS failed
+            FROM results WHERE run_id = ? AND ground_truth IS NOT NULL
+            """,
+            (run_id,)
+        ).fetchone()
+        tp, tn, fp, fn = (row[k] or 0 for k in ("tp", "tn", "fp", "fn"))
+
+        total = tp + tn + fp + fn
+        precision = tp / (tp + fp) if tp + fp else 0
+        recall = tp / (tp + fn) if tp + fn else 0
+        return {
+            "accuracy": (tp + tn) / total if total else 0,
+            "precision": precision,
+            "recall": recall,
+            "f1_score": 2 * precision * recall / (precision + recall) if precision + recall else 0,
+            "confusion_matrix": {
+                "true_positive": tp,
+                "true_negative": tn,
+                "false_positive": fp,
+                "false_negative": fn
+            },
+            "failed": row["failed"] or 0,
+        }
+
+    def flips(self, run_a: int, run_b: int) -> List[Dict]:
+        """Примеры, у которых оценка изменилась между двумя прогонами"""
+        rows = self.conn.execute(
+            """
+            SELECT a.example_id, a.assessment AS before, b.assessment AS after,
+                   COALESCE(a.ground_truth, b.ground_truth) AS ground_truth
+            FROM results a JOIN results b ON b.run_id = ? AND b.example_id = a.example_id
+            WHERE a.run_id = ? AND a.assessment != b.assessment
+            ORDER BY a.example_id
+            """,
+            (run_b, run_a)
+        )
+        return [dict(row) for row in rows]
+
+    def disagreements(self, run_ids: List[int]) -> List[Dict]:
+        """Примеры, по которым прогоны (например, разных провайдеров) расходятся"""
+        placeholders = ",".join("?" * len(run_ids))
+        rows = self.conn.execute(
+            f"""
+            SELECT example_id, GROUP_CONCAT(run_id || ':' || assessment) AS assessments,
+                   MAX(ground_truth) AS ground_truth
+            FROM results
+            WHERE run_id IN ({placeholders}) AND assessment != -1
+            GROUP BY example_id
+            HAVING COUNT(DISTINCT assessment) > 1
+            ORDER BY example_id
+            """,
+            run_ids
+        )
+        return [dict(row) for row in rows]
+
+
+def print_metrics(run_id: int, metrics: Dict):
+    print(f"Прогон {run_id}: accuracy {metrics['accuracy']:.2%}, precision {metrics['precision']:.2%}, "
+          f"recall {metrics['recall']:.2%}, F1 {metrics['f1_score']:.2%}, сбоев {metrics['failed']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Хранилище результатов разметки")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cmd = commands.add_parser("import", help="Импорт results_<provider>.json")
+    cmd.add_argument("files", nargs="+")
+    cmd.add_argument("--label", default=None)
+
+    cmd = commands.add_parser("runs", help="Список прогонов")
+    cmd.add_argument("--provider", default=None)
+    cmd.add_argument("--model", default=None)
+    cmd.add_argument("--prompt-hash", default=None)
+
+    cmd = commands.add_parser("metrics", help="Метрики прогонов")
+    cmd.add_argument("run_ids", type=int, nargs="+")
+
+    cmd = commands.add_parser("diff", help="Сравнение двух прогонов")
+    cmd.add_argument("run_a", type=int)
+    cmd.add_argument("run_b", type=int)
+
+    cmd = commands.add_parser("disagree", help="Примеры, по которым прогоны расходятся")
+    cmd.add_argument("run_ids", type=int, nargs="+")
+
+    args = parser.parse_args()
+    store = ResultsStore(args.db)
+    started = time.perf_counter()
+
+    if args.command == "import":
+        for path in args.files:
+            run_id = store.import_json(path, args.label)
+            print(f"[OK] {path} -> прогон {run_id}")
+
+    elif args.command == "runs":
+        for run in store.list_runs(args.provider, args.model, args.prompt_hash):
+            created = time.strftime("%Y-%m-%d %H:%M", time.localtime(run["created_at"]))
+            print(f"{run['run_id']:>5}  {created}  {run['provider']:<9} {run['model'] or '-':<28} "
+                  f"{(run['prompt_hash'] or '-')[:12]:<12}  {run['examples']:>7}  {run['label'] or ''}")
+
+    elif args.command == "metrics":
+        for run_id in args.run_ids:
+            print_metrics(run_id, store.run_metrics(run_id))
+
+    elif args.command == "diff":
+        flips = store.flips(args.run_a, args.run_b)
+        for run_id in (args.run_a, args.run_b):
+            print_metrics(run_id, store.run_metrics(run_id))
+        fixed = sum(f["after"] == f["ground_truth"] for f in flips if f["ground_truth"] is not None)
+        broken = sum(f["before"] == f["ground_truth"] for f in flips if f["ground_truth"] is not None)
+        print(f"\nИзменилось оценок: {len(flips)} (исправлено {fixed}, сломано {broken})")
+        for f in flips:
+            gt = f["ground_truth"] if f["ground_truth"] is not None else "-"
+            print(f"  ID {f['example_id']}: {f['before']} -> {f['after']} (ground truth: {gt})")
+
+    elif args.command == "disagree":
+        rows = store.disagreements(args.run_ids)
+        print(f"Расхождений: {len(rows)}")
+        for row in rows:
+            gt = row["ground_truth"] if row["ground_truth"] is not None else "-"
+            print(f"  ID {row['example_id']}: {row['assessments']} (ground truth: {gt})")
+
+    print(f"\n({(time.perf_counter() - started) * 1000:.1f} мс)")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,40 +2,16 @@
 Автоматический запуск разметки 45 примеров через Deepseek API
 """
 
-import pandas as pd
+import argparse
 import sys
 import os
 import time
 from universal_classifier import UniversalMathErrorClassifier, calculate_metrics
-import json
-
-def load_data(excel_path):
-    """Загружает данные из Excel файла"""
-    print(f"Загрузка данных из {excel_path}...")
-    df = pd.read_excel(excel_path, sheet_name='Рабочий лист 1')
-    print(f"Загружено строк: {len(df)}")
-    return df
-
-def prepare_examples(df):
-    """Подготавливает примеры для классификации"""
-    examples = []
-    for idx, row in df.iterrows():
-        if pd.isna(row.get('problem_statement')) or pd.isna(row.get('R1_REPLICA_OUT')):
-            continue
-
-        example = {
-            'id': int(row.get('id', idx + 1)) if not pd.isna(row.get('id')) else idx + 1,
-            'task_text': str(row.get('problem_statement', '')),
-            'dialogue_history': str(row.get('full_dialog_student', '')),
-            'ai_response': str(row.get('R1_REPLICA_OUT', '')),
-            'ground_truth': row.get('Ground truth') if 'Ground truth' in row and not pd.isna(row.get('Ground truth')) else None
-        }
-        examples.append(example)
-
-    print(f"[OK] Подготовлено примеров: {len(examples)}")
-    return examples
+from annotate import load_data, prepare_examples, save_results
+from profiling import add_profile_arguments, profiler_from_args, stage
+from cassette import Cassette, CassetteMissError
 
-def annotate_examples(examples, classifier):
+def annotate_examples(examples, classifier, delay=2):
     """Размечает примеры с помощью классификатора"""
     print("\n" + "=" * 80)
     print("НАЧАЛО РАЗМЕТКИ")
@@ -69,8 +45,9 @@ def annotate_examples(examples, classifier):
             print(f"    Ground truth: {example['ground_truth']} {match}")
 
         # Задержка между запросами чтобы избежать rate limiting
-        if i < len(examples):
-            time.sleep(2)
+        if delay and i < len(examples):
+            with stage("delay"):
+                time.sleep(delay)
 
     print("\n" + "=" * 80)
     print("[DONE] РАЗМЕТКА ЗАВЕРШЕНА!")
@@ -78,49 +55,23 @@ def annotate_examples(examples, classifier):
 
     return results
 
-def save_results(results, metrics, output_dir, provider):
-    """Сохраняет результаты"""
-    output_file = os.path.join(output_dir, f'results_{provider}.json')
-    output_data = {
-        'provider': provider,
-        'total_examples': len(results),
-        'metrics': metrics,
-        'results': results
-    }
-
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
-
-    print(f"\n Результаты сохранены в {output_file}")
-
-    table_file = os.path.join(output_dir, f'results_table_{provider}.md')
-    with open(table_file, 'w', encoding='utf-8') as f:
-        f.write(f"# Результаты разметки (провайдер: {provider.upper()})\n\n")
-
-        if metrics:
-            f.write("## Метрики качества\n\n")
-            f.write(f"- **Accuracy**: {metrics['accuracy']:.2%}\n")
-            f.write(f"- **Precision**: {metrics['precision']:.2%}\n")
-            f.write(f"- **Recall**: {metrics['recall']:.2%}\n")
-            f.write(f"- **F1-Score**: {metrics['f1_score']:.2%}\n\n")
-            f.write("### Confusion Matrix\n\n")
-            f.write(f"- True Positive: {metrics['confusion_matrix']['true_positive']}\n")
-            f.write(f"- True Negative: {metrics['confusion_matrix']['true_negative']}\n")
-            f.write(f"- False Positive: {metrics['confusion_matrix']['false_positive']}\n")
-            f.write(f"- False Negative: {metrics['confusion_matrix']['false_negative']}\n\n")
-
-        f.write("## Результаты разметки\n\n")
-        f.write("| ID | Оценка | Краткое пояснение | Тип ошибки |\n")
-        f.write("|----|--------|-------------------|------------|\n")
-
-        for r in results:
-            error_type = r['error_type'] if r['error_type'] else '-'
-            reasoning = r['reasoning'].replace('|', '\\|')[:150]
-            f.write(f"| {r['id']} | {r['assessment']} | {reasoning} | {error_type} |\n")
-
-    print(f" Таблица сохранена в {table_file}")
-
 def main():
+    parser = argparse.ArgumentParser(description="Автоматическая разметка через Deepseek")
+    parser.add_argument('--dry-run', action='store_true', help="Только прогноз времени и стоимости, без вызовов API")
+    parser.add_argument('--budget', type=float, default=None, help="Бюджет прогона в USD для dry-run")
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument('--record', metavar='CASSETTE', help="Записать ответы API в кассету (.jsonl.gz)")
+    cassette_group.add_argument('--replay', metavar='CASSETTE', help="Воспроизвести ответы из кассеты, без сети")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    with profiler_from_args(args):
+        run(args)
+
+
+def run(args):
+    """Прогон разметки по аргументам командной строки"""
+
     print("\n" + "=" * 80)
     print(" АВТОМАТИЧЕСКАЯ РАЗМЕТКА 45 ПРИМЕРОВ")
     print(" Провайдер: Deepseek через Artemox прокси")
@@ -133,23 +84,44 @@ def main():
         return
 
     # Загрузка данных
-    df = load_data(excel_path)
-    examples = prepare_examples(df)
+    with stage("load"):
+        df = load_data(excel_path)
+    with stage("prepare"):
+        examples = prepare_examples(df)
 
     if len(examples) == 0:
         print("[ERROR] Не найдено примеров для разметки")
         return
 
+    if args.dry_run:
+        from cost_planner import plan_run, print_plan
+        # Последовательные запросы с паузой 2 с между ними (см. annotate_examples)
+        print_plan(plan_run(examples, 'deepseek', delay_s=2, budget_usd=args.budget))
+        return
+
+    cassette = None
+    if args.record:
+        cassette = Cassette(args.record, mode='record')
+        print(f"\n Запись ответов API в кассету {args.record}")
+    elif args.replay:
+        cassette = Cassette(args.replay, mode='replay')
+        print(f"\n Воспроизведение из кассеты {args.replay} ({len(cassette)} записей)")
+
     # Инициализация классификатора с Artemox прокси
     print("\n Инициализация Deepseek через Artemox прокси...")
     classifier = UniversalMathErrorClassifier(
         provider='deepseek',
         api_key=os.environ.get('DEEPSEEK_API_KEY'),
-        base_url='https://api.artemox.com/v1'
+        base_url='https://api.artemox.com/v1',
+        cassette=cassette
     )
 
-    # Разметка
-    results = annotate_examples(examples, classifier)
+    # Разметка (при воспроизведении rate limiting не нужен)
+    try:
+        results = annotate_examples(examples, classifier, delay=0 if args.replay else 2)
+    except CassetteMissError as e:
+        print(f"\n[X] {e.args[0]}. Промпт или параметры изменились после записи: перезапишите кассету (--record)")
+        sys.exit(1)
 
     # Расчет метрик
     labeled_results = [r for r in results if r['ground_truth'] is not None]
@@ -158,7 +130,8 @@ def main():
         predictions = [r['assessment'] for r in labeled_results]
         ground_truth = [int(r['ground_truth']) for r in labeled_results]
 
-        metrics = calculate_metrics(predictions, ground_truth)
+        with stage("metrics"):
+            metrics = calculate_metrics(predictions, ground_truth)
 
         print("\n" + "=" * 80)
         print(" МЕТРИКИ КАЧЕСТВА")
@@ -178,7 +151,8 @@ def main():
 
     # Сохранение
     output_dir = os.path.dirname(os.path.abspath(__file__))
-    save_results(results, metrics, output_dir, 'deepseek')
+    with stage("save"):
+        save_results(results, metrics, output_dir, 'deepseek', classifier.model, classifier.prompt_version())
 
     print("\n" + "=" * 80)
     print("[DONE] ГОТОВО! Все результаты сохранены.")
@@ -0,0 +1,285 @@
+"""
+Выборочная оценка с доверительными интервалами
+Вместо разметки всего листа классифицируется стратифицированная выборка
+(по Ground truth, задаче и длине диалога). Выборка добирается раундами, пока
+доверительный интервал целевой метрики не станет уже заданного или не кончится бюджет.
+"""
+
+import argparse
+import random
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from universal_classifier import UniversalMathErrorClassifier
+
+METRICS = ("accuracy", "precision", "recall", "f1_score")
+
+
+def length_bucket(example: Dict, bounds: Tuple[int, int]) -> str:
+    """Короткий / средний / длинный диалог по терцилям длины"""
+    length = len(example["dialogue_history"])
+    if length <= bounds[0]:
+        return "short"
+    if length <= bounds[1]:
+        return "medium"
+    return "long"
+
+
+def build_strata(examples: List[Dict], by_task: bool = False) -> Dict[Tuple, List[Dict]]:
+    """
+    Разбиение размеченных примеров на страты (ground truth, [задача], длина диалога)
+
+    Args:
+        examples: Примеры с ground_truth
+        by_task: Учитывать текст задачи (имеет смысл, если задачи повторяются)
+    """
+    lengths = sorted(len(e["dialogue_history"]) for e in examples)
+    bounds = (lengths[len(lengths) // 3], lengths[2 * len(lengths) // 3])
+
+    strata = defaultdict(list)
+    for example in examples:
+        key = (int(example["ground_truth"]),)
+        if by_task:
+            key += (example["task_text"].strip().lower(),)
+        key += (length_bucket(example, bounds),)
+        strata[key].append(example)
+    return dict(strata)
+
+
+def allocate(strata: Dict[Tuple, List[Dict]], remaining: Dict[Tuple, List[Dict]], size: int,
+             rng: random.Random) -> List[Tuple[Tuple, Dict]]:
+    """
+    Пропорциональное размещение раунда по стратам (метод наибольших остатков)
+    Еще не тронутые страты получают по одному примеру (крупные — первыми), пока позволяет
+    размер раунда; всего выбирается не больше size примеров
+    """
+    total = sum(len(items) for items in strata.values())
+    quotas = {key: size * len(strata[key]) / total for key in strata}
+    counts = {key: min(int(q), len(remaining[key])) for key, q in quotas.items()}
+
+    leftover = size - sum(counts.values())
+    for key in sorted(strata, key=lambda k: quotas[k], reverse=True):
+        if leftover <= 0:
+            break
+        if counts[key] == 0 and remaining[key] and len(remaining[key]) == len(strata[key]):
+            counts[key] = 1
+            leftover -= 1
+
+    for key in sorted(strata, key=lambda k: quotas[k] - int(quotas[k]), reverse=True):
+        if leftover <= 0:
+            break
+        if counts[key] < len(remaining[key]):
+            counts[key] += 1
+            leftover -= 1
+
+    drawn = []
+    for key, count in counts.items():
+        rng.shuffle(remaining[key])
+        for _ in range(count):
+            drawn.append((key, remaining[key].pop()))
+    return drawn
+
+
+def weighted_metrics(sample: Dict[Tuple, List[Tuple[int, int]]], sizes: Dict[Tuple, int]) -> Dict:
+    """
+    Метрики по взвешенной матрице ошибок: пример страты h весит N_h / n_h
+
+    Args:
+        sample: Страта -> список (предсказание, ground truth)
+        sizes: Страта -> размер страты в генеральной совокупности
+    """
+    tp = tn = fp = fn = 0.0
+    for key, pairs in sample.items():
+        if not pairs:
+            continue
+        weight = sizes[key] / len(pairs)
+        for p, g in pairs:
+            if p == 1 and g == 1:
+                tp += weight
+            elif p == 0 and g == 0:
+                tn += weight
+            elif p == 1:
+                fp += weight
+            else:
+                fn += weight
+    return _metrics(tp, tn, fp, fn)
+
+
+def _metrics(tp: float, tn: float, fp: float, fn: float) -> Dict:
+    total = tp + tn + fp + fn
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    return {
+        "accuracy": (tp + tn) / total if total else 0.0,
+        "precision": precision,
+        "recall": recall,
+        "f1_score": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+    }
+
+
+def posterior_intervals(sample: Dict[Tuple, List[Tuple[int, int]]], sizes: Dict[Tuple, int],
+                        rng: random.Random, replicates: int = 1000, confidence: float = 0.95) -> Dict:
+    """
+    Интервалы метрик классификатора на примерах выбранных страт (конечная совокупность)
+
+    Ground truth внутри страты один, поэтому ошибки страты — число неверно классифицированных
+    примеров. Размеченные n_h примеров известны точно, случайна только доля ошибок среди
+    N_h - n_h неразмеченных: ее разброс берется из Beta(ошибок + 1/2, верных + 1/2)
+    (априорное Джеффриса — интервал не схлопывается на 1-2 примерах без ошибок), а центр
+    сдвигается к доле ошибок выборки, чтобы интервал строился вокруг оценки weighted_metrics.
+    При n_h == N_h страта не вносит неопределенности; полностью размеченная выборка дает
+    интервал нулевой ширины.
+
+    Страты без размеченных примеров не участвуют ни в оценке, ни в интервале: интервал
+    относится только к совокупности выбранных страт (sampled_evaluation не останавливается,
+    пока такие страты есть).
+    """
+    draws = {metric: [] for metric in METRICS}
+    strata = []
+    for key, pairs in sample.items():
+        if not pairs:
+            continue
+        wrong = sum(p != g for p, g in pairs)
+        right = len(pairs) - wrong
+        # Сдвиг: апостериорное среднее доли ошибок -> доля ошибок в выборке
+        shift = wrong / len(pairs) - (wrong + 0.5) / (len(pairs) + 1)
+        strata.append((key[0], sizes[key], wrong, right, sizes[key] - len(pairs), shift))
+
+    for _ in range(replicates):
+        tp = tn = fp = fn = 0.0
+        for truth, size, wrong, right, unlabelled, shift in strata:
+            errors = wrong
+            if unlabelled:
+                error_rate = min(max(rng.betavariate(wrong + 0.5, right + 0.5) + shift, 0.0), 1.0)
+                errors += unlabelled * error_rate
+            if truth == 1:
+                tp += size - errors
+                fn += errors
+            else:
+                tn += size - errors
+                fp += errors
+        values = _metrics(tp, tn, fp, fn)
+        for metric in METRICS:
+            draws[metric].append(values[metric])
+
+    alpha = (1 - confidence) / 2
+    intervals = {}
+    for metric, values in draws.items():
+        values.sort()
+        intervals[metric] = (values[int(alpha * (replicates - 1))], values[int((1 - alpha) * (replicates - 1))])
+    return intervals
+
+
+def sampled_evaluation(examples: List[Dict], classifier: UniversalMathErrorClassifier, target_metric: str = "f1_score",
+                       target_width: float = 0.2, round_size: int = 10, budget: int = None,
+                       by_task: bool = False, concurrency: int = None, seed: int = 42) -> List[Dict]:
+    """
+    Раунды выборочной оценки до нужной ширины интервала или исчерпания бюджета
+
+    Args:
+        examples: Примеры (используются только с ground_truth)
+        classifier: Классификатор
+        target_metric: Метрика, по ширине интервала которой принимается решение об остановке
+        target_width: Целевая ширина 95% доверительного интервала
+        round_size: Примеров на раунд
+        budget: Максимум вызовов классификатора (None — без ограничения)
+        by_task: Стратифицировать также по тексту задачи
+        concurrency: Параллельность запросов внутри раунда
+        seed: Seed выборки и розыгрыша интервалов
+
+    Returns:
+        Отчеты по раундам: размер выборки, оценки и интервалы
+    """
+    rng = random.Random(seed)
+    labelled = [e for e in examples if e.get("ground_truth") is not None]
+    strata = build_strata(labelled, by_task)
+    sizes = {key: len(items) for key, items in strata.items()}
+    remaining = {key: list(items) for key, items in strata.items()}
+    sample = {key: [] for key in strata}
+    spent = 0
+    rounds = []
+
+    while any(remaining.values()):
+        size = round_size if budget is None else min(round_size, budget - spent)
+        if size <= 0:
+            break
+
+        drawn = allocate(strata, remaining, size, rng)
+        results = classifier.classify_batch([e for _, e in drawn], verbose=False, concurrency=concurrency)
+        spent += len(drawn)
+        for (key, example), result in zip(drawn, results):
+            if result["assessment"] != -1:
+                sample[key].append((result["assessment"], int(example["ground_truth"])))
+
+        estimates = weighted_metrics(sample, sizes)
+        intervals = posterior_intervals(sample, sizes, rng)
+        low, high = intervals[target_metric]
+        # Страты, где еще нет ни одного размеченного примера, но есть что выбрать
+        unsampled = [key for key in strata if not sample[key] and remaining[key]]
+        report = {
+            "round": len(rounds) + 1,
+            "sampled": spent,
+            "population": len(labelled),
+            "estimates": estimates,
+            "intervals": intervals,
+            "target_width": high - low,
+            "unsampled_strata": len(unsampled),
+        }
+        rounds.append(report)
+        print_round(report, target_metric)
+
+        if high - low <= target_width and not unsampled:
+            print(f"[DONE] Ширина интервала {target_metric} {high - low:.3f} <= {target_width}")
+            break
+    else:
+        print("[DONE] Размечены все примеры — оценки точные")
+
+    if budget is not None and spent >= budget:
+        print(f"[X] Бюджет {budget} вызовов исчерпан")
+    return rounds
+
+
+def print_round(report: Dict, target_metric: str):
+    """Печать оценок раунда"""
+    print(f"\nРаунд {report['round']}: выборка {report['sampled']}/{report['population']}")
+    if report["unsampled_strata"]:
+        print(f"  Страт без примеров: {report['unsampled_strata']} — оценки только по выбранным стратам")
+    for metric in METRICS:
+        low, high = report["intervals"][metric]
+        marker = " <-" if metric == target_metric else ""
+        print(f"  {metric:<10} {report['estimates'][metric]:.2%}  [{low:.2%}; {high:.2%}]{marker}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Выборочная оценка промпта/модели с доверительными интервалами")
+    parser.add_argument("--provider", default="deepseek")
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--base-url", default=None)
+    parser.add_argument("--excel", default="../31.xlsx")
+    parser.add_argument("--metric", default="f1_score", choices=METRICS)
+    parser.add_argument("--width", type=float, default=0.2, help="Целевая ширина 95%% интервала")
+    parser.add_argument("--round-size", type=int, default=10)
+    parser.add_argument("--budget", type=int, default=None, help="Максимум вызовов API")
+    parser.add_argument("--by-task", action="store_true", help="Стратифицировать также по тексту задачи")
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from annotate import load_data, prepare_examples
+
+    examples = prepare_examples(load_data(args.excel))
+    classifier = UniversalMathErrorClassifier(provider=args.provider, model=args.model, base_url=args.base_url)
+    sampled_evaluation(
+        examples, classifier,
+        target_metric=args.metric,
+        target_width=args.width,
+        round_size=args.round_size,
+        budget=args.budget,
+        by_task=args.by_task,
+        concurrency=args.concurrency,
+        seed=args.seed
+    )
+
+
+if __name__ == "__main__":
+    main()
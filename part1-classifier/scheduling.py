@@ -0,0 +1,78 @@
+"""
+Планирование пакетной классификации по оценке размера промпта
+Длинные диалоги отправляются первыми (LPT, longest processing time first), чтобы
+в конце прогона не оставался хвост из нескольких долгих запросов при простаивающем пуле.
+Результаты всегда возвращаются в исходном порядке примеров.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List
+
+
+def estimate_example_size(example: Dict) -> int:
+    """
+    Оценка размера промпта примера в токенах: основной вклад дает история
+    диалога (full_dialog_student); кириллица — ~2.5 символа на токен
+    """
+    chars = (len(example.get("dialogue_history", ""))
+             + len(example.get("task_text", ""))
+             + len(example.get("ai_response", "")))
+    return int(chars / 2.5)
+
+
+def dispatch_order(examples: List[Dict], strategy: str = "longest_first") -> List[int]:
+    """
+    Порядок отправки примеров
+
+    Args:
+        examples: Примеры для классификации
+        strategy: longest_first — по убыванию оценки размера; fifo — как есть
+
+    Returns:
+        Индексы примеров в порядке отправки
+    """
+    indices = list(range(len(examples)))
+    if strategy == "fifo":
+        return indices
+    if strategy == "longest_first":
+        # sorted устойчив: примеры равного размера сохраняют исходный порядок
+        return sorted(indices, key=lambda i: estimate_example_size(examples[i]), reverse=True)
+    raise ValueError(f"Неизвестная стратегия: {strategy}. Поддерживаются: longest_first, fifo")
+
+
+def run_scheduled(examples: List[Dict], fn: Callable[[Dict], Dict], concurrency: int = 1,
+                  strategy: str = "longest_first", on_done: Callable[[int, Dict, Dict], None] = None) -> List[Dict]:
+    """
+    Выполняет fn для каждого примера в пуле потоков в порядке dispatch_order
+
+    Args:
+        examples: Примеры
+        fn: Функция example -> результат
+        concurrency: Размер пула
+        strategy: Стратегия порядка отправки (см. dispatch_order)
+        on_done: Колбэк (индекс, пример, результат) по мере завершения
+
+    Returns:
+        Результаты в исходном порядке examples
+    """
+    results = [None] * len(examples)
+
+    if concurrency <= 1:
+        # Последовательно порядок не влияет на общее время — идем как есть
+        for i in range(len(examples)):
+            results[i] = fn(examples[i])
+            if on_done:
+                on_done(i, examples[i], results[i])
+        return results
+
+    order = dispatch_order(examples, strategy)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # Пул берет задачи из очереди в порядке submit, поэтому порядок отправки сохраняется
+        futures = {pool.submit(fn, examples[i]): i for i in order}
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i] = future.result()
+            if on_done:
+                on_done(i, examples[i], results[i])
+
+    return results
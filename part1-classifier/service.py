@@ -0,0 +1,305 @@
+"""
+HTTP-сервис онлайн-проверки реплик ИИ-репетитора
+Запросы проходят через асинхронную очередь с микро-батчингом:
+кэш, склейка одинаковых промптов внутри батча и ограничение параллельных вызовов API
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from flask import Flask, request, jsonify
+from universal_classifier import UniversalMathErrorClassifier
+
+
+class QueueFullError(Exception):
+    """Очередь запросов переполнена — клиенту нужно повторить запрос позже"""
+
+
+class MicroBatcher:
+    """Асинхронная очередь классификации с микро-батчингом"""
+
+    def __init__(self, classifier: UniversalMathErrorClassifier, max_queue: int = 256,
+                 batch_window_ms: float = 5.0, max_batch_size: int = 16,
+                 max_concurrency: int = 8, cache_size: int = 4096):
+        """
+        Инициализация очереди
+
+        Args:
+            classifier: Классификатор, которому передаются запросы
+            max_queue: Максимум принятых, но еще не обработанных запросов (сверх — QueueFullError)
+            batch_window_ms: Окно накопления батча в миллисекундах
+            max_batch_size: Максимальный размер батча
+            max_concurrency: Максимальное число одновременных вызовов API
+            cache_size: Размер LRU-кэша готовых результатов
+        """
+        self.classifier = classifier
+        self.max_queue = max_queue
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self.cache_size = cache_size
+
+        self._cache = OrderedDict()
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self._stats = {
+            "requests": 0,
+            "completed": 0,
+            "rejected": 0,
+            "errors": 0,
+            "cache_hits": 0,
+            "packed": 0,
+            "api_calls": 0,
+            "batches": 0,
+            "batched_items": 0,
+        }
+
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name="micro-batcher", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        """Цикл событий фонового потока"""
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._loop.create_task(self._batch_loop())
+        self._ready.set()
+        self._loop.run_forever()
+
+    def submit(self, task_text: str, dialogue_history: str, ai_response: str,
+               timeout: float = 120.0) -> Dict:
+        """
+        Ставит запрос в очередь и ждет результата (вызывается из потоков Flask)
+
+        Returns:
+            Dict с полями: assessment (0/1), reasoning, error_type
+
+        Raises:
+            QueueFullError: если очередь переполнена
+        """
+        self._count("requests")
+        started = time.perf_counter()
+
+        future = asyncio.run_coroutine_threadsafe(
+            self._enqueue((task_text, dialogue_history, ai_response)), self._loop
+        )
+        try:
+            result = future.result(timeout)
+        except QueueFullError:
+            self._count("rejected")
+            raise
+
+        with self._lock:
+            self._stats["completed"] += 1
+            self._latencies.append(time.perf_counter() - started)
+            if result["assessment"] == -1:
+                self._stats["errors"] += 1
+
+        return result
+
+    async def _enqueue(self, payload: Tuple[str, str, str]) -> Dict:
+        """Принимает запрос, если есть место, и ждет его обработки"""
+        # Считаем и ожидающие в очереди, и уже отправленные в API запросы,
+        # иначе очередь быстро переливается в задачи, ждущие семафор
+        if self._pending >= self.max_queue:
+            raise QueueFullError(f"Очередь переполнена ({self.max_queue} запросов)")
+
+        waiter = self._loop.create_future()
+        self._pending += 1
+        try:
+            self._queue.put_nowait((payload, waiter))
+            return await waiter
+        finally:
+            self._pending -= 1
+
+    async def _batch_loop(self):
+        """Собирает запросы в батчи в пределах окна batch_window"""
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.batch_window
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            with self._lock:
+                self._stats["batches"] += 1
+                self._stats["batched_items"] += len(batch)
+
+            # Следующий батч собирается, пока текущий ждет API
+            self._loop.create_task(self._process_batch(batch))
+
+    async def _process_batch(self, batch: List[Tuple[Tuple[str, str, str], asyncio.Future]]):
+        """Отвечает из кэша, склеивает одинаковые промпты и вызывает API для остальных"""
+        try:
+            pending = OrderedDict()
+
+            for payload, waiter in batch:
+                key = self.classifier.cache_key(self.classifier.build_prompt(*payload))
+                cached = self._cache_get(key)
+                if cached is not None:
+                    self._count("cache_hits")
+                    waiter.set_result(dict(cached))
+                    continue
+                if key in pending:
+                    self._count("packed")
+                    pending[key][1].append(waiter)
+                else:
+                    pending[key] = (payload, [waiter])
+
+            await asyncio.gather(*(
+                self._call(key, payload, waiters) for key, (payload, waiters) in pending.items()
+            ))
+        except Exception as error:
+            # Иначе ожидающие запросы батча висели бы до таймаута submit
+            for _, waiter in batch:
+                if not waiter.done():
+                    waiter.set_exception(error)
+
+    async def _call(self, key: str, payload: Tuple[str, str, str], waiters: List[asyncio.Future]):
+        """Один вызов API на группу одинаковых запросов"""
+        async with self._semaphore:
+            self._count("api_calls")
+            result = await self._loop.run_in_executor(self._executor, self.classifier.classify, *payload)
+
+        # Ошибки API не кэшируем, чтобы повторный запрос мог пройти
+        if result.get("assessment") != -1:
+            self._cache_put(key, result)
+
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(dict(result))
+
+    def _cache_get(self, key: str):
+        with self._lock:
+            if key not in self._cache:
+                return None
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+    def _cache_put(self, key: str, result: Dict):
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self._stats[name] += value
+
+    def queue_size(self) -> int:
+        """Число принятых, но еще не обработанных запросов"""
+        return self._pending
+
+    def metrics(self) -> Dict:
+        """Снимок счетчиков и латентности"""
+        with self._lock:
+            stats = dict(self._stats)
+            latencies = sorted(self._latencies)
+            cache_entries = len(self._cache)
+
+        def percentile(q):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+
+        stats.update({
+            "queue_size": self.queue_size(),
+            "queue_capacity": self.max_queue,
+            "cache_entries": cache_entries,
+            "avg_batch_size": stats["batched_items"] / stats["batches"] if stats["batches"] else 0,
+            "latency_ms_p50": percentile(0.5),
+            "latency_ms_p95": percentile(0.95),
+            "latency_ms_max": latencies[-1] * 1000 if latencies else None,
+        })
+        return stats
+
+
+app = Flask(__name__)
+app.config['JSON_AS_ASCII'] = False
+
+# Глобальные экземпляры классификатора и очереди
+classifier = UniversalMathErrorClassifier(
+    provider=os.environ.get('CLASSIFIER_PROVIDER', 'deepseek'),
+    model=os.environ.get('CLASSIFIER_MODEL'),
+    base_url=os.environ.get('CLASSIFIER_BASE_URL')
+)
+batcher = MicroBatcher(
+    classifier,
+    max_queue=int(os.environ.get('SERVICE_MAX_QUEUE', 256)),
+    batch_window_ms=float(os.environ.get('SERVICE_BATCH_WINDOW_MS', 5)),
+    max_batch_size=int(os.environ.get('SERVICE_MAX_BATCH', 16)),
+    max_concurrency=int(os.environ.get('SERVICE_MAX_CONCURRENCY', 8))
+)
+
+
+@app.route('/api/check-reply', methods=['POST'])
+def check_reply():
+    """API endpoint для проверки последней реплики репетитора"""
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Тело запроса должно быть JSON-объектом'}), 400
+
+        task_text = data.get('task_text')
+        ai_response = data.get('ai_response')
+        dialogue_history = data.get('dialogue_history', '')
+
+        # Валидация
+        if not task_text or not ai_response:
+            return jsonify({'error': 'Поля task_text и ai_response обязательны'}), 400
+
+        result = batcher.submit(str(task_text), str(dialogue_history), str(ai_response))
+
+        return jsonify({
+            'success': result['assessment'] != -1,
+            'result': result
+        })
+
+    except QueueFullError as e:
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = '1'
+        return response, 429
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/health', methods=['GET'])
+def health():
+    """Проверка живости сервиса"""
+    return jsonify({
+        'status': 'ok',
+        'provider': classifier.provider,
+        'model': classifier.model,
+        'queue_size': batcher.queue_size()
+    })
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Счетчики очереди, кэша, латентности и singleflight классификатора"""
+    data = batcher.metrics()
+    data.update(classifier.telemetry())
+    return jsonify(data)
+
+
+if __name__ == '__main__':
+    # В продакшене использовать gunicorn с потоками: gunicorn -k gthread --threads 32 -w 1 service:app
+    app.run(host='0.0.0.0', port=int(os.environ.get('SERVICE_PORT', 5001)), threaded=True)
@@ -0,0 +1,84 @@
+"""
+Singleflight: склейка одинаковых одновременных запросов
+Пока запрос с данным ключом выполняется, повторные вызовы с тем же ключом
+не идут в API, а ждут результата первого
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict
+
+
+class SingleFlight:
+    """Реестр выполняющихся запросов по ключу (общий для sync и async вызовов)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._stats = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    def _join(self, key: str):
+        """Возвращает (future, is_leader): лидер выполняет запрос, остальные ждут"""
+        with self._lock:
+            self._stats["calls"] += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                self._stats["coalesced"] += 1
+                return future, False
+
+            future = Future()
+            self._in_flight[key] = future
+            self._stats["executions"] += 1
+            return future, True
+
+    def _finish(self, key: str, future: Future, fn: Callable):
+        """Выполняет fn и раздает результат всем ожидающим"""
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def do(self, key: str, fn: Callable):
+        """
+        Синхронный вызов: выполняет fn или присоединяется к уже идущему вызову
+
+        Args:
+            key: Ключ запроса (например, хэш промпта)
+            fn: Функция без аргументов, выполняющая запрос
+
+        Returns:
+            Результат fn (общий для всех склеенных вызовов)
+        """
+        future, is_leader = self._join(key)
+        if is_leader:
+            self._finish(key, future, fn)
+        return future.result()
+
+    async def ado(self, key: str, fn: Callable):
+        """
+        Асинхронный вызов: блокирующая fn выполняется в отдельном потоке,
+        ожидающие вызовы не занимают потоки
+
+        Args:
+            key: Ключ запроса (например, хэш промпта)
+            fn: Блокирующая функция без аргументов, выполняющая запрос
+
+        Returns:
+            Результат fn (общий для всех склеенных вызовов)
+        """
+        future, is_leader = self._join(key)
+        if is_leader:
+            await asyncio.to_thread(self._finish, key, future, fn)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict:
+        """Счетчики вызовов и доля склеенных запросов"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._in_flight)
+        stats["coalescing_rate"] = stats["coalesced"] / stats["calls"] if stats["calls"] else 0.0
+        return stats
@@ -0,0 +1,164 @@
+"""
+Подбор порога и калибровки для режима logprob
+1. --score: один раз прогоняет размеченный лист и сохраняет сырые P(ошибка)
+2. Без --score: перебирает пороги по сохраненным вероятностям без повторных вызовов API
+"""
+
+import argparse
+import json
+import math
+from typing import Dict, List, Tuple
+
+from universal_classifier import UniversalMathErrorClassifier, calculate_metrics, platt_scale, sigmoid
+
+
+def score_examples(examples: List[Dict], classifier: UniversalMathErrorClassifier) -> List[Dict]:
+    """Сырые P(ошибка) для размеченных примеров (без калибровки)"""
+    scores = []
+    for i, example in enumerate(examples, 1):
+        if example.get("ground_truth") is None:
+            continue
+        result = classifier.classify(example["task_text"], example["dialogue_history"], example["ai_response"])
+        if result["assessment"] == -1:
+            continue
+        print(f"[{i}/{len(examples)}] ID {example['id']}: P(ошибка) = {result['probability']:.3f}")
+        scores.append({
+            "id": example["id"],
+            "probability": result["probability"],
+            "ground_truth": int(example["ground_truth"]),
+        })
+    return scores
+
+
+def _softplus(z: float) -> float:
+    """log(1 + exp(z)) без переполнения"""
+    return max(z, 0.0) + math.log1p(math.exp(-abs(z)))
+
+
+def fit_platt(probabilities: List[float], labels: List[int], iterations: int = 100) -> Tuple[float, float]:
+    """
+    Калибровка Платта: P = sigmoid(a * logit(p) + b)
+
+    Метод Ньютона с возвратом по шагу (Lin, Lin, Weng, 2007): каждый шаг уменьшает
+    логистическую потерю, поэтому на уверенных и разделимых оценках коэффициенты не уходят
+    в разнос и не переворачивают порядок; сигмоида и потеря считаются без переполнения.
+
+    Returns:
+        Коэффициенты (a, b)
+    """
+    clipped = [min(max(p, 1e-6), 1 - 1e-6) for p in probabilities]
+    xs = [math.log(p / (1 - p)) for p in clipped]
+    # Сглаженные метки (Platt, 1999) против переобучения на малых выборках
+    positives = sum(labels)
+    negatives = len(labels) - positives
+    targets = [(positives + 1) / (positives + 2) if y == 1 else 1 / (negatives + 2) for y in labels]
+
+    def loss(a: float, b: float) -> float:
+        return sum(_softplus(a * x + b) - t * (a * x + b) for x, t in zip(xs, targets))
+
+    # Старт — только априорная доля ошибок (a = 0), как у Lin, Lin, Weng
+    a, b = 0.0, math.log((positives + 1) / (negatives + 1))
+    value = loss(a, b)
+    for _ in range(iterations):
+        g_a = g_b = 0.0
+        h_aa = h_ab = h_bb = 1e-12  # регуляризация гессиана
+        for x, t in zip(xs, targets):
+            p = sigmoid(a * x + b)
+            w = p * (1 - p)
+            g_a += (p - t) * x
+            g_b += p - t
+            h_aa += w * x * x
+            h_ab += w * x
+            h_bb += w
+        if abs(g_a) < 1e-5 and abs(g_b) < 1e-5:
+            break
+        det = h_aa * h_bb - h_ab * h_ab
+        step_a = -(h_bb * g_a - h_ab * g_b) / det
+        step_b = -(h_aa * g_b - h_ab * g_a) / det
+        decrease = g_a * step_a + g_b * step_b
+
+        # Возврат по шагу: половиним шаг, пока потеря не уменьшится достаточно (условие Армихо)
+        size = 1.0
+        while size >= 1e-10:
+            new_a, new_b = a + size * step_a, b + size * step_b
+            new_value = loss(new_a, new_b)
+            if new_value < value + 1e-4 * size * decrease:
+                a, b, value = new_a, new_b, new_value
+                break
+            size /= 2
+        else:
+            break  # шаг не уменьшает потерю — дальше не сдвинуться
+    return a, b
+
+
+def sweep(probabilities: List[float], labels: List[int], thresholds: List[float]) -> List[Dict]:
+    """Precision/recall/F1 для каждого порога"""
+    rows = []
+    for threshold in thresholds:
+        predictions = [int(p >= threshold) for p in probabilities]
+        metrics = calculate_metrics(predictions, labels)
+        rows.append({
+            "threshold": threshold,
+            "accuracy": metrics["accuracy"],
+            "precision": metrics["precision"],
+            "recall": metrics["recall"],
+            "f1_score": metrics["f1_score"],
+            "flagged": sum(predictions),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Подбор порога для режима logprob")
+    parser.add_argument("scores", nargs="?", default="scores_deepseek.json", help="Файл с сохраненными P(ошибка)")
+    parser.add_argument("--score", action="store_true", help="Сначала прогнать лист и сохранить вероятности")
+    parser.add_argument("--provider", default="deepseek")
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--base-url", default=None)
+    parser.add_argument("--excel", default="../31.xlsx")
+    parser.add_argument("--no-calibration", action="store_true", help="Перебирать пороги по сырым вероятностям")
+    args = parser.parse_args()
+
+    if args.score:
+        from annotate import load_data, prepare_examples
+
+        classifier = UniversalMathErrorClassifier(
+            provider=args.provider, model=args.model, base_url=args.base_url, output_mode="logprob"
+        )
+        scores = score_examples(prepare_examples(load_data(args.excel)), classifier)
+        with open(args.scores, "w", encoding="utf-8") as f:
+            json.dump({"provider": args.provider, "model": classifier.model, "scores": scores},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\n Вероятности сохранены в {args.scores}")
+
+    with open(args.scores, encoding="utf-8") as f:
+        scores = json.load(f)["scores"]
+
+    probabilities = [s["probability"] for s in scores]
+    labels = [s["ground_truth"] for s in scores]
+
+    calibration = None
+    if not args.no_calibration:
+        calibration = fit_platt(probabilities, labels)
+        probabilities = [platt_scale(p, *calibration) for p in probabilities]
+        print(f"\nКалибровка Платта: a = {calibration[0]:.4f}, b = {calibration[1]:.4f}")
+
+    rows = sweep(probabilities, labels, [t / 20 for t in range(1, 20)])
+
+    print("\n" + "=" * 80)
+    print(f"{'Порог':>7}{'Accuracy':>11}{'Precision':>11}{'Recall':>9}{'F1':>9}{'Флагов':>8}")
+    for r in rows:
+        print(f"{r['threshold']:>7.2f}{r['accuracy']:>11.2%}{r['precision']:>11.2%}"
+              f"{r['recall']:>9.2%}{r['f1_score']:>9.2%}{r['flagged']:>8}")
+
+    best = max(rows, key=lambda r: (r["f1_score"], r["recall"]))
+    print("=" * 80)
+    print(f"Лучший F1: порог {best['threshold']:.2f} "
+          f"(precision {best['precision']:.2%}, recall {best['recall']:.2%})")
+    print(f"\nUniversalMathErrorClassifier(..., output_mode='logprob', "
+          f"decision_threshold={best['threshold']:.2f}"
+          + (f", calibration=({calibration[0]:.4f}, {calibration[1]:.4f}))" if calibration else ")"))
+
+
+if __name__ == "__main__":
+    main()
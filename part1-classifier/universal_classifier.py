@@ -3,11 +3,21 @@
 Поддерживает: Claude, Deepseek, OpenAI GPT, и любые OpenAI-compatible API
 """
 
+import hashlib
 import json
+import math
 import os
-from typing import Dict, List
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Tuple
 from enum import Enum
 
+from cassette import Cassette, CassetteMissError
+from profiling import stage
+from scheduling import run_scheduled
+from singleflight import SingleFlight
+
 
 class LLMProvider(Enum):
     """Поддерживаемые LLM провайдеры"""
@@ -15,6 +25,7 @@ class LLMProvider(Enum):
     DEEPSEEK = "deepseek"
     OPENAI = "openai"
     CUSTOM = "custom"
+    LOCAL = "local"
 
 
 # Промпт-шаблон для классификации (универсальный для всех моделей)
@@ -61,55 +72,193 @@ CLASSIFICATION_PROMPT = """Ты — эксперт по проверке мат
 
 ВЫПОЛНИ ОЦЕНКУ:"""
 
+# Общая часть промпта: контекст и критерии без формата ответа
+_PROMPT_CRITERIA = CLASSIFICATION_PROMPT.split("ФОРМАТ ОТВЕТА")[0]
+
+# Компактный режим: только метка и код типа ошибки, без обоснования
+COMPACT_PROMPT = _PROMPT_CRITERIA + """ФОРМАТ ОТВЕТА (строгий JSON в одну строку, без пояснений):
+{{"assessment": 0, "error_type": null}}
+
+где assessment: 0 или 1, error_type: "calc"/"formula"/"logic"/"definition" или null
+
+ВЫПОЛНИ ОЦЕНКУ:"""
+
+# Обоснование по запросу для уже выставленной оценки
+EXPLAIN_PROMPT = _PROMPT_CRITERIA + """ОЦЕНКА УЖЕ ВЫСТАВЛЕНА: assessment = {assessment}, тип ошибки: {error_type}
+
+Кратко (2-3 предложения) объясни, что именно проверялось и почему поставлена такая оценка.
+Если есть ошибка — укажи, в чем она и как должно быть правильно. Ответь только текстом объяснения."""
+
+# Скоринг одним токеном: вероятность метки берется из logprobs
+LOGPROB_PROMPT = _PROMPT_CRITERIA + """ФОРМАТ ОТВЕТА: ровно одна цифра без пояснений — 1 (есть ошибка) или 0 (нет ошибки).
+
+ОЦЕНКА:"""
+
+# Шаблоны промпта по режимам вывода
+PROMPT_TEMPLATES = {
+    "full": CLASSIFICATION_PROMPT,
+    "compact": COMPACT_PROMPT,
+    "logprob": LOGPROB_PROMPT,
+}
+
+# Коды типов ошибок компактного режима
+ERROR_TYPE_CODES = {
+    "calc": "вычислительная",
+    "formula": "формула",
+    "logic": "логическая",
+    "definition": "определение",
+}
+
+# Лимиты выходных токенов по режимам
+MAX_TOKENS = {
+    "full": 1024,
+    "compact": 24,
+    "logprob": 1,
+    "explain": 400,
+}
+
+# Модели по умолчанию для провайдеров
+DEFAULT_MODELS = {
+    "claude": "claude-sonnet-4-5-20250929",
+    "deepseek": "deepseek-chat",
+    "openai": "gpt-4o",
+    "custom": "local-model",
+}
+
+# Настройки провайдеров по умолчанию: таймаут запроса (с), число одновременных запросов
+# и JSON-режим (response_format) для OpenAI-compatible API. Локальный сервер на CPU
+# (llama.cpp, vLLM-CPU) отвечает медленно и держит мало параллельных слотов.
+PROVIDER_DEFAULTS = {
+    "claude": {"timeout": 60, "concurrency": 4, "json_mode": False},
+    "deepseek": {"timeout": 60, "concurrency": 8, "json_mode": False},
+    "openai": {"timeout": 60, "concurrency": 8, "json_mode": False},
+    "custom": {"timeout": 600, "concurrency": 2, "json_mode": True},
+    "local": {"timeout": None, "concurrency": 1, "json_mode": False},
+}
+
+# Цены, USD за 1M токенов (вход, выход)
+PRICING = {
+    "claude-sonnet-4-5-20250929": (3.00, 15.00),
+    "deepseek-chat": (0.27, 1.10),
+    "gpt-4o": (2.50, 10.00),
+}
+
 
 class UniversalMathErrorClassifier:
     """Универсальный классификатор для разных LLM провайдеров"""
 
-    def __init__(self, provider: str = "deepseek", api_key: str = None, model: str = None, base_url: str = None):
+    def __init__(self, provider: str = "deepseek", api_key: str = None, model: str = None, base_url: str = None,
+                 output_mode: str = "full", decision_threshold: float = 0.5,
+                 calibration: Tuple[float, float] = None, prompt_template: str = None,
+                 cassette: Cassette = None):
         """
         Инициализация классификатора
 
         Args:
-            provider: Провайдер LLM (claude, deepseek, openai, custom)
+            provider: Провайдер LLM (claude, deepseek, openai, custom, local)
             api_key: API ключ (если None, берется из переменной окружения)
-            model: Название модели (если None, используется default для провайдера)
-            base_url: Custom base URL для API (для прокси или альтернативных endpoints)
+            model: Название модели (если None, используется default для провайдера);
+                   для local — путь к файлу обученной модели
+            base_url: Custom base URL для API (для прокси или альтернативных endpoints);
+                      для custom — адрес OpenAI-compatible сервера (по умолчанию CUSTOM_BASE_URL
+                      или http://localhost:8080/v1)
+            output_mode: full — оценка с обоснованием; compact — только assessment и код
+                         error_type (обоснование потом через explain); logprob — один токен
+                         "0"/"1" и P(ошибка) из logprobs (только OpenAI-compatible провайдеры)
+            decision_threshold: Порог P(ошибка) для assessment = 1 в режиме logprob
+            calibration: Коэффициенты Платта (a, b): P = sigmoid(a * logit(p) + b),
+                         подбираются threshold_sweep.py
+            prompt_template: Пользовательский шаблон промпта вместо встроенного (см. load_prompt_template);
+                             подставляются только {task_text}, {dialogue_history}, {ai_response}
+            cassette: Кассета: в режиме record ответы API записываются,
+                      в режиме replay берутся из кассеты без клиента, сети и ключей
         """
+        if output_mode not in ("full", "compact", "logprob"):
+            raise ValueError(f"Неизвестный режим вывода: {output_mode}. Поддерживаются: full, compact, logprob")
+
         self.provider = provider.lower()
         self.api_key = api_key
         self.model = model
         self.base_url = base_url
+        self.output_mode = output_mode
+        self.decision_threshold = decision_threshold
+        self.calibration = calibration
+        self.prompt_template = prompt_template
+        self.cassette = cassette
         self.client = None
+        # Одинаковые одновременные запросы идут в API один раз
+        self.singleflight = SingleFlight()
+
+        # Контекст компактных результатов для ленивого explain (последние примеры)
+        self._explain_context = OrderedDict()
+        self._usage_lock = threading.Lock()
+        self._usage = {"calls": 0, "input_tokens": 0, "output_tokens": 0, "latency_s": 0.0}
+        self._last_usage = threading.local()
 
         self._init_client()
 
     def _init_client(self):
         """Инициализация клиента в зависимости от провайдера"""
 
-        if self.provider == "claude":
+        self.defaults = PROVIDER_DEFAULTS.get(self.provider, PROVIDER_DEFAULTS["openai"])
+        timeout = self.defaults["timeout"]
+
+        if self.cassette is not None and self.cassette.mode == "replay":
+            # Ответы берутся из кассеты — клиент API не нужен
+            if self.provider not in DEFAULT_MODELS:
+                raise ValueError(f"Провайдер {self.provider} не поддерживает воспроизведение кассет")
+            self.model = self.model or DEFAULT_MODELS[self.provider]
+            self.provider_type = LLMProvider(self.provider)
+
+        elif self.provider == "claude":
             from anthropic import Anthropic
-            self.client = Anthropic(api_key=self.api_key or os.environ.get("ANTHROPIC_API_KEY"))
-            self.model = self.model or "claude-sonnet-4-5-20250929"
+            self.client = Anthropic(api_key=self.api_key or os.environ.get("ANTHROPIC_API_KEY"), timeout=timeout)
+            self.model = self.model or DEFAULT_MODELS["claude"]
             self.provider_type = LLMProvider.CLAUDE
 
         elif self.provider == "deepseek":
             from openai import OpenAI
             self.client = OpenAI(
                 api_key=self.api_key or os.environ.get("DEEPSEEK_API_KEY"),
-                base_url=self.base_url or "https://api.deepseek.com"
+                base_url=self.base_url or "https://api.deepseek.com",
+                timeout=timeout
             )
-            self.model = self.model or "deepseek-chat"
+            self.model = self.model or DEFAULT_MODELS["deepseek"]
             self.provider_type = LLMProvider.DEEPSEEK
 
         elif self.provider == "openai":
             from openai import OpenAI
-            self.client = OpenAI(api_key=self.api_key or os.environ.get("OPENAI_API_KEY"))
-            self.model = self.model or "gpt-4o"
+            self.client = OpenAI(api_key=self.api_key or os.environ.get("OPENAI_API_KEY"), timeout=timeout)
+            self.model = self.model or DEFAULT_MODELS["openai"]
             self.provider_type = LLMProvider.OPENAI
 
+        elif self.provider == "custom":
+            # Любой OpenAI-compatible сервер: llama.cpp, vLLM, Ollama и т.п.
+            from openai import OpenAI
+            self.base_url = self.base_url or os.environ.get("CUSTOM_BASE_URL", "http://localhost:8080/v1")
+            self.client = OpenAI(
+                # Локальным серверам ключ обычно не нужен, но клиент требует непустое значение
+                api_key=self.api_key or os.environ.get("CUSTOM_API_KEY", "not-needed"),
+                base_url=self.base_url,
+                timeout=timeout,
+                # Повтор после таймаута на CPU-сервере только удвоит ожидание
+                max_retries=0
+            )
+            self.model = self.model or os.environ.get("CUSTOM_MODEL", DEFAULT_MODELS["custom"])
+            self.provider_type = LLMProvider.CUSTOM
+
+        elif self.provider == "local":
+            from local_classifier import LocalMathErrorModel, DEFAULT_MODEL_PATH
+            self.model = self.model or DEFAULT_MODEL_PATH
+            self.client = LocalMathErrorModel.load(self.model)
+            self.provider_type = LLMProvider.LOCAL
+
         else:
             raise ValueError(f"Неизвестный провайдер: {self.provider}. "
-                           f"Поддерживаются: claude, deepseek, openai")
+                           f"Поддерживаются: claude, deepseek, openai, custom, local")
+
+        if self.output_mode == "logprob" and self.provider_type in (LLMProvider.CLAUDE, LLMProvider.LOCAL):
+            raise ValueError(f"Режим logprob не поддерживается провайдером {self.provider}")
 
         print(f"[OK] Инициализирован {self.provider.upper()} с моделью {self.model}")
 
@@ -125,22 +274,150 @@ class UniversalMathErrorClassifier:
         Returns:
             Dict с полями: assessment (0/1), reasoning, error_type
         """
-        prompt = CLASSIFICATION_PROMPT.format(
+        if self.provider_type == LLMProvider.LOCAL:
+            # Локальная модель работает с полями примера, а не с промптом
+            return self.client.classify(task_text, dialogue_history, ai_response)
+
+        prompt = self.build_prompt(task_text, dialogue_history, ai_response)
+        result = self.singleflight.do(self.cache_key(prompt), lambda: self._classify_prompt(prompt))
+        return self._finalize(result, prompt, task_text, dialogue_history, ai_response)
+
+    def classify_with_usage(self, task_text: str, dialogue_history: str,
+                            ai_response: str) -> Tuple[Dict, Tuple[int, int]]:
+        """
+        classify и токены (вход, выход) именно этого вызова
+
+        Returns:
+            (результат, токены); (0, 0), если ответ получен без запроса к API (singleflight)
+        """
+        self._last_usage.tokens = (0, 0)
+        result = self.classify(task_text, dialogue_history, ai_response)
+        return result, self._last_usage.tokens
+
+    async def aclassify(self, task_text: str, dialogue_history: str, ai_response: str) -> Dict:
+        """
+        Асинхронная версия classify: блокирующий вызов API выполняется в отдельном потоке
+
+        Returns:
+            Dict с полями: assessment (0/1), reasoning, error_type
+        """
+        if self.provider_type == LLMProvider.LOCAL:
+            return self.client.classify(task_text, dialogue_history, ai_response)
+
+        prompt = self.build_prompt(task_text, dialogue_history, ai_response)
+        result = await self.singleflight.ado(self.cache_key(prompt), lambda: self._classify_prompt(prompt))
+        return self._finalize(result, prompt, task_text, dialogue_history, ai_response)
+
+    def _finalize(self, result: Dict, prompt: str, task_text: str, dialogue_history: str, ai_response: str) -> Dict:
+        """Копия общего результата; в режимах без обоснования запоминает контекст для explain"""
+        result = dict(result)
+        if self.output_mode in ("compact", "logprob") and result["assessment"] != -1:
+            key = self.cache_key(prompt)
+            result["prompt_hash"] = key
+            with self._usage_lock:
+                self._explain_context[key] = (task_text, dialogue_history, ai_response)
+                self._explain_context.move_to_end(key)
+                while len(self._explain_context) > 1024:
+                    self._explain_context.popitem(last=False)
+        return result
+
+    def explain(self, result: Dict, task_text: str = None, dialogue_history: str = None,
+                ai_response: str = None) -> Dict:
+        """
+        Лениво получает обоснование для результата компактного режима
+
+        Args:
+            result: Результат classify (assessment, error_type, prompt_hash)
+            task_text, dialogue_history, ai_response: Данные примера; если не заданы,
+                берутся из контекста недавнего classify
+
+        Returns:
+            Копия result с заполненным reasoning
+        """
+        if task_text is None:
+            with self._usage_lock:
+                context = self._explain_context.get(result.get("prompt_hash"))
+            if context is None:
+                raise ValueError("Нет контекста для explain: передайте task_text, dialogue_history, ai_response")
+            task_text, dialogue_history, ai_response = context
+
+        prompt = EXPLAIN_PROMPT.format(
             task_text=task_text,
             dialogue_history=dialogue_history,
-            ai_response=ai_response
+            ai_response=ai_response,
+            assessment=result["assessment"],
+            error_type=result.get("error_type") or "нет"
         )
-
+        explained = dict(result)
         try:
+            explained["reasoning"] = self._complete(prompt, MAX_TOKENS["explain"], json_output=False)
+        except CassetteMissError:
+            raise
+        except Exception as e:
+            print(f"Ошибка при получении обоснования: {e}")
+            explained["reasoning"] = f"Ошибка обработки: {str(e)}"
+        return explained
+
+    def telemetry(self) -> Dict:
+        """Счетчики singleflight и расход токенов/времени на запросы к API"""
+        with self._usage_lock:
+            usage = dict(self._usage)
+        usage["cost_usd"] = estimate_cost(self.model, usage["input_tokens"], usage["output_tokens"])
+        telemetry = {"singleflight": self.singleflight.stats(), "usage": usage}
+        if self.cassette is not None:
+            telemetry["cassette"] = dict(self.cassette.stats, mode=self.cassette.mode)
+        return telemetry
+
+    def _record_usage(self, input_tokens: int, output_tokens: int, latency: float):
+        with self._usage_lock:
+            self._usage["calls"] += 1
+            self._usage["input_tokens"] += input_tokens or 0
+            self._usage["output_tokens"] += output_tokens or 0
+            self._usage["latency_s"] += latency
+        self._last_usage.tokens = (input_tokens or 0, output_tokens or 0)
+
+    def _complete(self, prompt: str, max_tokens: int, json_output: bool = True) -> str:
+        """Запрос к API текущего провайдера (json_output=False — ответ свободным текстом)"""
+        if self.cassette is None:
+            return self._request(prompt, max_tokens, json_output)
+
+        key = self._cassette_key(prompt, max_tokens, json_output)
+        if self.cassette.mode == "replay":
+            record = self.cassette.get(key)
+            self._record_usage(record["input_tokens"], record["output_tokens"], 0.0)
+            return record["response"]
+
+        response = self._request(prompt, max_tokens, json_output)
+        self.cassette.put(key, response, *self._last_usage.tokens)
+        return response
+
+    def _request(self, prompt: str, max_tokens: int, json_output: bool) -> str:
+        with stage("api_wait"):
             if self.provider_type == LLMProvider.CLAUDE:
-                response = self._classify_claude(prompt)
-            else:
-                response = self._classify_openai_compatible(prompt)
+                return self._classify_claude(prompt, max_tokens)
+            return self._classify_openai_compatible(prompt, max_tokens, json_output)
+
+    def _cassette_key(self, prompt: str, max_tokens: int, json_output: bool) -> str:
+        """Ключ записи: промпт и все параметры, от которых зависит ответ"""
+        params = f"{max_tokens}|{int(json_output)}"
+        if self.output_mode == "logprob":
+            # Порог и калибровка применяются внутри _classify_openai_compatible
+            params += f"|{self.decision_threshold}|{self.calibration}"
+        return prompt_hash(prompt + "\0" + params, provider=self.provider, model=self.model)
+
+    def _classify_prompt(self, prompt: str) -> Dict:
+        """Запрос к API и разбор ответа для готового промпта"""
+        try:
+            response = self._complete(prompt, MAX_TOKENS[self.output_mode])
 
             # Парсинг JSON ответа
-            result = self._parse_response(response)
+            with stage("parse"):
+                result = self._parse_response(response)
             return result
 
+        except CassetteMissError:
+            # Промах кассеты — не ошибка ответа модели: воспроизведение должно падать, а не давать -1
+            raise
         except Exception as e:
             print(f"Ошибка при классификации: {e}")
             return {
@@ -149,25 +426,93 @@ class UniversalMathErrorClassifier:
                 "error_type": None
             }
 
-    def _classify_claude(self, prompt: str) -> str:
+    def build_prompt(self, task_text: str, dialogue_history: str, ai_response: str) -> str:
+        """Подставляет данные примера в промпт-шаблон текущего режима"""
+        with stage("prompt"):
+            if self.prompt_template is not None:
+                # Фигурные скобки JSON в пользовательском шаблоне не экранируются, поэтому без format
+                return (self.prompt_template
+                        .replace("{task_text}", task_text)
+                        .replace("{dialogue_history}", dialogue_history)
+                        .replace("{ai_response}", ai_response))
+
+            return PROMPT_TEMPLATES[self.output_mode].format(
+                task_text=task_text,
+                dialogue_history=dialogue_history,
+                ai_response=ai_response
+            )
+
+    def prompt_version(self) -> str:
+        """Хэш шаблона промпта текущего режима: прогоны с одинаковым шаблоном сравнимы"""
+        template = self.prompt_template if self.prompt_template is not None else PROMPT_TEMPLATES[self.output_mode]
+        return prompt_hash(template)
+
+    def cache_key(self, prompt: str) -> str:
+        """Ключ кэша: один и тот же промпт у разных моделей дает разные ответы"""
+        return prompt_hash(prompt, provider=self.provider, model=self.model)
+
+    def _classify_claude(self, prompt: str, max_tokens: int = 1024) -> str:
         """Классификация через Claude API"""
+        started = time.perf_counter()
         message = self.client.messages.create(
             model=self.model,
-            max_tokens=1024,
+            max_tokens=max_tokens,
             messages=[{"role": "user", "content": prompt}]
         )
+        usage = getattr(message, "usage", None)
+        self._record_usage(getattr(usage, "input_tokens", 0), getattr(usage, "output_tokens", 0),
+                           time.perf_counter() - started)
         return message.content[0].text.strip()
 
-    def _classify_openai_compatible(self, prompt: str) -> str:
+    def _classify_openai_compatible(self, prompt: str, max_tokens: int = 1024, json_output: bool = True) -> str:
         """Классификация через OpenAI-compatible API (Deepseek, OpenAI, и т.д.)"""
+        scoring = self.output_mode == "logprob" and max_tokens == MAX_TOKENS["logprob"]
+        extra = {"logprobs": True, "top_logprobs": 5, "temperature": 0.0} if scoring else {"temperature": 0.3}
+        if self.defaults["json_mode"] and json_output and not scoring:
+            extra["response_format"] = {"type": "json_object"}
+
+        started = time.perf_counter()
         response = self.client.chat.completions.create(
             model=self.model,
             messages=[{"role": "user", "content": prompt}],
-            max_tokens=1024,
-            temperature=0.3
+            max_tokens=max_tokens,
+            **extra
         )
+        usage = getattr(response, "usage", None)
+        self._record_usage(getattr(usage, "prompt_tokens", 0), getattr(usage, "completion_tokens", 0),
+                           time.perf_counter() - started)
+
+        if scoring:
+            # Ответ в том же JSON-формате, чтобы дальше работал общий _parse_response
+            probability = self._score_logprobs(response.choices[0].logprobs.content[0].top_logprobs)
+            return json.dumps({
+                "assessment": int(probability >= self.decision_threshold),
+                "probability": probability,
+                "reasoning": "",
+                "error_type": None
+            })
         return response.choices[0].message.content.strip()
 
+    def _score_logprobs(self, top_logprobs) -> float:
+        """
+        P(ошибка) по top_logprobs первого токена: нормировка вероятностей "1" и "0"
+        с калибровкой Платта, если она задана
+        """
+        mass = {"0": 0.0, "1": 0.0}
+        for candidate in top_logprobs:
+            token = candidate.token.strip()
+            if token in mass:
+                mass[token] += math.exp(candidate.logprob)
+
+        total = mass["0"] + mass["1"]
+        if total == 0:
+            raise ValueError("В top_logprobs нет токенов '0'/'1'")
+        probability = mass["1"] / total
+
+        if self.calibration is not None:
+            probability = platt_scale(probability, *self.calibration)
+        return probability
+
     def _parse_response(self, response_text: str) -> Dict:
         """Парсинг JSON ответа от модели"""
         # Попытка извлечь JSON
@@ -188,31 +533,55 @@ class UniversalMathErrorClassifier:
         if result["assessment"] not in [0, 1]:
             raise ValueError(f"Invalid assessment value: {result['assessment']}")
 
+        # Компактный режим: без обоснования, тип ошибки кодом
+        result.setdefault("reasoning", "")
+        result["error_type"] = ERROR_TYPE_CODES.get(result.get("error_type"), result.get("error_type"))
+
         return result
 
-    def classify_batch(self, examples: List[Dict], verbose: bool = True) -> List[Dict]:
+    def classify_batch(self, examples: List[Dict], verbose: bool = True, explain_positives: bool = False,
+                       concurrency: int = None, schedule: str = "longest_first") -> List[Dict]:
         """
         Классифицирует пакет примеров
 
         Args:
             examples: Список словарей с полями task_text, dialogue_history, ai_response, id
             verbose: Выводить прогресс
+            explain_positives: В компактном режиме запросить обоснование для найденных ошибок
+            concurrency: Число одновременных запросов к API (None — по умолчанию для провайдера)
+            schedule: Порядок отправки при concurrency > 1: longest_first (длинные диалоги
+                      первыми, меньше хвост в конце прогона) или fifo
 
         Returns:
-            Список результатов классификации
+            Список результатов классификации (в порядке examples)
         """
-        results = []
-
-        for i, example in enumerate(examples, 1):
-            if verbose:
-                print(f"Обработка примера {i}/{len(examples)} (ID: {example.get('id', 'unknown')})")
-
+        def classify_example(example):
             result = self.classify(
                 task_text=example["task_text"],
                 dialogue_history=example["dialogue_history"],
                 ai_response=example["ai_response"]
             )
 
+            if explain_positives and self.output_mode == "compact" and result["assessment"] == 1:
+                result = self.explain(result, example["task_text"], example["dialogue_history"],
+                                      example["ai_response"])
+            return result
+
+        done = []
+
+        def report(i, example, result):
+            done.append(i)
+            if verbose:
+                print(f"Обработка примера {len(done)}/{len(examples)} (ID: {example.get('id', 'unknown')})")
+
+        if concurrency is None:
+            concurrency = self.defaults["concurrency"]
+
+        raw_results = run_scheduled(examples, classify_example, concurrency=concurrency,
+                                    strategy=schedule, on_done=report)
+
+        results = []
+        for i, (example, result) in enumerate(zip(examples, raw_results), 1):
             results.append({
                 "id": example.get("id", i),
                 "assessment": result["assessment"],
@@ -224,6 +593,67 @@ class UniversalMathErrorClassifier:
         return results
 
 
+def load_prompt_template(path: str) -> str:
+    """
+    Загружает шаблон промпта из файла
+
+    Для .md берется первый блок кода до следующего заголовка (как в prompt.md,
+    где внутри промпта есть вложенный блок ```json), иначе — весь файл.
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+
+    if path.endswith(".md") and "```" in text:
+        start = text.find("```")
+        start = text.find("\n", start) + 1
+        section_end = text.find("\n## ", start)
+        if section_end == -1:
+            section_end = len(text)
+        end = text.rfind("\n```", start, section_end)
+        text = text[start:end]
+
+    return text.strip()
+
+
+def prompt_hash(prompt: str, provider: str = "", model: str = "") -> str:
+    """
+    Канонический хэш запроса к модели
+
+    Args:
+        prompt: Готовый текст промпта
+        provider: Провайдер LLM
+        model: Название модели
+
+    Returns:
+        SHA-256 в hex-формате
+    """
+    digest = hashlib.sha256()
+    for part in (provider, model, prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def sigmoid(z: float) -> float:
+    """1 / (1 + exp(-z)) без переполнения при больших |z|"""
+    if z >= 0:
+        return 1 / (1 + math.exp(-z))
+    e = math.exp(z)
+    return e / (1 + e)
+
+
+def platt_scale(probability: float, a: float, b: float) -> float:
+    """Калибровка Платта: sigmoid(a * logit(p) + b)"""
+    p = min(max(probability, 1e-6), 1 - 1e-6)
+    return sigmoid(a * math.log(p / (1 - p)) + b)
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    """Стоимость запросов в USD по таблице PRICING (0 для неизвестных моделей)"""
+    input_price, output_price = PRICING.get(model, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
 def calculate_metrics(predictions: List[int], ground_truth: List[int]) -> Dict:
     """
     Рассчитывает метрики качества классификации
@@ -3,21 +3,28 @@ Flask веб-приложение для генератора задач ЕГЭ
 """
 
 from flask import Flask, render_template, request, jsonify
+import os
 import sys
 sys.path.append('src')
-from generator import ProbabilityTaskGenerator
+from generator import SPEC_TYPES, ProbabilityTaskGenerator
+from param_space import space_sizes
+from registry import IssuedRegistry
 
 app = Flask(__name__)
 app.config['JSON_AS_ASCII'] = False
 
-# Глобальный экземпляр генератора
+# Общий генератор: у каждой задачи свой RNG, поэтому он безопасен для многопоточного сервера
 generator = ProbabilityTaskGenerator()
 
+# Выданные задачи по пользователям (запросы с user_id не получают задачу повторно)
+registry = IssuedRegistry(os.environ.get('ISSUED_DIR', 'issued'))
+
 
 @app.route('/')
 def index():
     """Главная страница"""
-    return render_template('index.html')
+    # Типы из спецификаций добавляются в список выбора шаблоном
+    return render_template('index.html', spec_types={name: spec.title for name, spec in SPEC_TYPES.items()})
 
 
 @app.route('/api/generate', methods=['POST'])
@@ -29,6 +36,11 @@ def generate_tasks():
         count = int(data.get('count', 1))
         difficulty = data.get('difficulty', 'medium')
         task_type = data.get('task_type', None)
+        seed = data.get('seed')
+        start = data.get('start')
+        unique = bool(data.get('unique', False))
+        finite_decimal = bool(data.get('finite_decimal', False))
+        user_id = data.get('user_id')
 
         # Валидация
         if count < 1 or count > 20:
@@ -37,15 +49,30 @@ def generate_tasks():
         if difficulty not in ['easy', 'medium', 'hard']:
             return jsonify({'error': 'Неверная сложность'}), 400
 
-        # Генерация задач
-        tasks = generator.generate_batch(count, task_type, difficulty)
-
-        return jsonify({
+        # Генерация задач: по seed и start любой пакет можно получить повторно
+        request_generator = generator if seed is None else ProbabilityTaskGenerator(seed=int(seed))
+        start = request_generator.reserve(count) if start is None else int(start)
+        if user_id:
+            tasks = registry.generate(request_generator, str(user_id), count, task_type, difficulty,
+                                      start=start, finite_decimal=finite_decimal)
+        else:
+            tasks = request_generator.generate_batch(count, task_type, difficulty, start=start,
+                                                     unique=unique, finite_decimal=finite_decimal)
+
+        response = {
             'success': True,
             'tasks': tasks,
-            'count': len(tasks)
-        })
-
+            'count': len(tasks),
+            'seed': request_generator.seed,
+            'start': start
+        }
+        if user_id:
+            response['issued'] = registry.issued(str(user_id))
+        return jsonify(response)
+
+    except ValueError as e:
+        # Неверные параметры запроса, в том числе unique при нехватке различных задач
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -59,8 +86,13 @@ def get_task_types():
         'tv_channels': 'Телевизионные каналы',
         'lottery': 'Лотереи и розыгрыши',
         'objects_selection': 'Выбор объектов',
-        'colored_balls': 'Цветные шары'
+        'colored_balls': 'Цветные шары',
+        'without_replacement': 'Выбор без возвращения',
+        'at_least_one': 'Хотя бы один',
+        'repeated_trials': 'Повторные испытания'
     }
+    for name, spec in SPEC_TYPES.items():
+        task_types.setdefault(name, spec.title)
 
     return jsonify({
         'success': True,
@@ -68,6 +100,31 @@ def get_task_types():
     })
 
 
+@app.route('/api/task-space', methods=['GET'])
+def get_task_space():
+    """Число различных задач по типам и сложностям"""
+    finite_decimal = request.args.get('finite_decimal', '').lower() in ('1', 'true', 'yes')
+
+    return jsonify({
+        'success': True,
+        'finite_decimal': finite_decimal,
+        'sizes': space_sizes(finite_decimal)
+    })
+
+
+@app.route('/api/issued/<user_id>', methods=['GET', 'DELETE'])
+def issued_tasks(user_id):
+    """Сколько задач выдано пользователю; DELETE — начать выдачу заново"""
+    if request.method == 'DELETE':
+        registry.reset(user_id)
+
+    return jsonify({
+        'success': True,
+        'user_id': user_id,
+        'issued': registry.issued(user_id)
+    })
+
+
 if __name__ == '__main__':
     # В продакшене использовать gunicorn или другой WSGI сервер
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -6,7 +6,8 @@ Streamlit веб-приложение для генератора задач Е
 import streamlit as st
 import sys
 sys.path.append('src')
-from generator import ProbabilityTaskGenerator
+from generator import SPEC_TYPES, ProbabilityTaskGenerator
+from registry import IssuedRegistry
 
 # Настройка страницы
 st.set_page_config(
@@ -89,8 +90,15 @@ with st.sidebar:
         "Телеканалы": "tv_channels",
         "Лотереи": "lottery",
         "Выбор объектов": "objects_selection",
-        "Цветные шары": "colored_balls"
+        "Цветные шары": "colored_balls",
+        "Выбор без возвращения": "without_replacement",
+        "Хотя бы один": "at_least_one",
+        "Повторные испытания": "repeated_trials"
     }
+    # Типы из спецификаций (specs/*.json)
+    for name, spec in SPEC_TYPES.items():
+        if name not in task_type_options.values():
+            task_type_options[spec.title] = name
 
     task_type_label = st.selectbox(
         "Тип задачи",
@@ -99,6 +107,13 @@ with st.sidebar:
     )
     task_type = task_type_options[task_type_label]
 
+    unique = st.checkbox("Без повторяющихся задач", value=True)
+    finite_decimal = st.checkbox("Только ответы — конечные десятичные дроби", value=False)
+    user_id = st.text_input(
+        "Ваше имя или логин (необязательно)",
+        help="Задачи, уже выданные этому пользователю, больше не повторятся"
+    ).strip()
+
     st.markdown("---")
 
     # Кнопка генерации
@@ -114,7 +129,7 @@ with st.sidebar:
     st.info("""
     **О генераторе:**
 
-    - 5 типов задач
+    - 10 типов задач
     - 3 уровня сложности
     - Алгоритмическая генерация
     - Пошаговые решения
@@ -125,16 +140,30 @@ with st.sidebar:
 def get_generator():
     return ProbabilityTaskGenerator()
 
+@st.cache_resource
+def get_registry():
+    return IssuedRegistry('issued')
+
 generator = get_generator()
+registry = get_registry()
 
 # Основная область
 if generate_button:
     with st.spinner('Генерируем задачи...'):
-        # Генерация задач
-        tasks = generator.generate_batch(count, task_type, difficulty)
+        # Генерация задач: в маленьком пространстве различных задач может не хватить
+        try:
+            if user_id:
+                tasks = registry.generate(generator, user_id, count, task_type, difficulty, finite_decimal=finite_decimal)
+            else:
+                tasks = generator.generate_batch(count, task_type, difficulty, unique=unique, finite_decimal=finite_decimal)
+        except ValueError as e:
+            st.error(f'❌ {e}. Уменьшите количество, выберите другую сложность или снимите «Без повторяющихся задач».')
+            st.stop()
 
         # Отображение задач
         st.success(f'✅ Сгенерировано задач: {len(tasks)}')
+        if user_id:
+            st.caption(f'Всего выдано пользователю {user_id}: {registry.issued(user_id)}')
 
         for task in tasks:
             # Карточка задачи
@@ -146,18 +175,26 @@ if generate_button:
                 'tv_channels': '📺',
                 'lottery': '🎰',
                 'objects_selection': '🎴',
-                'colored_balls': '⚽'
+                'colored_balls': '⚽',
+                'without_replacement': '🧺',
+                'at_least_one': '⚠️',
+                'repeated_trials': '🎯',
+                'coin_tosses': '🪙',
+                'dice_sum': '🎲'
             }
             type_names = {
                 'exam_tickets': 'Экзаменационные билеты',
                 'tv_channels': 'Телеканалы',
                 'lottery': 'Лотерея',
                 'objects_selection': 'Выбор объектов',
-                'colored_balls': 'Цветные шары'
+                'colored_balls': 'Цветные шары',
+                'without_replacement': 'Выбор без возвращения',
+                'at_least_one': 'Хотя бы один',
+                'repeated_trials': 'Повторные испытания'
             }
 
             icon = type_icons.get(task['type'], '📝')
-            type_name = type_names.get(task['type'], 'Другое')
+            type_name = type_names.get(task['type'], SPEC_TYPES[task['type']].title if task['type'] in SPEC_TYPES else 'Другое')
 
             st.markdown(f"### {icon} Задача №{task['id']} — {type_name}")
 
@@ -0,0 +1,56 @@
+"""
+Бенчмарк генерации задач: поштучный ProbabilityTaskGenerator против векторизованного generate_bulk
+Печатает задач/с при 1k, 100k и 1M задач
+"""
+
+import argparse
+import sys
+import time
+
+sys.path.append('src')
+from bulk import generate_bulk
+from generator import ProbabilityTaskGenerator
+
+
+def measure(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк генерации задач")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    parser.add_argument('--difficulty', default='medium', choices=['easy', 'medium', 'hard'])
+    parser.add_argument('--python-limit', type=int, default=100_000,
+                        help="Поштучную генерацию не запускать на размерах больше этого")
+    parser.add_argument('--render', type=int, default=1_000, help="Сколько задач bulk-набора собрать в dict")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"{'Задач':>10}{'generate_batch, /с':>22}{'generate_bulk, /с':>22}{'bulk + dict, /с':>20}")
+    for size in args.sizes:
+        if size <= args.python_limit:
+            elapsed = measure(lambda: ProbabilityTaskGenerator(seed=42).generate_batch(size, difficulty=args.difficulty))
+            python_rate = f"{size / elapsed:,.0f}"
+        else:
+            python_rate = "-"
+
+        batch = None
+
+        def bulk():
+            nonlocal batch
+            batch = generate_bulk(size, difficulty=args.difficulty, seed=42)
+
+        bulk_rate = size / measure(bulk)
+
+        # Текст собирается только по запросу: стоимость dict-формата на первых --render задачах
+        rendered = min(size, args.render)
+        render_rate = rendered / measure(lambda: batch.to_dicts(0, rendered))
+
+        print(f"{size:>10,}{python_rate:>22}{bulk_rate:>22,.0f}{render_rate:>20,.0f}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Микробенчмарк сборки текста задачи: мкс на render_task по типам
+С --baseline-ref сравнивает с generator.py из указанного коммита (до/после) и проверяет,
+что для одних и тех же параметров вывод совпадает байт в байт.
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append('src')
+from generator import ProbabilityTaskGenerator
+from param_space import DIFFICULTIES, SPACES, get_space
+
+
+def load_baseline(ref: str):
+    """ProbabilityTaskGenerator из src/generator.py коммита ref"""
+    source = subprocess.run(
+        ['git', 'show', f'{ref}:./src/generator.py'],
+        capture_output=True, text=True, check=True, encoding='utf-8'
+    ).stdout
+    with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False, encoding='utf-8') as f:
+        f.write(source)
+    try:
+        spec = importlib.util.spec_from_file_location('generator_baseline', f.name)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        os.unlink(f.name)
+    return module.ProbabilityTaskGenerator(seed=0)
+
+
+def per_task_us(generator, task_type: str, difficulty: str, params: list, repeat: int) -> float:
+    render = generator.render_task
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for p in params:
+            render(task_type, difficulty, p)
+        best = min(best, time.perf_counter() - started)
+    return best / len(params) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк сборки условия и решения задачи")
+    parser.add_argument('--tasks', type=int, default=20_000, help="Параметров на тип и сложность")
+    parser.add_argument('--repeat', type=int, default=5, help="Повторов (берется лучший)")
+    parser.add_argument('--baseline-ref', default=None, help="Коммит для сравнения (до изменений)")
+    args = parser.parse_args()
+
+    current = ProbabilityTaskGenerator(seed=0)
+    baseline = load_baseline(args.baseline_ref) if args.baseline_ref else None
+
+    print("=" * 80)
+    header = f"{'Тип':<20}{'Сложность':<10}{'Сейчас, мкс':>14}"
+    if baseline:
+        header += f"{'До, мкс':>12}{'Ускорение':>12}{'Вывод':>10}"
+    print(header)
+
+    mismatches = 0
+    for task_type in SPACES:
+        for difficulty in DIFFICULTIES:
+            space = get_space(task_type, difficulty)
+            rng = random.Random(42)
+            params = [space.params(rng.randrange(space.size)) for _ in range(args.tasks)]
+
+            now = per_task_us(current, task_type, difficulty, params, args.repeat)
+            line = f"{task_type:<20}{difficulty:<10}{now:>14.2f}"
+            if baseline and task_type not in baseline.task_renderers:
+                line += f"{'-':>12}{'-':>12}{'нет типа':>10}"
+            elif baseline:
+                before = per_task_us(baseline, task_type, difficulty, params, args.repeat)
+                same = all(
+                    current.render_task(task_type, difficulty, p) == baseline.render_task(task_type, difficulty, p)
+                    for p in params
+                )
+                mismatches += not same
+                line += f"{before:>12.2f}{before / now:>11.1f}x{'=' if same else 'ОТЛИЧИЕ':>10}"
+            print(line)
+    print("=" * 80)
+
+    if mismatches:
+        print(f"Вывод отличается от {args.baseline_ref} в {mismatches} наборах")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
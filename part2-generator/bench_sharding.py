@@ -0,0 +1,48 @@
+"""
+Бенчмарк масштабирования шардированной генерации: 1..N процессов на одном и том же наборе
+Число шардов фиксировано, поэтому все прогоны дают одинаковую выгрузку; меняется только пул.
+Эффективность = ускорение / число процессов.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.append('src')
+from shard import generate_sharded
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Бенчмарк масштабирования src/shard.py")
+    parser.add_argument('--count', type=int, default=400_000)
+    parser.add_argument('--processes', type=int, nargs='+',
+                        default=sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1))))
+    parser.add_argument('--shards', type=int, default=None, help="По умолчанию — 2 × максимум процессов")
+    parser.add_argument('--format', default='jsonl', choices=['jsonl', 'csv', 'parquet'])
+    parser.add_argument('--difficulty', default='medium', choices=['easy', 'medium', 'hard'])
+    args = parser.parse_args()
+
+    shards = args.shards or 2 * max(args.processes)
+    print(f"Ядер: {cores}, задач: {args.count:,}, шардов: {shards}")
+    print("=" * 80)
+    print(f"{'Процессов':>10}{'Время, с':>12}{'Задач/с':>14}{'Ускорение':>12}{'Эффективность':>16}")
+
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for processes in args.processes:
+            output = os.path.join(tmp, f"bench-{processes}.{args.format}")
+            stats = generate_sharded(output, args.count, seed=42, shards=shards, processes=processes,
+                                     difficulty=args.difficulty, fmt=args.format)
+            baseline = baseline or stats["seconds"]
+            speedup = baseline / stats["seconds"]
+            print(f"{processes:>10}{stats['seconds']:>12.2f}{stats['tasks_per_second']:>14,.0f}"
+                  f"{speedup:>11.2f}x{speedup / processes:>16.0%}")
+    print("=" * 80)
+    if max(args.processes) > cores:
+        print(f"Процессов больше, чем ядер ({cores}): ускорение ограничено числом ядер")
+
+
+if __name__ == "__main__":
+    main()
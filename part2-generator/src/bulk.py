@@ -0,0 +1,265 @@
+"""
+Векторизованная генерация больших наборов задач (NumPy)
+Параметры задач одного типа и сложности разыгрываются сразу массивами, дроби сокращаются
+векторным gcd, десятичные ответы считаются пакетно. Текст условия и решения собирается
+только по запросу — тем же render_task, что и у ProbabilityTaskGenerator.
+
+Пять классических типов разыгрываются с тем же распределением параметров, что и у генератора.
+Остальные типы генератора (комбинаторные и из спецификаций) выбираются равномерно по
+пространству различных задач (param_space): номер задачи -> блок бинарным поиском по смещениям.
+"""
+
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, NamedTuple, Tuple
+
+import numpy as np
+
+from generator import (COLORED_BALLS, COLORS, DEFECTIVE_PARTS, EXAM_TICKETS, LOTTERY, NAMES, OBJECTS, PRIZES,
+                       THEMES, TV_CHANNELS, ProbabilityTaskGenerator)
+from param_space import SPACES
+
+# Все типы генератора в его порядке (классические, комбинаторные, из specs/*.json)
+TASK_TYPES = list(ProbabilityTaskGenerator(seed=0).task_templates)
+MAX_COLORS = 4
+INT64_MAX = np.iinfo(np.int64).max
+
+
+def _total_and_part(rng: np.random.Generator, count: int, spec) -> tuple:
+    """Общее число из вариантов и часть из [low, min(high, total - margin)]"""
+    choices, low, high, margin = spec
+    total = rng.choice(np.asarray(choices, dtype=np.int64), count)
+    part = rng.integers(low, np.minimum(high, total - margin), endpoint=True)
+    return total, part
+
+
+def _sample_exam_tickets(rng, count, difficulty):
+    total, unstudied = _total_and_part(rng, count, EXAM_TICKETS[difficulty])
+    params = {"total": total, "unstudied": unstudied, "name": rng.integers(0, len(NAMES), count)}
+    return params, total - unstudied, total
+
+
+def _sample_tv_channels(rng, count, difficulty):
+    total, thematic = _total_and_part(rng, count, TV_CHANNELS[difficulty])
+    negate = rng.integers(0, 2, count)
+    params = {
+        "total": total,
+        "thematic": thematic,
+        "name": rng.integers(0, len(NAMES), count),
+        "theme": rng.integers(0, len(THEMES), count),
+        "negate": negate,
+    }
+    return params, np.where(negate == 1, total - thematic, thematic), total
+
+
+def _sample_lottery(rng, count, difficulty):
+    total, winning = _total_and_part(rng, count, LOTTERY[difficulty])
+    params = {
+        "total": total,
+        "winning": winning,
+        "name": rng.integers(0, len(NAMES), count),
+        "prize": rng.integers(0, len(PRIZES), count),
+    }
+    return params, winning, total
+
+
+def _sample_objects_selection(rng, count, difficulty):
+    obj = rng.integers(0, len(OBJECTS), count)
+    preset_total = np.array([o[4] or 0 for o in OBJECTS], dtype=np.int64)[obj]
+    preset_favorable = np.array([o[3] or 0 for o in OBJECTS], dtype=np.int64)[obj]
+
+    # Для партии деталей числа зависят от сложности, для карт и дней — фиксированы
+    total, favorable = _total_and_part(rng, count, DEFECTIVE_PARTS[difficulty])
+    is_preset = preset_total > 0
+    total = np.where(is_preset, preset_total, total)
+    favorable = np.where(is_preset, preset_favorable, favorable)
+    return {"object": obj, "total": total, "favorable": favorable}, favorable, total
+
+
+def _sample_colored_balls(rng, count, difficulty):
+    color_choices, total_choices = COLORED_BALLS[difficulty]
+    num_colors = rng.choice(np.asarray(color_choices, dtype=np.int64), count)
+    total = rng.choice(np.asarray(total_choices, dtype=np.int64), count)
+
+    # Цвета: первые num_colors элементов случайной перестановки (argsort равномерного шума)
+    colors = np.argsort(rng.random((count, len(COLORS))), axis=1)[:, :MAX_COLORS]
+
+    # Количества: count_i ~ U[1, remaining - (оставшихся цветов)], последний цвет — остаток
+    counts = np.zeros((count, MAX_COLORS), dtype=np.int64)
+    remaining = total.copy()
+    rows = np.arange(count)
+    for i in range(MAX_COLORS - 1):
+        active = i < num_colors - 1
+        high = np.where(active, remaining - (num_colors - i - 1), 1)
+        drawn = rng.integers(1, high, endpoint=True)
+        counts[:, i] = np.where(active, drawn, 0)
+        remaining -= counts[:, i]
+    counts[rows, num_colors - 1] = remaining
+
+    target = rng.integers(0, num_colors)
+    params = {"total": total, "num_colors": num_colors, "colors": colors, "counts": counts, "target": target}
+    return params, counts[rows, target], total
+
+
+class SpaceTable(NamedTuple):
+    """Блоки пространства задач в массивах: смещения, дробь ответа блока, ключи для params"""
+    keys: List[Tuple]
+    offsets: np.ndarray
+    favorable: np.ndarray
+    total: np.ndarray
+    params: Callable[[Tuple, int], Dict]
+
+
+@lru_cache(maxsize=None)
+def space_table(task_type: str, difficulty: str) -> SpaceTable:
+    """
+    Пространство задач типа и сложности (строится один раз на процесс)
+
+    Дроби, не помещающиеся в int64 (at_least_one, hard), хранятся целыми Python (dtype=object).
+    """
+    enumerate_blocks, params = SPACES[task_type]
+    keys, offsets, favorable, total = [], [0], [], []
+    for key, block_favorable, block_total, size in enumerate_blocks(difficulty):
+        keys.append(key)
+        offsets.append(offsets[-1] + size)
+        favorable.append(block_favorable)
+        total.append(block_total)
+    dtype = np.int64 if max(total) <= INT64_MAX else object
+    return SpaceTable(keys, np.asarray(offsets, dtype=np.int64), np.asarray(favorable, dtype=dtype),
+                      np.asarray(total, dtype=dtype), params)
+
+
+def _space_sampler(task_type: str):
+    """Семплер типа без векторизованного розыгрыша: равномерные номера в пространстве задач"""
+
+    def sample(rng, count, difficulty):
+        table = space_table(task_type, difficulty)
+        index = rng.integers(0, table.offsets[-1], count)
+        block = np.searchsorted(table.offsets, index, side="right") - 1
+        params = {"block": block, "local": index - table.offsets[block]}
+        return params, table.favorable[block], table.total[block]
+
+    return sample
+
+
+SAMPLERS = {
+    "exam_tickets": _sample_exam_tickets,
+    "tv_channels": _sample_tv_channels,
+    "lottery": _sample_lottery,
+    "objects_selection": _sample_objects_selection,
+    "colored_balls": _sample_colored_balls,
+}
+SPACE_TYPES = [name for name in TASK_TYPES if name not in SAMPLERS]
+SAMPLERS.update({name: _space_sampler(name) for name in SPACE_TYPES})
+
+
+class TaskBatch:
+    """
+    Набор задач в колоночном виде
+
+    Общие колонки: type (код в TASK_TYPES), numerator/denominator (несократимая дробь), answer.
+    Параметры хранятся по типам: params[тип][колонка][j] для j-й задачи этого типа; у типов
+    из SPACE_TYPES колонки — блок и номер внутри блока пространства задач.
+    Если в наборе есть дроби больше int64, numerator/denominator — массивы dtype=object.
+    """
+
+    def __init__(self, difficulty: str, types: np.ndarray, rows: np.ndarray, params: Dict[str, Dict],
+                 numerator: np.ndarray, denominator: np.ndarray):
+        self.difficulty = difficulty
+        self.types = types
+        self.rows = rows
+        self.params = params
+        self.numerator = numerator
+        self.denominator = denominator
+        # float(Fraction(m, n)) и m / n в float64 совпадают: оба корректно округлены
+        self.answer = np.asarray(numerator / denominator, dtype=np.float64)
+        self._renderer = ProbabilityTaskGenerator(seed=0)
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Общие колонки (для pandas.DataFrame, Parquet и т.п.)"""
+        return {
+            "type": np.asarray(TASK_TYPES, dtype=object)[self.types],
+            "numerator": self.numerator,
+            "denominator": self.denominator,
+            "answer": self.answer,
+        }
+
+    def task_params(self, i: int) -> Dict:
+        """Параметры i-й задачи в формате ProbabilityTaskGenerator.render_task"""
+        task_type = TASK_TYPES[self.types[i]]
+        j = self.rows[i]
+        columns = self.params[task_type]
+        if task_type in SPACE_TYPES:
+            table = space_table(task_type, self.difficulty)
+            return table.params(table.keys[columns["block"][j]], int(columns["local"][j]))
+        if task_type == "colored_balls":
+            k = int(columns["num_colors"][j])
+            return {
+                "total": int(columns["total"][j]),
+                "counts": [int(c) for c in columns["counts"][j, :k]],
+                "colors": [int(c) for c in columns["colors"][j, :k]],
+                "target": int(columns["target"][j]),
+            }
+        return {name: int(values[j]) for name, values in columns.items()}
+
+    def task(self, i: int) -> Dict:
+        """i-я задача в привычном формате (условие и решение собираются сейчас)"""
+        task = self._renderer.render_task(TASK_TYPES[self.types[i]], self.difficulty, self.task_params(i))
+        task["id"] = i + 1
+        return task
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(len(self)):
+            yield self.task(i)
+
+    def to_dicts(self, start: int = 0, stop: int = None) -> List[Dict]:
+        return [self.task(i) for i in range(start, len(self) if stop is None else stop)]
+
+
+def generate_bulk(count: int, task_type: str = None, difficulty: str = "medium", seed: int = None) -> TaskBatch:
+    """
+    Векторизованная генерация count задач
+
+    Args:
+        count: Количество задач
+        task_type: Тип задачи (если None - случайный микс)
+        difficulty: Сложность (easy, medium, hard)
+        seed: Seed numpy-генератора (поток отличается от ProbabilityTaskGenerator с тем же seed)
+
+    Returns:
+        TaskBatch с колонками; задачи в формате dict — через task(i) / to_dicts()
+    """
+    if task_type is not None and task_type not in SAMPLERS:
+        raise ValueError(f"Неизвестный тип задачи: {task_type}")
+    if difficulty not in EXAM_TICKETS:
+        raise ValueError(f"Неизвестная сложность: {difficulty}")
+
+    rng = np.random.default_rng(seed)
+    if task_type is None:
+        types = rng.integers(0, len(TASK_TYPES), count).astype(np.uint8)
+    else:
+        types = np.full(count, TASK_TYPES.index(task_type), dtype=np.uint8)
+
+    rows = np.zeros(count, dtype=np.int64)
+    params = {}
+    fractions = []
+
+    for code, name in enumerate(TASK_TYPES):
+        positions = np.flatnonzero(types == code)
+        if len(positions) == 0:
+            continue
+        params[name], favorable, total = SAMPLERS[name](rng, len(positions), difficulty)
+        rows[positions] = np.arange(len(positions))
+        divisor = np.gcd(favorable, total)
+        fractions.append((positions, favorable // divisor, total // divisor))
+
+    dtype = object if any(total.dtype == object for _, _, total in fractions) else np.int64
+    numerator = np.zeros(count, dtype=dtype)
+    denominator = np.ones(count, dtype=dtype)
+    for positions, favorable, total in fractions:
+        numerator[positions] = favorable
+        denominator[positions] = total
+
+    return TaskBatch(difficulty, types, rows, params, numerator, denominator)
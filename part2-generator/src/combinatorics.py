@@ -0,0 +1,45 @@
+"""
+Комбинаторное ядро для задач с выбором нескольких объектов и повторными испытаниями
+Факториалы хранятся таблицей, которая растет по мере надобности (n! считается один раз
+на процесс), биномиальные коэффициенты кэшируются. Все вероятности — точные Fraction.
+"""
+
+import threading
+from fractions import Fraction
+from functools import lru_cache
+
+_factorials = [1]
+_lock = threading.Lock()
+
+
+def factorial(n: int) -> int:
+    """n! из таблицы; таблица дополняется до n при первом запросе"""
+    if n < len(_factorials):
+        return _factorials[n]
+    with _lock:
+        for i in range(len(_factorials), n + 1):
+            _factorials.append(_factorials[-1] * i)
+    return _factorials[n]
+
+
+@lru_cache(maxsize=1 << 16)
+def binomial(n: int, k: int) -> int:
+    """Число сочетаний C(n, k); 0 при k < 0 или k > n"""
+    if k < 0 or k > n:
+        return 0
+    return factorial(n) // (factorial(k) * factorial(n - k))
+
+
+def hypergeometric(total: int, marked: int, draws: int, hits: int) -> Fraction:
+    """P(среди draws вынутых без возвращения ровно hits отмеченных), отмеченных marked из total"""
+    return Fraction(binomial(marked, hits) * binomial(total - marked, draws - hits), binomial(total, draws))
+
+
+def at_least_one(total: int, marked: int, draws: int) -> Fraction:
+    """P(среди draws вынутых без возвращения хотя бы один отмеченный) = 1 - C(total - marked, draws) / C(total, draws)"""
+    return 1 - Fraction(binomial(total - marked, draws), binomial(total, draws))
+
+
+def bernoulli(trials: int, successes: int, p: Fraction) -> Fraction:
+    """Формула Бернулли: P(ровно successes успехов в trials независимых испытаниях)"""
+    return binomial(trials, successes) * p ** successes * (1 - p) ** (trials - successes)
@@ -0,0 +1,241 @@
+"""
+Потоковый экспорт сгенерированных задач в JSONL, CSV и Parquet
+Задачи берутся из ProbabilityTaskGenerator.iter_tasks и пишутся блоками по chunk_size:
+в памяти не больше одного блока при любом количестве задач.
+
+Рядом с выгрузкой лежит <файл>.meta.json: seed, параметры и сколько задач уже записано.
+Он обновляется после каждого блока, поэтому прерванный экспорт продолжается с --resume
+с того же места и дает тот же файл, что и непрерывный прогон.
+
+Пример:
+    python src/export.py tasks.jsonl --count 1000000 --seed 42 --difficulty hard
+    python src/export.py tasks.jsonl --resume
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterable, List
+
+from generator import ProbabilityTaskGenerator
+
+FIELDS = ["id", "type", "difficulty", "condition", "answer", "answer_fraction", "solution"]
+FORMATS = {".jsonl": "jsonl", ".csv": "csv", ".parquet": "parquet"}
+
+
+class JsonlWriter:
+    """Одна задача — одна строка JSON"""
+
+    def __init__(self, path: str, offset: int = 0):
+        self.file = _open_at(path, offset, newline="")
+
+    def write(self, tasks: List[Dict]):
+        self.file.write("".join(json.dumps({f: t[f] for f in FIELDS}, ensure_ascii=False) + "\n" for t in tasks))
+
+    def commit(self) -> int:
+        """Сбрасывает блок на диск; возвращает длину файла (точка продолжения)"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class CsvWriter(JsonlWriter):
+    """CSV с заголовком; многострочные решения экранируются кавычками по правилам csv"""
+
+    def __init__(self, path: str, offset: int = 0):
+        self.file = _open_at(path, offset, newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=FIELDS, extrasaction="ignore")
+        if offset == 0:
+            self.writer.writeheader()
+
+    def write(self, tasks: List[Dict]):
+        self.writer.writerows(tasks)
+
+
+class ParquetWriter:
+    """
+    Parquet-датасет: каталог с файлом part-NNNNN.parquet на каждый блок
+
+    Файл Parquet нельзя дописать после закрытия, поэтому блоки — отдельные файлы;
+    pandas.read_parquet и pyarrow.dataset читают каталог как одну таблицу.
+    """
+
+    def __init__(self, path: str, offset: int = 0):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Для экспорта в Parquet установите pyarrow: pip install pyarrow")
+        self.pa = pa
+        self.pq = pq
+        self.schema = pa.schema([
+            ("id", pa.int64()), ("type", pa.string()), ("difficulty", pa.string()), ("condition", pa.string()),
+            ("answer", pa.float64()), ("answer_fraction", pa.string()), ("solution", pa.string()),
+        ])
+        self.path = path
+        # offset — число уже записанных блоков; недописанный блок после сбоя перезаписывается
+        self.part = offset
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, tasks: List[Dict]):
+        table = self.pa.Table.from_pylist([{f: t[f] for f in FIELDS} for t in tasks], schema=self.schema)
+        part_path = os.path.join(self.path, f"part-{self.part:05d}.parquet")
+        self.pq.write_table(table, part_path + ".tmp")
+        os.replace(part_path + ".tmp", part_path)
+        self.part += 1
+
+    def commit(self) -> int:
+        return self.part
+
+    def close(self):
+        pass
+
+
+WRITERS = {"jsonl": JsonlWriter, "csv": CsvWriter, "parquet": ParquetWriter}
+
+
+def _open_at(path: str, offset: int, newline):
+    """Файл для записи с позиции offset; хвост после нее (недописанный блок) отрезается"""
+    if offset == 0:
+        return open(path, "w", encoding="utf-8", newline=newline)
+    f = open(path, "r+", encoding="utf-8", newline=newline)
+    f.seek(offset)
+    f.truncate()
+    return f
+
+
+def meta_path(path: str) -> str:
+    return path.rstrip("/\\") + ".meta.json"
+
+
+def _save_meta(path: str, meta: Dict):
+    tmp = meta_path(path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, meta_path(path))
+
+
+def _chunks(tasks: Iterable[Dict], size: int) -> Iterable[List[Dict]]:
+    chunk = []
+    for task in tasks:
+        chunk.append(task)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def export_tasks(path: str, count: int = None, seed: int = None, task_type: str = None, difficulty: str = "medium",
+                 start: int = 0, chunk_size: int = 10_000, fmt: str = None, resume: bool = False,
+                 progress: bool = True) -> Dict:
+    """
+    Экспорт задач start..start+count-1 потока seed в файл
+
+    Args:
+        path: Файл (.jsonl, .csv) или каталог (.parquet)
+        count, seed, task_type, difficulty, start: Что генерировать; при resume берутся из meta.json
+        chunk_size: Задач в блоке (и между сохранениями прогресса)
+        fmt: jsonl, csv или parquet; по умолчанию — по расширению path
+        resume: Продолжить прерванный экспорт
+
+    Returns:
+        Статистика: записано задач, секунд, задач/с
+    """
+    if resume:
+        with open(meta_path(path), encoding="utf-8") as f:
+            meta = json.load(f)
+    else:
+        fmt = fmt or FORMATS.get(os.path.splitext(path.rstrip("/\\"))[1].lower())
+        if fmt not in WRITERS:
+            raise ValueError(f"Неизвестный формат выгрузки: {path} (нужно .jsonl, .csv или .parquet)")
+        if count is None:
+            raise ValueError("Не задано количество задач")
+        meta = {
+            "format": fmt, "seed": ProbabilityTaskGenerator(seed).seed, "start": start, "count": count,
+            "task_type": task_type, "difficulty": difficulty, "chunk_size": chunk_size, "written": 0, "offset": 0,
+        }
+        _save_meta(path, meta)
+
+    generator = ProbabilityTaskGenerator(meta["seed"])
+    done = meta["written"]
+    remaining = meta["count"] - done
+    writer = WRITERS[meta["format"]](path, meta["offset"])
+
+    started = time.perf_counter()
+    written = 0
+    try:
+        tasks = generator.iter_tasks(remaining, meta["task_type"], meta["difficulty"], start=meta["start"] + done)
+        for chunk in _chunks(tasks, meta["chunk_size"]):
+            writer.write(chunk)
+            written += len(chunk)
+            meta["offset"] = writer.commit()
+            meta["written"] = done + written
+            _save_meta(path, meta)
+            if progress:
+                elapsed = time.perf_counter() - started
+                print(f"\r   {meta['written']:,}/{meta['count']:,} задач, {written / elapsed:,.0f} задач/с",
+                      end="", flush=True)
+    finally:
+        writer.close()
+        if progress:
+            print()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "path": path,
+        "format": meta["format"],
+        "seed": meta["seed"],
+        "written": written,
+        "total": meta["written"],
+        "seconds": elapsed,
+        "tasks_per_second": written / elapsed if elapsed else 0.0,
+    }
+
+
+def _size_bytes(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+    return os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Потоковый экспорт задач в JSONL / CSV / Parquet")
+    parser.add_argument('output', help="Файл .jsonl / .csv или каталог .parquet")
+    parser.add_argument('--count', type=int, default=None, help="Количество задач")
+    parser.add_argument('--seed', type=int, default=None, help="Seed потока (по умолчанию случайный, пишется в meta)")
+    parser.add_argument('--start', type=int, default=0, help="Номер первой задачи в потоке")
+    parser.add_argument('--task-type', default=None, help="Тип задачи (по умолчанию — микс)")
+    parser.add_argument('--difficulty', default='medium', choices=['easy', 'medium', 'hard'])
+    parser.add_argument('--format', default=None, choices=sorted(WRITERS), help="По умолчанию — по расширению")
+    parser.add_argument('--chunk-size', type=int, default=10_000, help="Задач в блоке записи")
+    parser.add_argument('--resume', action='store_true', help="Продолжить прерванный экспорт по meta.json")
+    args = parser.parse_args()
+
+    if args.resume and not os.path.exists(meta_path(args.output)):
+        print(f"Ошибка: нет {meta_path(args.output)} — нечего продолжать")
+        sys.exit(1)
+    if not args.resume and args.count is None:
+        parser.error("нужен --count (или --resume)")
+
+    stats = export_tasks(
+        args.output, count=args.count, seed=args.seed, task_type=args.task_type, difficulty=args.difficulty,
+        start=args.start, chunk_size=args.chunk_size, fmt=args.format, resume=args.resume
+    )
+
+    print("=" * 80)
+    print(f"Выгрузка:     {stats['path']} ({stats['format']}, seed {stats['seed']})")
+    print(f"Записано:     {stats['written']:,} задач за {stats['seconds']:.1f} с (всего в файле {stats['total']:,})")
+    print(f"Скорость:     {stats['tasks_per_second']:,.0f} задач/с")
+    print(f"Размер:       {_size_bytes(args.output) / 2 ** 20:,.1f} МБ")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,253 @@
 """
 
 import random
-from typing import Dict, List, Tuple
-from fractions import Fraction
+import threading
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from combinatorics import at_least_one, binomial, hypergeometric
+from specs import load_specs
+from templates import compile_template, plural, probability
+
+MASK64 = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+
+def _mix64(z: int) -> int:
+    """Финализатор SplitMix64: хорошо перемешивает биты 64-битного числа"""
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return z ^ (z >> 31)
+
+
+def task_seed(seed: int, index: int) -> int:
+    """
+    Seed задачи с номером index в потоке seed (counter-based схема)
+
+    Задача k зависит только от (seed, k): ее можно получить за O(1),
+    не повторяя предыдущие розыгрыши, в любом потоке или процессе.
+    """
+    return _mix64((_mix64(seed & MASK64) + (index + 1) * GOLDEN_GAMMA) & MASK64)
+
+
+# Словари для текста задач: в параметрах задачи хранятся индексы в этих списках
+NAMES = [
+    "Андрей", "Маша", "Дима", "Катя", "Олег", "Аня", "Сергей", "Лена",
+    "Максим", "Вика", "Артём", "Даша", "Никита", "Соня"
+]
+
+THEMES = [
+    "новости", "спортивные программы", "детские передачи",
+    "музыкальные каналы", "познавательные программы", "фильмы"
+]
+
+PRIZES = ["приз", "выигрышный билет", "подарок", "сертификат"]
+
+# (объекты, где, благоприятный объект, благоприятных, всего); None — числа зависят от сложности
+OBJECTS = [
+    ("карт", "колоде", "красная карта", 26, 52),
+    ("карт", "колоде", "карта пиковой масти", 13, 52),
+    ("дней", "году", "будний день", 250, 365),
+    ("деталей", "партии", "бракованная деталь", None, None),
+]
+
+COLORS = ["красных", "синих", "зелёных", "жёлтых", "белых", "чёрных"]
+
+# Диапазоны параметров по сложности:
+# (варианты общего числа, минимум благоприятных, максимум, отступ от общего числа) —
+# благоприятных выбирается из [минимум, min(максимум, общее - отступ)]
+EXAM_TICKETS = {
+    "easy": ([10, 12, 15, 20], 1, 3, 1),
+    "medium": ([20, 24, 25, 30, 40], 2, 6, 2),
+    "hard": ([50, 60, 80, 100], 5, 15, 5),
+}
+TV_CHANNELS = {
+    "easy": ([10, 12, 15, 20], 2, 5, 1),
+    "medium": ([30, 40, 45, 50], 5, 15, 5),
+    "hard": ([60, 80, 100, 120], 10, 30, 10),
+}
+LOTTERY = {
+    "easy": ([10, 15, 20, 25], 1, 5, 1),
+    "medium": ([50, 100, 200, 250], 5, 30, 5),
+    "hard": ([500, 1000, 2000], 10, 100, 10),
+}
+DEFECTIVE_PARTS = {
+    "easy": ([20, 25, 30, 40], 2, 8, 2),
+    "medium": ([50, 80, 100, 150], 5, 25, 5),
+    "hard": ([200, 300, 500], 10, 50, 10),
+}
+# (варианты числа цветов, варианты общего числа шаров)
+COLORED_BALLS = {
+    "easy": ([2], [10, 12, 15, 20]),
+    "medium": ([2, 3], [20, 24, 30, 40]),
+    "hard": ([3, 4], [50, 60, 80, 100]),
+}
+
+
+# Комбинаторные типы: (варианты общего числа, (мин, макс) отмеченных, варианты числа вынутых)
+WITHOUT_REPLACEMENT = {
+    "easy": ([10, 12, 15, 20], (3, 7), [2, 3]),
+    "medium": ([20, 25, 30, 40], (5, 12), [3, 4]),
+    "hard": ([100, 200, 300, 500], (10, 60), [4, 5, 6, 8]),
+}
+AT_LEAST_ONE = {
+    "easy": ([10, 12, 15, 20], (1, 4), [2, 3]),
+    "medium": ([20, 30, 40, 50], (2, 8), [2, 3, 4]),
+    "hard": ([100, 200, 500], (5, 30), [5, 10, 20]),
+}
+
+# Сколько раз generate_batch(skip=...) заменяет отбракованную задачу, прежде чем отдать ее
+MAX_SKIPS = 64
+
+
+def part_range(total: int, spec: Tuple) -> range:
+    """Допустимые значения благоприятных исходов при данном общем числе"""
+    _, low, high, margin = spec
+    return range(low, min(high, total - margin) + 1)
+
+
+def _draw_total_and_part(rng: random.Random, spec: Tuple) -> Tuple[int, int]:
+    choices, low, high, margin = spec
+    total = rng.choice(choices)
+    return total, rng.randint(low, min(high, total - margin))
+
+
+# Скомпилированные шаблоны (templates.compile_template): текст склеивается один раз при импорте
+EXAM_TICKETS_CONDITION = compile_template(
+    "На экзамене {total} вопросов. {name} не выучил(а) {unstudied} из них. "
+    "Найдите вероятность того, что ему достанется выученный вопрос."
+)
+EXAM_TICKETS_SOLUTION = compile_template(
+    "**Шаг 1:** Определяем общее количество возможных исходов",
+    "Всего вопросов: {total}",
+    "",
+    "**Шаг 2:** Определяем количество благоприятных исходов",
+    "Выученных вопросов: {total} - {unstudied} = {studied}",
+    "",
+    "**Шаг 3:** Вычисляем вероятность по формуле P = m/n",
+    "где m - число благоприятных исходов, n - число всех возможных исходов",
+    "",
+    "P = {studied}/{total}",
+)
+
+_TV_CHANNELS_QUESTION = (
+    "{name} включает телевизор на случайном канале. "
+    "Всего телевизор показывает {total} каналов, из них {thematic} показывают {theme}. "
+    "Найдите вероятность того, что телевизор окажется настроен на канал, "
+)
+# Индекс — params["negate"]
+TV_CHANNELS_CONDITION = (
+    compile_template(_TV_CHANNELS_QUESTION + "показывающий {theme}."),
+    compile_template(_TV_CHANNELS_QUESTION + "НЕ показывающий {theme}."),
+)
+_TV_CHANNELS_STEPS = (
+    "**Шаг 1:** Определяем общее количество возможных исходов",
+    "Всего каналов: {total}",
+    "",
+    "**Шаг 2:** Определяем количество благоприятных исходов",
+    "Каналов с тематикой '{theme}': {thematic}",
+)
+_TV_CHANNELS_FORMULA = (
+    "",
+    "**Шаг 3:** Вычисляем вероятность по формуле P = m/n",
+    "P = {favorable}/{total}",
+)
+TV_CHANNELS_SOLUTION = (
+    compile_template(*_TV_CHANNELS_STEPS, "Благоприятных исходов: {favorable}", *_TV_CHANNELS_FORMULA),
+    compile_template(*_TV_CHANNELS_STEPS, "Каналов БЕЗ этой тематики: {total} - {thematic} = {favorable}",
+                     *_TV_CHANNELS_FORMULA),
+)
+
+LOTTERY_CONDITION = compile_template(
+    "В лотерее {total} билетов, из них {winning} выигрышных. "
+    "{name} покупает один билет. Найдите вероятность того, что он окажется выигрышным."
+)
+LOTTERY_SOLUTION = compile_template(
+    "**Шаг 1:** Определяем общее количество возможных исходов",
+    "Всего билетов в лотерее: {total}",
+    "",
+    "**Шаг 2:** Определяем количество благоприятных исходов",
+    "Выигрышных билетов: {winning}",
+    "",
+    "**Шаг 3:** Вычисляем вероятность по формуле P = m/n",
+    "P = {winning}/{total}",
+)
+
+# Слова объекта подставляются при компиляции: на задачу остаются только числовые слоты
+OBJECTS_CONDITION = [
+    compile_template(
+        f"В {location} {{total}} {obj_name}, из них {{favorable}} — {favorable_name}. "
+        f"Случайным образом выбирается одна единица. Найдите вероятность того, что это будет {favorable_name}."
+    )
+    for obj_name, location, favorable_name, _, _ in OBJECTS
+]
+OBJECTS_SOLUTION = [
+    compile_template(
+        "**Шаг 1:** Определяем общее количество возможных исходов",
+        f"Всего {obj_name}: {{total}}",
+        "",
+        "**Шаг 2:** Определяем количество благоприятных исходов",
+        f"Количество '{favorable_name}': {{favorable}}",
+        "",
+        "**Шаг 3:** Вычисляем вероятность",
+        "P = {favorable}/{total}",
+    )
+    for obj_name, _, favorable_name, _, _ in OBJECTS
+]
+
+COLORED_BALLS_CONDITION = compile_template(
+    "В коробке лежат {total} шаров: {description}. "
+    "Случайным образом достаётся один шар. Найдите вероятность того, что он будет {color}им."
+)
+COLORED_BALLS_SOLUTION = [
+    compile_template(
+        "**Шаг 1:** Определяем общее количество возможных исходов",
+        "Всего шаров: {total}",
+        "",
+        "**Шаг 2:** Определяем количество благоприятных исходов",
+        f"{color.capitalize()} шаров: {{count}}",
+        "",
+        "**Шаг 3:** Вычисляем вероятность",
+        "P = {count}/{total}",
+    )
+    for color in COLORS
+]
+# Основа прилагательного для вопроса («красных» -> «красн» + «им»)
+COLOR_STEMS = [color[:-2] for color in COLORS]
+
+WITHOUT_REPLACEMENT_CONDITION = compile_template(
+    "В урне {total} {balls}: {marked} {white} и {other} {black}. Наугад вынимают {draws} {drawn} "
+    "без возвращения. Найдите вероятность того, что среди них ровно {hits} {hits_white}."
+)
+WITHOUT_REPLACEMENT_SOLUTION = compile_template(
+    "**Шаг 1:** Определяем общее количество возможных исходов",
+    "Способов вынуть {draws} из {total}: C({total}, {draws}) = {ways}",
+    "",
+    "**Шаг 2:** Определяем количество благоприятных исходов",
+    "Белых {hits} из {marked} и чёрных {rest} из {other}:",
+    "C({marked}, {hits}) · C({other}, {rest}) = {white_ways} · {black_ways} = {favorable}",
+    "",
+    "**Шаг 3:** Вычисляем вероятность",
+    "P = {favorable}/{ways}",
+)
+
+AT_LEAST_ONE_CONDITION = compile_template(
+    "В партии из {total} {parts} {defective} {defective_word}. Контролёр наугад берёт {draws} {taken}. "
+    "Найдите вероятность того, что среди них окажется хотя бы одна бракованная деталь."
+)
+AT_LEAST_ONE_SOLUTION = compile_template(
+    "**Шаг 1:** Переходим к противоположному событию: среди выбранных нет бракованных",
+    "",
+    "**Шаг 2:** Считаем исходы",
+    "Способов выбрать {draws} из {total}: C({total}, {draws}) = {ways}",
+    "Способов выбрать {draws} исправных из {good}: C({good}, {draws}) = {none}",
+    "",
+    "**Шаг 3:** Вычисляем вероятность",
+    "P(нет бракованных) = {none}/{ways}",
+    "P(хотя бы одна) = 1 - {none}/{ways} = {favorable}/{ways}",
+)
+
+# Типы задач из декларативных спецификаций: компилируются при импорте (байткод — из кэша)
+SPEC_TYPES = load_specs(vocab={"NAMES": NAMES, "THEMES": THEMES, "COLORS": COLORS})
 
 
 class ProbabilityTaskGenerator:
@@ -16,10 +261,14 @@ class ProbabilityTaskGenerator:
         Инициализация генератора
 
         Args:
-            seed: Seed для воспроизводимости результатов
+            seed: Seed для воспроизводимости результатов (если None — случайный)
         """
-        if seed is not None:
-            random.seed(seed)
+        # Собственный seed вместо глобального random.seed: генераторы не влияют друг на друга
+        self.seed = seed if seed is not None else random.SystemRandom().getrandbits(64)
+
+        # Номер следующей задачи потока; резервируется под блокировкой
+        self.position = 0
+        self._lock = threading.Lock()
 
         # Шаблоны задач разных типов
         self.task_templates = {
@@ -28,320 +277,331 @@ class ProbabilityTaskGenerator:
             "lottery": self._generate_lottery,
             "objects_selection": self._generate_objects_selection,
             "colored_balls": self._generate_colored_balls,
+            "without_replacement": self._generate_without_replacement,
+            "at_least_one": self._generate_at_least_one,
+        }
+
+        # Отрисовка условия и решения по готовым параметрам (см. render_task)
+        self.task_renderers = {
+            "exam_tickets": self._render_exam_tickets,
+            "tv_channels": self._render_tv_channels,
+            "lottery": self._render_lottery,
+            "objects_selection": self._render_objects_selection,
+            "colored_balls": self._render_colored_balls,
+            "without_replacement": self._render_without_replacement,
+            "at_least_one": self._render_at_least_one,
         }
 
+        # Типы из спецификаций specs/*.json (см. specs.py)
+        for name, spec in SPEC_TYPES.items():
+            self.task_templates[name] = spec.generate
+            self.task_renderers[name] = spec.render
+
         # Имена для разнообразия
-        self.names = [
-            "Андрей", "Маша", "Дима", "Катя", "Олег", "Аня", "Сергей", "Лена",
-            "Максим", "Вика", "Артём", "Даша", "Никита", "Соня"
-        ]
+        self.names = NAMES
+
+    def render_task(self, task_type: str, difficulty: str, params: Dict) -> Dict:
+        """
+        Собирает задачу по параметрам (без случайных чисел)
+
+        Args:
+            task_type: Тип задачи
+            difficulty: Сложность
+            params: Целочисленные параметры задачи; словари — индексы в NAMES, THEMES, ...
+
+        Returns:
+            Dict с полями: condition, answer, answer_fraction, solution, type, difficulty
+        """
+        return self.task_renderers[task_type](params, difficulty)
 
-    def _generate_exam_tickets(self, difficulty: str = "medium") -> Dict:
+    def _generate_exam_tickets(self, rng: random.Random, difficulty: str = "medium") -> Dict:
         """Генерирует задачу про экзаменационные билеты"""
 
-        if difficulty == "easy":
-            total_tickets = random.choice([10, 12, 15, 20])
-            unstudied = random.randint(1, min(3, total_tickets - 1))
-        elif difficulty == "medium":
-            total_tickets = random.choice([20, 24, 25, 30, 40])
-            unstudied = random.randint(2, min(6, total_tickets - 2))
-        else:  # hard
-            total_tickets = random.choice([50, 60, 80, 100])
-            unstudied = random.randint(5, min(15, total_tickets - 5))
-
-        studied = total_tickets - unstudied
-        name = random.choice(self.names)
-
-        # Формируем условие
-        condition = (
-            f"На экзамене {total_tickets} вопросов. {name} не выучил(а) {unstudied} из них. "
-            f"Найдите вероятность того, что ему достанется выученный вопрос."
+        total_tickets, unstudied = _draw_total_and_part(rng, EXAM_TICKETS[difficulty])
+        name = rng.randrange(len(NAMES))
+
+        return self._render_exam_tickets(
+            {"total": total_tickets, "unstudied": unstudied, "name": name}, difficulty
         )
 
-        # Решение пошагово
-        solution_steps = [
-            f"**Шаг 1:** Определяем общее количество возможных исходов",
-            f"Всего вопросов: {total_tickets}",
-            f"",
-            f"**Шаг 2:** Определяем количество благоприятных исходов",
-            f"Выученных вопросов: {total_tickets} - {unstudied} = {studied}",
-            f"",
-            f"**Шаг 3:** Вычисляем вероятность по формуле P = m/n",
-            f"где m - число благоприятных исходов, n - число всех возможных исходов",
-            f"",
-            f"P = {studied}/{total_tickets}",
-        ]
-
-        # Упрощаем дробь
-        fraction = Fraction(studied, total_tickets)
-        answer = float(fraction)
-
-        if fraction.denominator != 1 and fraction != Fraction(studied, total_tickets):
-            solution_steps.append(f"P = {fraction.numerator}/{fraction.denominator}")
-
-        if fraction.denominator != 1:
-            solution_steps.append(f"P = {answer:.4f}")
+    def _render_exam_tickets(self, params: Dict, difficulty: str) -> Dict:
+        total = params["total"]
+        unstudied = params["unstudied"]
+        studied = total - unstudied
+
+        answer, answer_fraction, tail = probability(studied, total, show_fraction=False)
 
         return {
-            "condition": condition,
+            "condition": EXAM_TICKETS_CONDITION(total=total, unstudied=unstudied, name=NAMES[params["name"]]),
             "answer": answer,
-            "answer_fraction": f"{fraction.numerator}/{fraction.denominator}",
-            "solution": "\n".join(solution_steps),
+            "answer_fraction": answer_fraction,
+            "solution": EXAM_TICKETS_SOLUTION(total=total, unstudied=unstudied, studied=studied) + tail,
             "type": "exam_tickets",
             "difficulty": difficulty
         }
 
-    def _generate_tv_channels(self, difficulty: str = "medium") -> Dict:
+    def _generate_tv_channels(self, rng: random.Random, difficulty: str = "medium") -> Dict:
         """Генерирует задачу про телевизионные каналы"""
 
-        if difficulty == "easy":
-            total_channels = random.choice([10, 12, 15, 20])
-            thematic = random.randint(2, min(5, total_channels - 1))
-        elif difficulty == "medium":
-            total_channels = random.choice([30, 40, 45, 50])
-            thematic = random.randint(5, min(15, total_channels - 5))
-        else:  # hard
-            total_channels = random.choice([60, 80, 100, 120])
-            thematic = random.randint(10, min(30, total_channels - 10))
-
-        name = random.choice(self.names)
-        theme = random.choice([
-            "новости", "спортивные программы", "детские передачи",
-            "музыкальные каналы", "познавательные программы", "фильмы"
-        ])
-
-        event_type = random.choice(["попадёт", "не попадёт"])
-
-        if event_type == "попадёт":
-            favorable = thematic
-            condition = (
-                f"{name} включает телевизор на случайном канале. "
-                f"Всего телевизор показывает {total_channels} каналов, из них {thematic} показывают {theme}. "
-                f"Найдите вероятность того, что телевизор окажется настроен на канал, показывающий {theme}."
-            )
-        else:
-            favorable = total_channels - thematic
-            condition = (
-                f"{name} включает телевизор на случайном канале. "
-                f"Всего телевизор показывает {total_channels} каналов, из них {thematic} показывают {theme}. "
-                f"Найдите вероятность того, что телевизор окажется настроен на канал, НЕ показывающий {theme}."
-            )
-
-        solution_steps = [
-            f"**Шаг 1:** Определяем общее количество возможных исходов",
-            f"Всего каналов: {total_channels}",
-            f"",
-            f"**Шаг 2:** Определяем количество благоприятных исходов",
-        ]
-
-        if event_type == "попадёт":
-            solution_steps.append(f"Каналов с тематикой '{theme}': {thematic}")
-            solution_steps.append(f"Благоприятных исходов: {favorable}")
-        else:
-            solution_steps.append(f"Каналов с тематикой '{theme}': {thematic}")
-            solution_steps.append(f"Каналов БЕЗ этой тематики: {total_channels} - {thematic} = {favorable}")
-
-        solution_steps.extend([
-            f"",
-            f"**Шаг 3:** Вычисляем вероятность по формуле P = m/n",
-            f"P = {favorable}/{total_channels}",
-        ])
+        total_channels, thematic = _draw_total_and_part(rng, TV_CHANNELS[difficulty])
+        name = rng.randrange(len(NAMES))
+        theme = rng.randrange(len(THEMES))
+        # 0 — попадёт на тематический канал, 1 — не попадёт
+        negate = rng.randrange(2)
 
-        fraction = Fraction(favorable, total_channels)
-        answer = float(fraction)
+        return self._render_tv_channels(
+            {"total": total_channels, "thematic": thematic, "name": name, "theme": theme, "negate": negate},
+            difficulty
+        )
 
-        if fraction.denominator != 1 and fraction != Fraction(favorable, total_channels):
-            solution_steps.append(f"P = {fraction.numerator}/{fraction.denominator}")
+    def _render_tv_channels(self, params: Dict, difficulty: str) -> Dict:
+        total = params["total"]
+        thematic = params["thematic"]
+        negate = params["negate"]
+        theme = THEMES[params["theme"]]
+        favorable = total - thematic if negate else thematic
 
-        if fraction.denominator != 1:
-            solution_steps.append(f"P = {answer:.4f}")
+        answer, answer_fraction, tail = probability(favorable, total, show_fraction=False)
+        solution = TV_CHANNELS_SOLUTION[negate](total=total, thematic=thematic, theme=theme, favorable=favorable)
 
         return {
-            "condition": condition,
+            "condition": TV_CHANNELS_CONDITION[negate](
+                name=NAMES[params["name"]], total=total, thematic=thematic, theme=theme
+            ),
             "answer": answer,
-            "answer_fraction": f"{fraction.numerator}/{fraction.denominator}",
-            "solution": "\n".join(solution_steps),
+            "answer_fraction": answer_fraction,
+            "solution": solution + tail,
             "type": "tv_channels",
             "difficulty": difficulty
         }
 
-    def _generate_lottery(self, difficulty: str = "medium") -> Dict:
+    def _generate_lottery(self, rng: random.Random, difficulty: str = "medium") -> Dict:
         """Генерирует задачу про лотерею или розыгрыш"""
 
-        if difficulty == "easy":
-            total_tickets = random.choice([10, 15, 20, 25])
-            winning = random.randint(1, min(5, total_tickets - 1))
-        elif difficulty == "medium":
-            total_tickets = random.choice([50, 100, 200, 250])
-            winning = random.randint(5, min(30, total_tickets - 5))
-        else:  # hard
-            total_tickets = random.choice([500, 1000, 2000])
-            winning = random.randint(10, min(100, total_tickets - 10))
-
-        name = random.choice(self.names)
-        prize = random.choice(["приз", "выигрышный билет", "подарок", "сертификат"])
-
-        condition = (
-            f"В лотерее {total_tickets} билетов, из них {winning} выигрышных. "
-            f"{name} покупает один билет. Найдите вероятность того, что он окажется выигрышным."
-        )
-
-        solution_steps = [
-            f"**Шаг 1:** Определяем общее количество возможных исходов",
-            f"Всего билетов в лотерее: {total_tickets}",
-            f"",
-            f"**Шаг 2:** Определяем количество благоприятных исходов",
-            f"Выигрышных билетов: {winning}",
-            f"",
-            f"**Шаг 3:** Вычисляем вероятность по формуле P = m/n",
-            f"P = {winning}/{total_tickets}",
-        ]
+        total_tickets, winning = _draw_total_and_part(rng, LOTTERY[difficulty])
+        name = rng.randrange(len(NAMES))
+        prize = rng.randrange(len(PRIZES))
 
-        fraction = Fraction(winning, total_tickets)
-        answer = float(fraction)
+        return self._render_lottery(
+            {"total": total_tickets, "winning": winning, "name": name, "prize": prize}, difficulty
+        )
 
-        if fraction.denominator != 1 and fraction != Fraction(winning, total_tickets):
-            solution_steps.append(f"P = {fraction.numerator}/{fraction.denominator}")
+    def _render_lottery(self, params: Dict, difficulty: str) -> Dict:
+        total = params["total"]
+        winning = params["winning"]
 
-        if fraction.denominator != 1:
-            solution_steps.append(f"P = {answer:.4f}")
+        answer, answer_fraction, tail = probability(winning, total, show_fraction=False)
 
         return {
-            "condition": condition,
+            "condition": LOTTERY_CONDITION(total=total, winning=winning, name=NAMES[params["name"]]),
             "answer": answer,
-            "answer_fraction": f"{fraction.numerator}/{fraction.denominator}",
-            "solution": "\n".join(solution_steps),
+            "answer_fraction": answer_fraction,
+            "solution": LOTTERY_SOLUTION(total=total, winning=winning) + tail,
             "type": "lottery",
             "difficulty": difficulty
         }
 
-    def _generate_objects_selection(self, difficulty: str = "medium") -> Dict:
+    def _generate_objects_selection(self, rng: random.Random, difficulty: str = "medium") -> Dict:
         """Генерирует задачу про выбор объектов (карты, номера и т.д.)"""
 
-        objects = [
-            ("карт", "колоде", "красная карта", 26, 52),
-            ("карт", "колоде", "карта пиковой масти", 13, 52),
-            ("дней", "году", "будний день", 250, 365),
-            ("деталей", "партии", "бракованная деталь", None, None),
-        ]
-
-        obj_data = random.choice(objects)
-        obj_name, location, favorable_name, fav_count_preset, total_preset = obj_data
+        obj = rng.randrange(len(OBJECTS))
+        obj_name, location, favorable_name, fav_count_preset, total_preset = OBJECTS[obj]
 
         if total_preset is None:
-            if difficulty == "easy":
-                total = random.choice([20, 25, 30, 40])
-                favorable_count = random.randint(2, min(8, total - 2))
-            elif difficulty == "medium":
-                total = random.choice([50, 80, 100, 150])
-                favorable_count = random.randint(5, min(25, total - 5))
-            else:
-                total = random.choice([200, 300, 500])
-                favorable_count = random.randint(10, min(50, total - 10))
+            total, favorable_count = _draw_total_and_part(rng, DEFECTIVE_PARTS[difficulty])
         else:
             total = total_preset
             favorable_count = fav_count_preset
 
-        condition = (
-            f"В {location} {total} {obj_name}, из них {favorable_count} — {favorable_name}. "
-            f"Случайным образом выбирается одна единица. Найдите вероятность того, что это будет {favorable_name}."
+        return self._render_objects_selection(
+            {"object": obj, "total": total, "favorable": favorable_count}, difficulty
         )
 
-        solution_steps = [
-            f"**Шаг 1:** Определяем общее количество возможных исходов",
-            f"Всего {obj_name}: {total}",
-            f"",
-            f"**Шаг 2:** Определяем количество благоприятных исходов",
-            f"Количество '{favorable_name}': {favorable_count}",
-            f"",
-            f"**Шаг 3:** Вычисляем вероятность",
-            f"P = {favorable_count}/{total}",
-        ]
-
-        fraction = Fraction(favorable_count, total)
-        answer = float(fraction)
+    def _render_objects_selection(self, params: Dict, difficulty: str) -> Dict:
+        obj = params["object"]
+        total = params["total"]
+        favorable = params["favorable"]
 
-        if fraction.denominator != 1:
-            solution_steps.append(f"P = {fraction.numerator}/{fraction.denominator}")
-            solution_steps.append(f"P = {answer:.4f}")
+        answer, answer_fraction, tail = probability(favorable, total)
 
         return {
-            "condition": condition,
+            "condition": OBJECTS_CONDITION[obj](total=total, favorable=favorable),
             "answer": answer,
-            "answer_fraction": f"{fraction.numerator}/{fraction.denominator}",
-            "solution": "\n".join(solution_steps),
+            "answer_fraction": answer_fraction,
+            "solution": OBJECTS_SOLUTION[obj](total=total, favorable=favorable) + tail,
             "type": "objects_selection",
             "difficulty": difficulty
         }
 
-    def _generate_colored_balls(self, difficulty: str = "medium") -> Dict:
+    def _generate_colored_balls(self, rng: random.Random, difficulty: str = "medium") -> Dict:
         """Генерирует задачу про цветные шары в коробке"""
 
-        colors = ["красных", "синих", "зелёных", "жёлтых", "белых", "чёрных"]
+        color_choices, total_choices = COLORED_BALLS[difficulty]
+        # Один вариант числа цветов (easy) не расходует случайное число — как раньше с num_colors = 2
+        num_colors = rng.choice(color_choices) if len(color_choices) > 1 else color_choices[0]
+        total_balls = rng.choice(total_choices)
 
-        if difficulty == "easy":
-            num_colors = 2
-            total_balls = random.choice([10, 12, 15, 20])
-        elif difficulty == "medium":
-            num_colors = random.choice([2, 3])
-            total_balls = random.choice([20, 24, 30, 40])
-        else:
-            num_colors = random.choice([3, 4])
-            total_balls = random.choice([50, 60, 80, 100])
-
-        selected_colors = random.sample(colors, num_colors)
+        selected_colors = rng.sample(range(len(COLORS)), num_colors)
         color_counts = []
 
         remaining = total_balls
         for i in range(num_colors - 1):
-            count = random.randint(1, remaining - (num_colors - i - 1))
+            count = rng.randint(1, remaining - (num_colors - i - 1))
             color_counts.append(count)
             remaining -= count
         color_counts.append(remaining)
 
-        target_color_idx = random.randint(0, num_colors - 1)
-        target_color = selected_colors[target_color_idx]
-        target_count = color_counts[target_color_idx]
+        target_color_idx = rng.randint(0, num_colors - 1)
+
+        return self._render_colored_balls(
+            {"total": total_balls, "counts": color_counts, "colors": selected_colors, "target": target_color_idx},
+            difficulty
+        )
+
+    def _render_colored_balls(self, params: Dict, difficulty: str) -> Dict:
+        total = params["total"]
+        counts = params["counts"]
+        colors = params["colors"]
+        target = colors[params["target"]]
+        target_count = counts[params["target"]]
+
+        description = ", ".join(f"{count} {COLORS[color]}" for count, color in zip(counts, colors))
+        answer, answer_fraction, tail = probability(target_count, total)
+
+        return {
+            "condition": COLORED_BALLS_CONDITION(total=total, description=description, color=COLOR_STEMS[target]),
+            "answer": answer,
+            "answer_fraction": answer_fraction,
+            "solution": COLORED_BALLS_SOLUTION[target](total=total, count=target_count) + tail,
+            "type": "colored_balls",
+            "difficulty": difficulty
+        }
+
+    def _generate_without_replacement(self, rng: random.Random, difficulty: str = "medium") -> Dict:
+        """Генерирует задачу про выбор нескольких шаров без возвращения (ровно hits белых)"""
+
+        totals, (low, high), draw_choices = WITHOUT_REPLACEMENT[difficulty]
+        total = rng.choice(totals)
+        marked = rng.randint(low, high)
+        draws = rng.choice(draw_choices)
+        hits = rng.randint(max(1, draws - (total - marked)), min(draws, marked))
 
-        color_description = ", ".join(
-            f"{count} {color}" for count, color in zip(color_counts, selected_colors)
+        return self._render_without_replacement(
+            {"total": total, "marked": marked, "draws": draws, "hits": hits}, difficulty
         )
 
-        condition = (
-            f"В коробке лежат {total_balls} шаров: {color_description}. "
-            f"Случайным образом достаётся один шар. Найдите вероятность того, что он будет {target_color[:-2]}им."
+    def _render_without_replacement(self, params: Dict, difficulty: str) -> Dict:
+        total = params["total"]
+        marked = params["marked"]
+        draws = params["draws"]
+        hits = params["hits"]
+        other = total - marked
+        rest = draws - hits
+
+        fraction = hypergeometric(total, marked, draws, hits)
+        answer, answer_fraction, tail = probability(fraction.numerator, fraction.denominator)
+        white_ways = binomial(marked, hits)
+        black_ways = binomial(other, rest)
+
+        condition = WITHOUT_REPLACEMENT_CONDITION(
+            total=total, balls=plural(total, "шар", "шара", "шаров"),
+            marked=marked, white=plural(marked, "белый", "белых", "белых"),
+            other=other, black=plural(other, "чёрный", "чёрных", "чёрных"),
+            draws=draws, drawn=plural(draws, "шар", "шара", "шаров"),
+            hits=hits, hits_white=plural(hits, "белый", "белых", "белых"),
+        )
+        solution = WITHOUT_REPLACEMENT_SOLUTION(
+            total=total, draws=draws, ways=binomial(total, draws), hits=hits, marked=marked, rest=rest, other=other,
+            white_ways=white_ways, black_ways=black_ways, favorable=white_ways * black_ways,
         )
 
-        solution_steps = [
-            f"**Шаг 1:** Определяем общее количество возможных исходов",
-            f"Всего шаров: {total_balls}",
-            f"",
-            f"**Шаг 2:** Определяем количество благоприятных исходов",
-            f"{target_color.capitalize()} шаров: {target_count}",
-            f"",
-            f"**Шаг 3:** Вычисляем вероятность",
-            f"P = {target_count}/{total_balls}",
-        ]
+        return {
+            "condition": condition,
+            "answer": answer,
+            "answer_fraction": answer_fraction,
+            "solution": solution + tail,
+            "type": "without_replacement",
+            "difficulty": difficulty
+        }
+
+    def _generate_at_least_one(self, rng: random.Random, difficulty: str = "medium") -> Dict:
+        """Генерирует задачу «хотя бы одна бракованная деталь» среди нескольких выбранных"""
 
-        fraction = Fraction(target_count, total_balls)
-        answer = float(fraction)
+        totals, (low, high), draw_choices = AT_LEAST_ONE[difficulty]
+        total = rng.choice(totals)
+        defective = rng.randint(low, high)
+        draws = rng.choice(draw_choices)
 
-        if fraction.denominator != 1:
-            solution_steps.append(f"P = {fraction.numerator}/{fraction.denominator}")
-            solution_steps.append(f"P = {answer:.4f}")
+        return self._render_at_least_one({"total": total, "defective": defective, "draws": draws}, difficulty)
+
+    def _render_at_least_one(self, params: Dict, difficulty: str) -> Dict:
+        total = params["total"]
+        defective = params["defective"]
+        draws = params["draws"]
+
+        fraction = at_least_one(total, defective, draws)
+        answer, answer_fraction, tail = probability(fraction.numerator, fraction.denominator)
+        ways = binomial(total, draws)
+        none = binomial(total - defective, draws)
+
+        condition = AT_LEAST_ONE_CONDITION(
+            total=total, parts=plural(total, "детали", "деталей", "деталей"),
+            defective=defective, defective_word=plural(defective, "бракованная", "бракованные", "бракованных"),
+            draws=draws, taken=plural(draws, "деталь", "детали", "деталей"),
+        )
+        solution = AT_LEAST_ONE_SOLUTION(
+            draws=draws, total=total, ways=ways, good=total - defective, none=none, favorable=ways - none
+        )
 
         return {
             "condition": condition,
             "answer": answer,
-            "answer_fraction": f"{fraction.numerator}/{fraction.denominator}",
-            "solution": "\n".join(solution_steps),
-            "type": "colored_balls",
+            "answer_fraction": answer_fraction,
+            "solution": solution + tail,
+            "type": "at_least_one",
             "difficulty": difficulty
         }
 
+    def task_rng(self, index: int) -> random.Random:
+        """Независимый генератор случайных чисел для задачи index"""
+        return random.Random(task_seed(self.seed, index))
+
+    def reserve(self, count: int) -> int:
+        """
+        Резервирует номера count задач потока (потокобезопасно)
+
+        Returns:
+            Номер первой зарезервированной задачи
+        """
+        with self._lock:
+            start = self.position
+            self.position += count
+        return start
+
+    def generate_task_at(self, index: int, task_type: str = None, difficulty: str = "medium") -> Dict:
+        """
+        Генерирует задачу с номером index потока seed за O(1)
+
+        Args:
+            index: Номер задачи в потоке (0, 1, 2, ...)
+            task_type: Тип задачи (если None - выбирается случайно)
+            difficulty: Сложность (easy, medium, hard)
+
+        Returns:
+            Dict с полями: condition, answer, answer_fraction, solution, type, difficulty
+        """
+        if task_type is not None and task_type not in self.task_templates:
+            raise ValueError(f"Неизвестный тип задачи: {task_type}")
+
+        rng = self.task_rng(index)
+        if task_type is None:
+            task_type = rng.choice(list(self.task_templates.keys()))
+
+        return self.task_templates[task_type](rng, difficulty)
+
     def generate_task(self, task_type: str = None, difficulty: str = "medium") -> Dict:
         """
-        Генерирует одну задачу
+        Генерирует одну задачу (следующую в потоке)
 
         Args:
             task_type: Тип задачи (exam_tickets, tv_channels, lottery, objects_selection, colored_balls)
@@ -351,15 +611,34 @@ class ProbabilityTaskGenerator:
         Returns:
             Dict с полями: condition, answer, answer_fraction, solution, type, difficulty
         """
-        if task_type is None:
-            task_type = random.choice(list(self.task_templates.keys()))
+        return self.generate_task_at(self.reserve(1), task_type, difficulty)
 
-        if task_type not in self.task_templates:
-            raise ValueError(f"Неизвестный тип задачи: {task_type}")
+    def iter_tasks(self, count: int, task_type: str = None, difficulty: str = "medium",
+                   start: int = None) -> Iterator[Dict]:
+        """
+        Потоковая генерация: задачи выдаются по одной, в памяти не копятся
+
+        Args:
+            count: Количество задач
+            task_type: Тип задачи (если None - случайный микс)
+            difficulty: Сложность
+            start: Номер первой задачи в потоке; если None - следующие count задач потока
 
-        return self.task_templates[task_type](difficulty)
+        Yields:
+            Задачи; id — номер задачи в потоке + 1, поэтому продолжение с start + k
+            нумерует задачи так же, как непрерывный проход
+        """
+        if start is None:
+            start = self.reserve(count)
+
+        for index in range(start, start + count):
+            task = self.generate_task_at(index, task_type, difficulty)
+            task["id"] = index + 1
+            yield task
 
-    def generate_batch(self, count: int, task_type: str = None, difficulty: str = "medium") -> List[Dict]:
+    def generate_batch(self, count: int, task_type: str = None, difficulty: str = "medium",
+                       start: int = None, unique: bool = False, finite_decimal: bool = False,
+                       skip: Callable[[Dict], bool] = None, fill_repeats: bool = False) -> List[Dict]:
         """
         Генерирует пакет задач
 
@@ -367,13 +646,91 @@ class ProbabilityTaskGenerator:
             count: Количество задач
             task_type: Тип задачи (если None - случайный микс)
             difficulty: Сложность
+            start: Номер первой задачи в потоке; если None - следующие count задач потока
+            unique: Без повторяющихся задач в пакете
+            finite_decimal: Только задачи с конечной десятичной дробью в ответе
+            skip: Задачи, для которых skip(task) истинно, заменяются другими (например, уже
+                выданные пользователю, см. registry.py); не больше MAX_SKIPS замен на задачу
+            fill_repeats: С unique — если различных задач меньше count, недостающие задачи
+                берутся с повторами вместо ValueError
 
         Returns:
             Список задач
         """
+        if start is None:
+            start = self.reserve(count)
+
+        if unique or finite_decimal or skip:
+            return self._generate_from_space(count, task_type, difficulty, start, unique, finite_decimal, skip,
+                                             fill_repeats)
+
         tasks = []
         for i in range(count):
-            task = self.generate_task(task_type, difficulty)
+            task = self.generate_task_at(start + i, task_type, difficulty)
+            task["id"] = i + 1
+            tasks.append(task)
+        return tasks
+
+    def _generate_from_space(self, count: int, task_type: str, difficulty: str, start: int,
+                             unique: bool, finite_decimal: bool, skip: Callable[[Dict], bool] = None,
+                             fill_repeats: bool = False) -> List[Dict]:
+        """
+        Пакет задач, равномерно выбранных по индексу пространства параметров (param_space)
+
+        Весь пакет разыгрывается одним генератором task_rng(start): без повторов задача
+        зависит от предыдущих задач пакета, поэтому отдельная задача по номеру недоступна.
+        """
+        from param_space import get_space
+
+        if task_type is not None and task_type not in self.task_templates:
+            raise ValueError(f"Неизвестный тип задачи: {task_type}")
+
+        rng = self.task_rng(start)
+        # В микс идут типы, у которых есть задачи с нужным ответом (у комбинаторных конечных дробей почти нет)
+        types = [name for name in self.task_templates if get_space(name, difficulty, finite_decimal).size]
+        chosen = [task_type or rng.choice(types) for _ in range(count)]
+
+        samplers = {}
+        for name in set(chosen):
+            space = get_space(name, difficulty, finite_decimal)
+            needed = chosen.count(name)
+            if not space.size:
+                raise ValueError(f"Нет задач типа {name} ({difficulty}) с конечной десятичной дробью в ответе")
+            if unique and needed > space.size and not fill_repeats:
+                raise ValueError(
+                    f"Запрошено {needed} задач типа {name}, а различных задач ({difficulty}) всего {space.size}"
+                )
+            samplers[name] = (space, space.sampler(rng) if unique else None)
+
+        def draw(space, sampler):
+            # Различные задачи кончились (только при fill_repeats) — дальше с повторами
+            return sampler.draw() if unique and sampler.remaining else rng.randrange(space.size)
+
+        def sampler_for(name):
+            if name not in samplers:
+                space = get_space(name, difficulty, finite_decimal)
+                samplers[name] = (space, space.sampler(rng) if unique else None)
+            return samplers[name]
+
+        left = {name: chosen.count(name) for name in self.task_templates}
+        tasks = []
+        for i, name in enumerate(chosen):
+            space, sampler = samplers[name]
+            left[name] -= 1
+            index = draw(space, sampler)
+            task = self.render_task(name, difficulty, space.params(index))
+            # Замена отбракованной задачи: в миксе — любого типа (маленькие пространства быстро
+            # исчерпываются), номера, нужные остальным задачам пакета, не трогаются; после
+            # MAX_SKIPS неудачных замен задача отдается как есть
+            for _ in range(MAX_SKIPS if skip else 0):
+                if not skip(task):
+                    break
+                name = task_type or rng.choice(types)
+                space, sampler = sampler_for(name)
+                if unique and sampler.remaining <= left[name]:
+                    continue
+                index = draw(space, sampler)
+                task = self.render_task(name, difficulty, space.params(index))
             task["id"] = i + 1
             tasks.append(task)
         return tasks
@@ -0,0 +1,290 @@
+"""
+Индекс пространства параметров задач
+Для каждой пары (тип, сложность) перечисляются все различные задачи, которые может выдать
+генератор: задача получает номер 0..size-1, и по номеру за O(1) восстанавливаются ее параметры.
+Задачи с одинаковым текстом считаются одной задачей (например, приз в лотерее в текст не входит).
+
+Пространство хранится блоками: блок — набор задач с общими числами (общее число, благоприятные и т.п.),
+внутри блока номер раскладывается по «косметическим» координатам (имя, тема, цвета, ...).
+Храним только массив смещений блоков, сами задачи не материализуются: у colored_balls (hard)
+их сотни миллионов.
+"""
+
+import random
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from math import comb, gcd, perm
+from typing import Dict, Iterator, List
+
+from combinatorics import at_least_one, hypergeometric
+from generator import (AT_LEAST_ONE, COLORED_BALLS, COLORS, DEFECTIVE_PARTS, EXAM_TICKETS, LOTTERY, NAMES, OBJECTS,
+                       SPEC_TYPES, THEMES, TV_CHANNELS, WITHOUT_REPLACEMENT, part_range)
+
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+
+def is_finite_decimal(numerator: int, denominator: int) -> bool:
+    """Записывается ли дробь конечной десятичной (знаменатель несократимой дроби — только 2 и 5)"""
+    denominator //= gcd(numerator, denominator)
+    for p in (2, 5):
+        while denominator % p == 0:
+            denominator //= p
+    return denominator == 1
+
+
+def _exam_tickets_blocks(difficulty):
+    spec = EXAM_TICKETS[difficulty]
+    for total in spec[0]:
+        for unstudied in part_range(total, spec):
+            yield (total, unstudied), total - unstudied, total, len(NAMES)
+
+
+def _exam_tickets_params(key, local):
+    total, unstudied = key
+    return {"total": total, "unstudied": unstudied, "name": local}
+
+
+def _tv_channels_blocks(difficulty):
+    spec = TV_CHANNELS[difficulty]
+    for total in spec[0]:
+        for thematic in part_range(total, spec):
+            for negate in (0, 1):
+                favorable = total - thematic if negate else thematic
+                yield (total, thematic, negate), favorable, total, len(NAMES) * len(THEMES)
+
+
+def _tv_channels_params(key, local):
+    total, thematic, negate = key
+    name, theme = divmod(local, len(THEMES))
+    return {"total": total, "thematic": thematic, "name": name, "theme": theme, "negate": negate}
+
+
+def _lottery_blocks(difficulty):
+    spec = LOTTERY[difficulty]
+    for total in spec[0]:
+        for winning in part_range(total, spec):
+            yield (total, winning), winning, total, len(NAMES)
+
+
+def _lottery_params(key, local):
+    total, winning = key
+    # Приз в условие не входит: все призы дают один и тот же текст
+    return {"total": total, "winning": winning, "name": local, "prize": 0}
+
+
+def _objects_selection_blocks(difficulty):
+    spec = DEFECTIVE_PARTS[difficulty]
+    for obj, (_, _, _, favorable, total) in enumerate(OBJECTS):
+        if total is not None:
+            yield (obj, total, favorable), favorable, total, 1
+            continue
+        for total in spec[0]:
+            for favorable in part_range(total, spec):
+                yield (obj, total, favorable), favorable, total, 1
+
+
+def _objects_selection_params(key, local):
+    obj, total, favorable = key
+    return {"object": obj, "total": total, "favorable": favorable}
+
+
+def _colored_balls_blocks(difficulty):
+    # Блок — (число цветов k, всего шаров, шаров искомого цвета); внутри блока:
+    # позиция искомого цвета, разбиение остальных шаров на k-1 цветов и упорядоченный выбор k цветов
+    color_choices, total_choices = COLORED_BALLS[difficulty]
+    for k in color_choices:
+        for total in total_choices:
+            for target_count in range(1, total - (k - 1) + 1):
+                size = k * comb(total - target_count - 1, k - 2) * perm(len(COLORS), k)
+                yield (k, total, target_count), target_count, total, size
+
+
+def _unrank_composition(n: int, parts: int, rank: int) -> List[int]:
+    """rank-е (в лексикографическом порядке) разбиение n на parts положительных слагаемых"""
+    result = []
+    for i in range(parts - 1):
+        first = 1
+        while True:
+            # Сколько разбиений начинается с first: остаток n - first на parts - i - 1 слагаемых
+            block = comb(n - first - 1, parts - i - 2)
+            if rank < block:
+                break
+            rank -= block
+            first += 1
+        result.append(first)
+        n -= first
+    result.append(n)
+    return result
+
+
+def _unrank_permutation(n: int, k: int, rank: int) -> List[int]:
+    """rank-е упорядоченное размещение k элементов из range(n)"""
+    pool = list(range(n))
+    result = []
+    for i in range(k):
+        rank, digit = divmod(rank, n - i)
+        result.append(pool.pop(digit))
+    return result
+
+
+def _colored_balls_params(key, local):
+    k, total, target_count = key
+    local, target = divmod(local, k)
+    local, colors_rank = divmod(local, perm(len(COLORS), k))
+    counts = _unrank_composition(total - target_count, k - 1, local)
+    counts.insert(target, target_count)
+    return {
+        "total": total,
+        "counts": counts,
+        "colors": _unrank_permutation(len(COLORS), k, colors_rank),
+        "target": target,
+    }
+
+
+def _without_replacement_blocks(difficulty):
+    totals, (low, high), draw_choices = WITHOUT_REPLACEMENT[difficulty]
+    for total in totals:
+        for marked in range(low, high + 1):
+            for draws in draw_choices:
+                for hits in range(max(1, draws - (total - marked)), min(draws, marked) + 1):
+                    answer = hypergeometric(total, marked, draws, hits)
+                    yield (total, marked, draws, hits), answer.numerator, answer.denominator, 1
+
+
+def _without_replacement_params(key, local):
+    total, marked, draws, hits = key
+    return {"total": total, "marked": marked, "draws": draws, "hits": hits}
+
+
+def _at_least_one_blocks(difficulty):
+    totals, (low, high), draw_choices = AT_LEAST_ONE[difficulty]
+    for total in totals:
+        for defective in range(low, high + 1):
+            for draws in draw_choices:
+                answer = at_least_one(total, defective, draws)
+                yield (total, defective, draws), answer.numerator, answer.denominator, 1
+
+
+def _at_least_one_params(key, local):
+    total, defective, draws = key
+    return {"total": total, "defective": defective, "draws": draws}
+
+
+# Тип задачи -> (перечисление блоков, параметры задачи по ключу блока и номеру внутри блока)
+SPACES = {
+    "exam_tickets": (_exam_tickets_blocks, _exam_tickets_params),
+    "tv_channels": (_tv_channels_blocks, _tv_channels_params),
+    "lottery": (_lottery_blocks, _lottery_params),
+    "objects_selection": (_objects_selection_blocks, _objects_selection_params),
+    "colored_balls": (_colored_balls_blocks, _colored_balls_params),
+    "without_replacement": (_without_replacement_blocks, _without_replacement_params),
+    "at_least_one": (_at_least_one_blocks, _at_least_one_params),
+}
+# Типы из спецификаций (specs.py) перечисляют свое пространство сами
+SPACES.update({name: (spec.blocks, spec.params) for name, spec in SPEC_TYPES.items()})
+
+
+class ParamSpace:
+    """
+    Все различные задачи одного типа и сложности, пронумерованные 0..size-1
+
+    Блоки хранятся массивом смещений (array 'Q') и кортежами ключей; params(index)
+    находит блок бинарным поиском по нескольким сотням смещений и раскладывает остаток номера.
+    """
+
+    def __init__(self, task_type: str, difficulty: str, finite_decimal: bool = False):
+        """
+        Args:
+            task_type: Тип задачи
+            difficulty: Сложность (easy, medium, hard)
+            finite_decimal: Оставить только задачи с конечной десятичной дробью в ответе
+        """
+        if task_type not in SPACES:
+            raise ValueError(f"Неизвестный тип задачи: {task_type}")
+        if difficulty not in DIFFICULTIES:
+            raise ValueError(f"Неизвестная сложность: {difficulty}")
+
+        self.task_type = task_type
+        self.difficulty = difficulty
+        self.finite_decimal = finite_decimal
+
+        enumerate_blocks, self._params = SPACES[task_type]
+        self._keys = []
+        self._offsets = array('Q', [0])
+        for key, favorable, total, size in enumerate_blocks(difficulty):
+            if finite_decimal and not is_finite_decimal(favorable, total):
+                continue
+            self._keys.append(key)
+            self._offsets.append(self._offsets[-1] + size)
+
+    @property
+    def size(self) -> int:
+        """Число различных задач"""
+        return self._offsets[-1]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def params(self, index: int) -> Dict:
+        """Параметры задачи с номером index (формат ProbabilityTaskGenerator.render_task)"""
+        if not 0 <= index < self.size:
+            raise IndexError(f"Номер задачи {index} вне пространства из {self.size}")
+        block = bisect_right(self._offsets, index) - 1
+        return self._params(self._keys[block], index - self._offsets[block])
+
+    def sampler(self, rng: random.Random) -> "UniqueSampler":
+        """Выборка номеров без повторений"""
+        return UniqueSampler(self.size, rng)
+
+
+class UniqueSampler:
+    """
+    Равномерная выборка без возвращения из range(size) — ленивый Фишер–Йетс
+
+    Хранятся только переставленные позиции (dict), поэтому и память, и время на номер —
+    O(1) независимо от size; повторов и циклов с отбраковкой нет.
+    """
+
+    def __init__(self, size: int, rng: random.Random):
+        self.remaining = size
+        self._rng = rng
+        self._swapped = {}
+
+    def draw(self) -> int:
+        if self.remaining == 0:
+            raise ValueError("Все задачи пространства уже выданы")
+        j = self._rng.randrange(self.remaining)
+        self.remaining -= 1
+        value = self._swapped.get(j, j)
+        self._swapped[j] = self._swapped.pop(self.remaining, self.remaining)
+        return value
+
+    def __iter__(self) -> Iterator[int]:
+        while self.remaining:
+            yield self.draw()
+
+
+@lru_cache(maxsize=None)
+def get_space(task_type: str, difficulty: str, finite_decimal: bool = False) -> ParamSpace:
+    """Пространство задач (строится один раз на процесс)"""
+    return ParamSpace(task_type, difficulty, finite_decimal)
+
+
+def space_sizes(finite_decimal: bool = False) -> Dict[str, Dict[str, int]]:
+    """Число различных задач: {тип: {сложность: размер}}"""
+    return {
+        task_type: {difficulty: get_space(task_type, difficulty, finite_decimal).size for difficulty in DIFFICULTIES}
+        for task_type in SPACES
+    }
+
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print(f"{'Тип':<20}{'Сложность':<10}{'Задач':>22}{'С конечной дробью':>22}")
+    for task_type in SPACES:
+        for difficulty in DIFFICULTIES:
+            total = get_space(task_type, difficulty).size
+            finite = get_space(task_type, difficulty, True).size
+            print(f"{task_type:<20}{difficulty:<10}{total:>22,}{finite:>22,}")
+    print("=" * 80)
@@ -0,0 +1,157 @@
+"""
+Реестр выданных задач: «никогда не повторять» между сессиями
+Для каждого пользователя хранится Bloom-фильтр отпечатков выданных задач (файл на диске).
+Проверка и добавление — k хешей, O(1) независимо от числа выданных задач; при емкости
+100 000 задач и доле ложных срабатываний 0.1% фильтр занимает ~180 КБ.
+
+Ложное срабатывание означает лишь, что новая задача будет пропущена как уже выданная;
+выданная задача повторно не пройдет никогда.
+"""
+
+import hashlib
+import math
+import os
+import struct
+import threading
+from collections import OrderedDict
+from typing import Dict, List
+
+MAGIC = b"BLM1"
+HEADER = struct.Struct("<4sQIQ")  # magic, бит, хешей, добавлено
+
+
+def fingerprint(task: Dict) -> bytes:
+    """Отпечаток задачи: тип и текст условия (одинаковый текст — одна и та же задача)"""
+    return hashlib.blake2b(f"{task['type']}\n{task['condition']}".encode("utf-8"), digest_size=16).digest()
+
+
+class BloomFilter:
+    """Bloom-фильтр над bytearray; индексы — двойное хеширование 128-битного отпечатка"""
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001, bits: int = None, hashes: int = None):
+        """
+        Args:
+            capacity: Сколько ключей фильтр держит с заданной долей ложных срабатываний
+            error_rate: Доля ложных срабатываний при capacity ключах
+            bits, hashes: Явные размеры (при загрузке из файла)
+        """
+        self.bits = bits or math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = hashes or max(1, round(self.bits / capacity * math.log(2)))
+        self.data = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: bytes):
+        h1, h2 = struct.unpack("<QQ", key if len(key) == 16 else hashlib.blake2b(key, digest_size=16).digest())
+        h2 |= 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    def __contains__(self, key: bytes) -> bool:
+        data = self.data
+        return all(data[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key: bytes) -> bool:
+        """Добавляет ключ; False, если он (вероятно) уже был"""
+        added = False
+        data = self.data
+        for p in self._positions(key):
+            mask = 1 << (p & 7)
+            if not data[p >> 3] & mask:
+                data[p >> 3] |= mask
+                added = True
+        self.count += added
+        return added
+
+    def save(self, path: str):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, self.bits, self.hashes, self.count))
+            f.write(self.data)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BloomFilter":
+        with open(path, "rb") as f:
+            magic, bits, hashes, count = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path}: не файл Bloom-фильтра")
+            bloom = cls(bits=bits, hashes=hashes)
+            f.readinto(bloom.data)
+        bloom.count = count
+        return bloom
+
+
+class IssuedRegistry:
+    """
+    Выданные задачи по пользователям: каталог с файлом <хеш пользователя>.bloom на пользователя
+
+    Потокобезопасен; последние max_cached фильтров держатся в памяти.
+    """
+
+    def __init__(self, directory: str = "issued", capacity: int = 100_000, error_rate: float = 0.001,
+                 max_cached: int = 256):
+        self.directory = directory
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.max_cached = max_cached
+        self._filters = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, user: str) -> str:
+        # Имя файла — хеш: идентификатор пользователя не попадает в путь как есть
+        return os.path.join(self.directory, hashlib.sha256(user.encode("utf-8")).hexdigest()[:32] + ".bloom")
+
+    def _filter(self, user: str) -> BloomFilter:
+        bloom = self._filters.get(user)
+        if bloom is None:
+            path = self._path(user)
+            bloom = BloomFilter.load(path) if os.path.exists(path) else BloomFilter(self.capacity, self.error_rate)
+            self._filters[user] = bloom
+            if len(self._filters) > self.max_cached:
+                self._filters.popitem(last=False)
+        self._filters.move_to_end(user)
+        return bloom
+
+    def issued(self, user: str) -> int:
+        """Сколько задач выдано пользователю"""
+        with self._lock:
+            return self._filter(user).count
+
+    def seen(self, user: str, task: Dict) -> bool:
+        with self._lock:
+            return fingerprint(task) in self._filter(user)
+
+    def mark(self, user: str, tasks: List[Dict]):
+        """Запоминает задачи как выданные и сохраняет фильтр на диск"""
+        with self._lock:
+            bloom = self._filter(user)
+            for task in tasks:
+                bloom.add(fingerprint(task))
+            bloom.save(self._path(user))
+
+    def generate(self, generator, user: str, count: int, task_type: str = None, difficulty: str = "medium",
+                 start: int = None, finite_decimal: bool = False) -> List[Dict]:
+        """
+        Пакет задач, которые пользователю еще не выдавались, и отметка их выданными
+
+        Задачи выбираются из пространства параметров без повторов (generate_batch с unique=True),
+        уже выданные пропускаются проверкой фильтра. Если новых задач почти не осталось,
+        генератор после нескольких попыток отдает повтор вместо бесконечного поиска; если
+        различных задач меньше count, недостающие добираются с повторами (fill_repeats).
+        """
+        with self._lock:
+            bloom = self._filter(user)
+        tasks = generator.generate_batch(
+            count, task_type, difficulty, start=start, unique=True, finite_decimal=finite_decimal,
+            skip=lambda task: fingerprint(task) in bloom, fill_repeats=True
+        )
+        self.mark(user, tasks)
+        return tasks
+
+    def reset(self, user: str):
+        """Забывает выданные пользователю задачи"""
+        with self._lock:
+            self._filters.pop(user, None)
+            if os.path.exists(self._path(user)):
+                os.remove(self._path(user))
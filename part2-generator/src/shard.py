@@ -0,0 +1,227 @@
+"""
+Многопроцессная генерация больших наборов задач по шардам
+Количество задач делится на шарды; шард с номером k генерируется своим потоком с seed,
+выведенным из (master seed, k), в отдельном процессе и пишется export.export_tasks в свой файл.
+Затем шарды по порядку сливаются в одну выгрузку, а рядом пишется манифест
+<выгрузка>.manifest.json с seed, диапазонами и числом задач каждого шарда.
+
+Задача шарда получает id = start шарда + номер в шарде + 1, поэтому id сквозные по всей
+выгрузке, а любой шард можно сгенерировать заново по манифесту (--regenerate).
+
+Пример:
+    python src/shard.py tasks.jsonl --count 1000000 --seed 42 --shards 16 --processes 8
+    python src/shard.py tasks.jsonl --regenerate 3
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+from export import FORMATS, WRITERS, export_tasks, meta_path
+from generator import ProbabilityTaskGenerator, task_seed
+
+
+def shard_seed(master_seed: int, shard: int) -> int:
+    """Seed шарда: зависит только от (master seed, номер шарда)"""
+    return task_seed(master_seed, shard)
+
+
+def plan_shards(count: int, shards: int, master_seed: int) -> List[Dict]:
+    """Разбивка count задач на shards почти равных последовательных диапазонов"""
+    base, extra = divmod(count, shards)
+    plan = []
+    start = 0
+    for shard in range(shards):
+        size = base + (shard < extra)
+        plan.append({"shard": shard, "seed": shard_seed(master_seed, shard), "start": start, "count": size})
+        start += size
+    return plan
+
+
+def shard_path(output: str, fmt: str, shard: int) -> str:
+    return os.path.join(output.rstrip("/\\") + ".shards", f"shard-{shard:05d}.{fmt}")
+
+
+def manifest_path(output: str) -> str:
+    return output.rstrip("/\\") + ".manifest.json"
+
+
+def _run_shard(job: Dict) -> Dict:
+    """Генерация одного шарда (в процессе пула); незавершенный шард продолжается"""
+    path = job["path"]
+    resume = os.path.exists(meta_path(path))
+    if resume:
+        with open(meta_path(path), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["seed"] != job["seed"] or meta["start"] != job["start"] or meta["count"] != job["count"]:
+            raise ValueError(f"{path} сгенерирован с другими параметрами; удалите его или каталог шардов")
+        if meta["written"] == meta["count"]:
+            return {"shard": job["shard"], "written": 0, "seconds": 0.0}
+
+    stats = export_tasks(
+        path, count=job["count"], seed=job["seed"], task_type=job["task_type"], difficulty=job["difficulty"],
+        start=job["start"], chunk_size=job["chunk_size"], fmt=job["format"], resume=resume, progress=False
+    )
+    return {"shard": job["shard"], "written": stats["written"], "seconds": stats["seconds"]}
+
+
+def _merge(output: str, fmt: str, paths: List[str]):
+    """Склейка шардов по порядку: файлы — копированием байтов, Parquet — переносом part-файлов"""
+    if fmt == "parquet":
+        if os.path.exists(output):
+            shutil.rmtree(output)
+        os.makedirs(output)
+        for shard, path in enumerate(paths):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".parquet"):
+                    os.replace(os.path.join(path, name), os.path.join(output, f"shard-{shard:05d}-{name}"))
+        return
+
+    with open(output, "wb") as merged:
+        for shard, path in enumerate(paths):
+            with open(path, "rb") as f:
+                if fmt == "csv" and shard > 0:
+                    f.readline()  # заголовок CSV (одна строка) — только у первого шарда
+                shutil.copyfileobj(f, merged, 2 ** 20)
+
+
+def _remove(path: str):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+    if os.path.exists(meta_path(path)):
+        os.remove(meta_path(path))
+
+
+def generate_sharded(output: str, count: int, seed: int = None, shards: int = 8, processes: int = None,
+                     task_type: str = None, difficulty: str = "medium", chunk_size: int = 10_000,
+                     fmt: str = None, keep_shards: bool = False) -> Dict:
+    """
+    Генерация count задач шардами в пуле процессов и склейка в output
+
+    Args:
+        output: Итоговый файл (.jsonl, .csv) или каталог (.parquet)
+        count: Количество задач
+        seed: Master seed (по умолчанию случайный, пишется в манифест)
+        shards: Число шардов; вместе с seed определяет содержимое выгрузки
+        processes: Размер пула (по умолчанию — число ядер)
+        keep_shards: Не удалять файлы шардов после склейки
+
+    Returns:
+        Манифест (dict) и статистика прогона
+    """
+    fmt = fmt or FORMATS.get(os.path.splitext(output.rstrip("/\\"))[1].lower())
+    if fmt not in WRITERS:
+        raise ValueError(f"Неизвестный формат выгрузки: {output} (нужно .jsonl, .csv или .parquet)")
+
+    master_seed = ProbabilityTaskGenerator(seed).seed
+    plan = plan_shards(count, shards, master_seed)
+    jobs = []
+    for entry in plan:
+        path = shard_path(output, fmt, entry["shard"])
+        jobs.append(dict(entry, path=path, task_type=task_type, difficulty=difficulty,
+                         chunk_size=chunk_size, format=fmt))
+    os.makedirs(os.path.dirname(jobs[0]["path"]), exist_ok=True)
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        results = list(pool.map(_run_shard, jobs))
+    generated = time.perf_counter() - started
+
+    _merge(output, fmt, [job["path"] for job in jobs])
+    elapsed = time.perf_counter() - started
+
+    manifest = {
+        "format": fmt,
+        "master_seed": master_seed,
+        "count": count,
+        "task_type": task_type,
+        "difficulty": difficulty,
+        "chunk_size": chunk_size,
+        "shards": plan,
+    }
+    with open(manifest_path(output), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    if not keep_shards:
+        for job in jobs:
+            _remove(job["path"])
+        os.rmdir(os.path.dirname(jobs[0]["path"]))
+
+    written = sum(result["written"] for result in results)
+    return {
+        "manifest": manifest,
+        "written": written,
+        "generate_seconds": generated,
+        "seconds": elapsed,
+        "tasks_per_second": count / elapsed if elapsed else 0.0,
+    }
+
+
+def regenerate_shard(output: str, shard: int, path: str = None) -> str:
+    """Заново генерирует шард по манифесту выгрузки output; возвращает путь к файлу шарда"""
+    with open(manifest_path(output), encoding="utf-8") as f:
+        manifest = json.load(f)
+    entry = manifest["shards"][shard]
+    path = path or shard_path(output, manifest["format"], shard)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    _remove(path)
+    export_tasks(
+        path, count=entry["count"], seed=entry["seed"], task_type=manifest["task_type"],
+        difficulty=manifest["difficulty"], start=entry["start"], chunk_size=manifest["chunk_size"],
+        fmt=manifest["format"], progress=False
+    )
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Многопроцессная генерация задач по шардам")
+    parser.add_argument('output', help="Итоговый файл .jsonl / .csv или каталог .parquet")
+    parser.add_argument('--count', type=int, default=None, help="Количество задач")
+    parser.add_argument('--seed', type=int, default=None, help="Master seed (по умолчанию случайный)")
+    parser.add_argument('--shards', type=int, default=8, help="Число шардов")
+    parser.add_argument('--processes', type=int, default=None, help="Размер пула процессов (по умолчанию — ядра)")
+    parser.add_argument('--task-type', default=None, help="Тип задачи (по умолчанию — микс)")
+    parser.add_argument('--difficulty', default='medium', choices=['easy', 'medium', 'hard'])
+    parser.add_argument('--format', default=None, choices=sorted(WRITERS), help="По умолчанию — по расширению")
+    parser.add_argument('--chunk-size', type=int, default=10_000, help="Задач в блоке записи")
+    parser.add_argument('--keep-shards', action='store_true', help="Не удалять файлы шардов после склейки")
+    parser.add_argument('--regenerate', type=int, metavar='SHARD', default=None,
+                        help="Заново сгенерировать шард по манифесту")
+    args = parser.parse_args()
+
+    if args.regenerate is not None:
+        if not os.path.exists(manifest_path(args.output)):
+            print(f"Ошибка: нет манифеста {manifest_path(args.output)}")
+            sys.exit(1)
+        print(f"Шард {args.regenerate}: {regenerate_shard(args.output, args.regenerate)}")
+        return
+
+    if args.count is None:
+        parser.error("нужен --count (или --regenerate)")
+
+    stats = generate_sharded(
+        args.output, args.count, seed=args.seed, shards=args.shards, processes=args.processes,
+        task_type=args.task_type, difficulty=args.difficulty, chunk_size=args.chunk_size, fmt=args.format,
+        keep_shards=args.keep_shards
+    )
+
+    manifest = stats["manifest"]
+    print("=" * 80)
+    print(f"Выгрузка:     {args.output} ({manifest['format']}, master seed {manifest['master_seed']})")
+    print(f"Шардов:       {len(manifest['shards'])}, процессов: {args.processes or os.cpu_count()}")
+    print(f"Задач:        {manifest['count']:,} за {stats['seconds']:.1f} с "
+          f"(генерация {stats['generate_seconds']:.1f} с, склейка {stats['seconds'] - stats['generate_seconds']:.1f} с)")
+    print(f"Скорость:     {stats['tasks_per_second']:,.0f} задач/с")
+    print(f"Манифест:     {manifest_path(args.output)}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Типы задач из декларативных спецификаций (specs/*.json)
+Спецификация — данные: диапазоны параметров по сложностям, шаблоны условия и решения,
+формула ответа. При загрузке она один раз превращается в исходный код функций генерации,
+отрисовки и перечисления пространства задач (f-строки templates.template_source, ответ —
+templates.probability), то есть в тот же быстрый путь, что и у написанных вручную типов.
+Байткод кэшируется на диске по хешу спецификации: повторный запуск не компилирует заново.
+
+Формат спецификации:
+    {
+      "type": "coin_tosses",                        имя типа
+      "title": "Броски монеты",                     название для интерфейса
+      "params": {                                   параметры по сложностям, по порядку:
+        "easy": {"tosses": [2, 3],                  список — варианты,
+                 "heads": "range(1, tosses + 1)"},  строка — выражение от предыдущих параметров
+        ...
+      },
+      "cosmetic": {"name": "NAMES"},                (необяз.) слова из словарей генератора:
+                                                    на ответ не влияют, в параметрах — индекс
+      "favorable": "binomial(tosses, heads)",       благоприятные исходы (целое)
+      "total": "2 ** tosses",                       все исходы (целое)
+      "slots": {"times": "plural(heads, 'раз', 'раза', 'раз')"},
+                                                    (необяз.) вычисляемые слоты шаблонов, могут
+                                                    использовать параметры, favorable и total
+      "show_fraction": true,                        (необяз.) сокращенная дробь в решении
+      "condition": ["..."], "solution": ["..."]     шаблоны (строки, как у compile_template)
+    }
+
+Выражения — код Python (спецификации — часть исходников проекта, как и generator.py);
+доступны FUNCTIONS и словари, переданные в load_specs.
+"""
+
+import hashlib
+import json
+import marshal
+import os
+import sys
+from fractions import Fraction
+from itertools import product
+from math import comb, gcd, perm
+from typing import Dict, List
+
+from combinatorics import at_least_one, bernoulli, binomial, factorial, hypergeometric
+from templates import plural, probability, template_source
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SPEC_DIR = os.path.join(ROOT, "specs")
+CACHE_DIR = os.path.join(ROOT, ".spec_cache")
+
+# Меняется вместе с генерируемым кодом: старый кэш перестает подходить
+COMPILER_VERSION = 1
+
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+# Функции, доступные в выражениях спецификаций
+FUNCTIONS = {
+    "Fraction": Fraction, "product": product, "comb": comb, "gcd": gcd, "perm": perm,
+    "binomial": binomial, "factorial": factorial, "hypergeometric": hypergeometric,
+    "at_least_one": at_least_one, "bernoulli": bernoulli, "plural": plural, "probability": probability,
+}
+
+
+class TaskSpec:
+    """
+    Скомпилированный тип задачи
+
+    generate(rng, difficulty) и render(params, difficulty) — как _generate_* и _render_*
+    у ProbabilityTaskGenerator; blocks(difficulty) и params(key, local) — как в param_space.SPACES.
+    """
+
+    def __init__(self, spec: Dict, namespace: Dict):
+        self.type = spec["type"]
+        self.title = spec.get("title", self.type)
+        self.generate = namespace["generate"]
+        self.render = namespace["render"]
+        self.blocks = namespace["blocks"]
+        self.params = namespace["params"]
+
+
+def _check_expression(spec_type: str, where: str, expression: str) -> str:
+    try:
+        compile(expression, f"<{spec_type}: {where}>", "eval")
+    except SyntaxError as error:
+        raise ValueError(f"{spec_type}: ошибка в выражении {where}: {expression!r} ({error.msg})") from None
+    return f"({expression})"
+
+
+def _choices(spec_type: str, where: str, value) -> str:
+    """Варианты параметра: список -> литерал кортежа, строка -> выражение"""
+    if isinstance(value, list):
+        return repr(tuple(value))
+    return _check_expression(spec_type, where, value)
+
+
+def spec_source(spec: Dict, vocabularies: List[str]) -> str:
+    """Исходный код модуля типа задачи: generate, render, blocks, params"""
+    spec_type = spec["type"]
+    params = spec["params"]
+    if sorted(params) != sorted(DIFFICULTIES):
+        raise ValueError(f"{spec_type}: параметры нужны для сложностей {', '.join(DIFFICULTIES)}")
+    names = list(params["easy"])
+    for difficulty in DIFFICULTIES:
+        if list(params[difficulty]) != names:
+            raise ValueError(f"{spec_type}: у сложностей разные параметры ({difficulty}: {list(params[difficulty])})")
+    if not names:
+        raise ValueError(f"{spec_type}: нет параметров")
+
+    cosmetic = spec.get("cosmetic", {})
+    for name, vocabulary in cosmetic.items():
+        if vocabulary not in vocabularies:
+            raise ValueError(f"{spec_type}: неизвестный словарь {vocabulary} (есть: {', '.join(vocabularies)})")
+
+    favorable = _check_expression(spec_type, "favorable", spec["favorable"])
+    total = _check_expression(spec_type, "total", spec["total"])
+    slots = {name: _check_expression(spec_type, name, value) for name, value in spec.get("slots", {}).items()}
+
+    known = set(names) | set(cosmetic) | set(slots) | {"favorable", "total"}
+    condition_slots, condition = template_source(*spec["condition"])
+    solution_slots, solution = template_source(*spec["solution"])
+    unknown = [slot for slot in condition_slots + solution_slots if slot not in known]
+    if unknown:
+        raise ValueError(f"{spec_type}: неизвестные слоты шаблонов: {', '.join(sorted(set(unknown)))}")
+
+    key = ", ".join(names) + ","
+    cosmetic_size = " * ".join(f"len({vocabulary})" for vocabulary in cosmetic.values()) or "1"
+    lines = []
+
+    # Генерация: параметры по порядку, затем индексы слов
+    for difficulty in DIFFICULTIES:
+        lines.append(f"def _generate_{difficulty}(rng):")
+        for name in names:
+            lines.append(f"    {name} = rng.choice({_choices(spec_type, f'{difficulty}.{name}', params[difficulty][name])})")
+        for name, vocabulary in cosmetic.items():
+            lines.append(f"    {name} = rng.randrange(len({vocabulary}))")
+        lines.append("    return {" + ", ".join(f"{name!r}: {name}" for name in names + list(cosmetic)) + "}")
+        lines.append("")
+    lines.append("GENERATE = {" + ", ".join(f"{d!r}: _generate_{d}" for d in DIFFICULTIES) + "}")
+    lines.append("")
+    lines.append("def generate(rng, difficulty='medium'):")
+    lines.append("    return render(GENERATE[difficulty](rng), difficulty)")
+    lines.append("")
+
+    # Отрисовка
+    lines.append("def render(params, difficulty):")
+    for name in names:
+        lines.append(f"    {name} = params[{name!r}]")
+    for name, vocabulary in cosmetic.items():
+        lines.append(f"    {name} = {vocabulary}[params[{name!r}]]")
+    lines.append(f"    favorable = {favorable}")
+    lines.append(f"    total = {total}")
+    for name, expression in slots.items():
+        lines.append(f"    {name} = {expression}")
+    lines.append(f"    answer, answer_fraction, tail = probability(favorable, total, {bool(spec.get('show_fraction', True))})")
+    lines.append("    return {")
+    lines.append(f"        'condition': {condition},")
+    lines.append("        'answer': answer,")
+    lines.append("        'answer_fraction': answer_fraction,")
+    lines.append(f"        'solution': {solution} + tail,")
+    lines.append(f"        'type': {spec_type!r},")
+    lines.append("        'difficulty': difficulty")
+    lines.append("    }")
+    lines.append("")
+
+    # Пространство задач: блок — набор параметров, внутри блока — индексы слов
+    for difficulty in DIFFICULTIES:
+        lines.append(f"def _blocks_{difficulty}():")
+        indent = "    "
+        for name in names:
+            lines.append(f"{indent}for {name} in {_choices(spec_type, f'{difficulty}.{name}', params[difficulty][name])}:")
+            indent += "    "
+        lines.append(f"{indent}yield ({key}), {favorable}, {total}, {cosmetic_size}")
+        lines.append("")
+    lines.append("BLOCKS = {" + ", ".join(f"{d!r}: _blocks_{d}" for d in DIFFICULTIES) + "}")
+    lines.append("")
+    lines.append("def blocks(difficulty):")
+    lines.append("    return BLOCKS[difficulty]()")
+    lines.append("")
+    lines.append("def params(key, local):")
+    lines.append(f"    {key} = key")
+    for name, vocabulary in reversed(list(cosmetic.items())):
+        lines.append(f"    local, {name} = divmod(local, len({vocabulary}))")
+    lines.append("    return {" + ", ".join(f"{name!r}: {name}" for name in names + list(cosmetic)) + "}")
+    return "\n".join(lines) + "\n"
+
+
+def compile_spec(spec: Dict, vocab: Dict = None, cache_dir: str = CACHE_DIR) -> TaskSpec:
+    """
+    Спецификация -> TaskSpec; байткод берется из кэша cache_dir, если спецификация не менялась
+
+    Args:
+        vocab: Словари для cosmetic-параметров и выражений ({"NAMES": [...], ...})
+        cache_dir: Каталог кэша (None — без кэша)
+    """
+    vocab = vocab or {}
+    digest = hashlib.sha256(
+        json.dumps([spec, sorted(vocab), COMPILER_VERSION], sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()[:32]
+    cache_path = cache_dir and os.path.join(cache_dir, f"{spec['type']}-{digest}.{sys.implementation.cache_tag}")
+
+    code = None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                code = marshal.load(f)
+        except (EOFError, ValueError, TypeError):
+            code = None  # поврежденный кэш — компилируем заново
+    if code is None:
+        code = compile(spec_source(spec, list(vocab)), f"<spec {spec['type']}>", "exec")
+        if cache_path:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                tmp = f"{cache_path}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    marshal.dump(code, f)
+                os.replace(tmp, cache_path)
+            except OSError:
+                pass  # каталог только для чтения: работаем без кэша
+
+    namespace = dict(FUNCTIONS, **vocab)
+    exec(code, namespace)
+    return TaskSpec(spec, namespace)
+
+
+def load_specs(directory: str = SPEC_DIR, vocab: Dict = None, cache_dir: str = CACHE_DIR) -> Dict[str, TaskSpec]:
+    """Все спецификации *.json каталога (по имени файла): {тип: TaskSpec}"""
+    specs = {}
+    if not os.path.isdir(directory):
+        return specs
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".json"):
+            continue
+        with open(os.path.join(directory, filename), encoding="utf-8") as f:
+            spec = json.load(f)
+        if spec["type"] in specs:
+            raise ValueError(f"{filename}: тип {spec['type']} уже описан")
+        specs[spec["type"]] = compile_spec(spec, vocab, cache_dir)
+    return specs
+
+
+if __name__ == "__main__":
+    # Исходный код, в который компилируются спецификации: python src/specs.py [тип]
+    for filename in sorted(os.listdir(SPEC_DIR)):
+        with open(os.path.join(SPEC_DIR, filename), encoding="utf-8") as f:
+            spec = json.load(f)
+        if len(sys.argv) < 2 or spec["type"] in sys.argv[1:]:
+            print(f"# {filename}")
+            print(spec_source(spec, ["NAMES", "THEMES", "COLORS"]))
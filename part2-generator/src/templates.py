@@ -0,0 +1,89 @@
+"""
+Скомпилированные шаблоны условий и решений
+Шаблон в синтаксисе str.format один раз при импорте превращается в функцию с f-строкой
+(f-строка собирается байткодом, без разбора формата на каждый вызов, как у str.format).
+Дроби сокращаются через math.gcd, без Fraction.
+"""
+
+from math import gcd
+from string import Formatter
+from typing import Callable, List, Tuple
+
+
+def template_source(*lines: str) -> Tuple[List[str], str]:
+    """
+    Строки шаблона -> (слоты по порядку появления, исходный код f-строки)
+
+    Код вставляется в сгенерированные функции: так же собираются типы задач из спецификаций (specs.py)
+    """
+    parts = []
+    slots = []
+    text = ""
+    for literal, field, spec, conversion in Formatter().parse("\n".join(lines)):
+        text += literal
+        parts.append(literal.replace("{", "{{").replace("}", "}}"))
+        if field is None:
+            continue
+        if not field.isidentifier():
+            raise ValueError(f"Слот шаблона должен быть именем: {{{field}}}")
+        if field not in slots:
+            slots.append(field)
+        parts.append("{" + field + (f"!{conversion}" if conversion else "") + (f":{spec}" if spec else "") + "}")
+
+    if not slots:
+        return slots, repr(text)
+    return slots, "f" + repr("".join(parts))
+
+
+def compile_template(*lines: str) -> Callable[..., str]:
+    """
+    Строки шаблона (как в solution_steps, через "\\n") -> функция от именованных слотов
+
+    compile_template("Всего: {total}", "P = {m}/{total}")(total=10, m=3) == "Всего: 10\\nP = 3/10"
+    """
+    slots, source = template_source(*lines)
+    namespace = {}
+    exec(compile(f"def template(*, {', '.join(slots)}):\n    return {source}\n" if slots
+                 else f"def template():\n    return {source}\n", "<template>", "exec"), namespace)
+    return namespace["template"]
+
+
+def reduce_fraction(numerator: int, denominator: int) -> Tuple[int, int]:
+    """Несократимая дробь; эквивалент Fraction(numerator, denominator) для положительных чисел"""
+    divisor = gcd(numerator, denominator)
+    return numerator // divisor, denominator // divisor
+
+
+def probability(favorable: int, total: int, show_fraction: bool = True) -> Tuple[float, str, str]:
+    """
+    Ответ P = favorable/total
+
+    Args:
+        show_fraction: Дописывать в решение сокращенную дробь перед десятичной записью
+
+    Returns:
+        (answer, answer_fraction, хвост решения) — хвост пуст, если ответ целый
+    """
+    divisor = gcd(favorable, total)
+    numerator = favorable // divisor
+    denominator = total // divisor
+    # Деление int/int корректно округлено, как и float(Fraction): значения совпадают
+    answer = numerator / denominator
+    if denominator == 1:
+        tail = ""
+    elif show_fraction:
+        tail = f"\nP = {numerator}/{denominator}\nP = {answer:.4f}"
+    else:
+        tail = f"\nP = {answer:.4f}"
+    return answer, f"{numerator}/{denominator}", tail
+
+
+def plural(n: int, one: str, few: str, many: str) -> str:
+    """Форма слова после числа: plural(n, "шар", "шара", "шаров")"""
+    if 11 <= n % 100 <= 14:
+        return many
+    if n % 10 == 1:
+        return one
+    if 2 <= n % 10 <= 4:
+        return few
+    return many
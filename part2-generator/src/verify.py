@@ -0,0 +1,280 @@
+"""
+Проверка ответов задач методом Монте-Карло (векторизованно, NumPy)
+Числа берутся из текста условия (то, что видит ученик), случайный эксперимент из условия
+разыгрывается draws раз для каждой задачи сразу массивами, и частота события сравнивается
+с полем answer: |частота - answer| не больше z стандартных ошибок.
+
+Пример:
+    python src/verify.py --count 10000 --difficulty hard --seed 1
+    python src/verify.py --input tasks.jsonl
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from generator import COLORS, ProbabilityTaskGenerator
+
+MAX_COLORS = len(COLORS)
+
+EXAM_TICKETS_RE = re.compile(r"На экзамене (\d+) вопросов\. .+ не выучил\(а\) (\d+) из них")
+TV_CHANNELS_RE = re.compile(r"показывает (\d+) каналов, из них (\d+) показывают .+ настроен на канал, (НЕ )?показывающий")
+LOTTERY_RE = re.compile(r"В лотерее (\d+) билетов, из них (\d+) выигрышных")
+OBJECTS_RE = re.compile(r"^В \S+ (\d+) \S+, из них (\d+) — ")
+COLORED_BALLS_RE = re.compile(r"лежат (\d+) шаров: (.+?)\. Случайным .+ будет (\S+)им\.$")
+COLOR_ITEM_RE = re.compile(r"(\d+) ([^\s,]+)")
+WITHOUT_REPLACEMENT_RE = re.compile(
+    r"В урне (\d+) \S+: (\d+) \S+ и \d+ \S+\. Наугад вынимают (\d+) \S+ без возвращения\. .+ ровно (\d+) "
+)
+AT_LEAST_ONE_RE = re.compile(r"В партии из (\d+) \S+ (\d+) \S+\. Контролёр наугад берёт (\d+) ")
+REPEATED_TRIALS_RE = re.compile(r"с вероятностью 0\.(\d)\. Он делает (\d+) \S+\. .+ ровно (\d+) ")
+COIN_TOSSES_RE = re.compile(r"монету бросают (\d+) \S+\. .+ орёл выпадет ровно (\d+) ")
+DICE_SUM_RE = re.compile(r"бросает игральный кубик (\d+) \S+\. .+ в сумме выпадет (\d+) ")
+
+
+def _parse_exam_tickets(condition: str):
+    match = EXAM_TICKETS_RE.search(condition)
+    if match is None:
+        return None
+    # Невыученные — первые unstudied билетов, событие — выученный билет (дополнение)
+    return int(match.group(1)), int(match.group(2)), True
+
+
+def _parse_tv_channels(condition: str):
+    match = TV_CHANNELS_RE.search(condition)
+    if match is None:
+        return None
+    return int(match.group(1)), int(match.group(2)), match.group(3) is not None
+
+
+def _parse_share(pattern):
+    """Условие «всего N, из них M ...» -> (N, M, False): событие — попасть в M"""
+    def parse(condition: str):
+        match = pattern.search(condition)
+        return None if match is None else (int(match.group(1)), int(match.group(2)), False)
+    return parse
+
+
+def _parse_colored_balls(condition: str):
+    match = COLORED_BALLS_RE.search(condition)
+    if match is None:
+        return None
+    items = [(int(count), color) for count, color in COLOR_ITEM_RE.findall(match.group(2))]
+    stems = [color[:-2] for _, color in items]
+    if match.group(3) not in stems or len(items) > MAX_COLORS:
+        return None
+    counts = [count for count, _ in items] + [0] * (MAX_COLORS - len(items))
+    return int(match.group(1)), counts, stems.index(match.group(3))
+
+
+def _parse_ints(pattern):
+    """Условие -> все числа из групп шаблона (для комбинаторных типов)"""
+    def parse(condition: str):
+        match = pattern.search(condition)
+        return None if match is None else tuple(int(group) for group in match.groups())
+    return parse
+
+
+# Тип задачи -> разбор условия: (всего, часть, событие — дополнение части), для шаров —
+# (всего, количества по цветам, номер целевого цвета), для комбинаторных — числа условия;
+# None — условие не разобрано
+PARSERS = {
+    "exam_tickets": _parse_exam_tickets,
+    "tv_channels": _parse_tv_channels,
+    "lottery": _parse_share(LOTTERY_RE),
+    "objects_selection": _parse_share(OBJECTS_RE),
+    "colored_balls": _parse_colored_balls,
+    # (всего, белых, вынимают, ровно белых)
+    "without_replacement": _parse_ints(WITHOUT_REPLACEMENT_RE),
+    # (всего, бракованных, берут)
+    "at_least_one": _parse_ints(AT_LEAST_ONE_RE),
+    # (вероятность в десятых, испытаний, ровно успехов)
+    "repeated_trials": _parse_ints(REPEATED_TRIALS_RE),
+    # (бросков, ровно орлов)
+    "coin_tosses": _parse_ints(COIN_TOSSES_RE),
+    # (бросков кубика, сумма)
+    "dice_sum": _parse_ints(DICE_SUM_RE),
+}
+
+
+def _simulate_part(rng: np.random.Generator, parsed: List, draws: int) -> np.ndarray:
+    """Частоты события «исход среди первых part из total» (или вне их, если complement)"""
+    total = np.array([p[0] for p in parsed], dtype=np.int64)
+    part = np.array([p[1] for p in parsed], dtype=np.int64)
+    complement = np.array([p[2] for p in parsed], dtype=bool)
+
+    outcome = rng.integers(0, total[:, None], size=(len(parsed), draws))
+    hits = (outcome < part[:, None]).sum(axis=1)
+    return np.where(complement, draws - hits, hits) / draws
+
+
+def _simulate_colored_balls(rng: np.random.Generator, parsed: List, draws: int) -> np.ndarray:
+    """Частоты вытаскивания шара целевого цвета: шар -> цвет по накопленным количествам"""
+    total = np.array([p[0] for p in parsed], dtype=np.int64)
+    bounds = np.cumsum(np.array([p[1] for p in parsed], dtype=np.int64), axis=1)
+    target = np.array([p[2] for p in parsed], dtype=np.int64)
+
+    ball = rng.integers(0, total[:, None], size=(len(parsed), draws))
+    color = (ball[:, :, None] >= bounds[:, None, :]).sum(axis=2)
+    return (color == target[:, None]).sum(axis=1) / draws
+
+
+def _columns(parsed: List):
+    return np.array(parsed, dtype=np.int64).T[:, :, None]
+
+
+def _simulate_without_replacement(rng: np.random.Generator, parsed: List, draws: int) -> np.ndarray:
+    """Вынимаем шары без возвращения: число белых среди вынутых — гипергеометрический розыгрыш"""
+    total, marked, taken, hits = _columns(parsed)
+    white = rng.hypergeometric(marked, total - marked, taken, size=(len(parsed), draws))
+    return (white == hits).sum(axis=1) / draws
+
+
+def _simulate_at_least_one(rng: np.random.Generator, parsed: List, draws: int) -> np.ndarray:
+    total, defective, taken = _columns(parsed)
+    found = rng.hypergeometric(defective, total - defective, taken, size=(len(parsed), draws))
+    return (found >= 1).sum(axis=1) / draws
+
+
+def _simulate_repeated_trials(rng: np.random.Generator, parsed: List, draws: int) -> np.ndarray:
+    """Серия из trials независимых выстрелов: число попаданий — биномиальный розыгрыш"""
+    p, trials, successes = _columns(parsed)
+    hits = rng.binomial(trials, p / 10, size=(len(parsed), draws))
+    return (hits == successes).sum(axis=1) / draws
+
+
+def _simulate_coin_tosses(rng: np.random.Generator, parsed: List, draws: int) -> np.ndarray:
+    tosses, heads = _columns(parsed)
+    return (rng.binomial(tosses, 0.5, size=(len(parsed), draws)) == heads).sum(axis=1) / draws
+
+
+def _simulate_dice_sum(rng: np.random.Generator, parsed: List, draws: int) -> np.ndarray:
+    """Бросаем max(dice) кубиков и суммируем первые dice (число бросков у задач разное)"""
+    dice, target = _columns(parsed)
+    width = int(dice.max())
+    rolls = rng.integers(1, 7, size=(len(parsed), draws, width))
+    total = (rolls * (np.arange(width) < dice[:, :, None])).sum(axis=2)
+    return (total == target).sum(axis=1) / draws
+
+
+SIMULATORS = {
+    "exam_tickets": _simulate_part,
+    "tv_channels": _simulate_part,
+    "lottery": _simulate_part,
+    "objects_selection": _simulate_part,
+    "colored_balls": _simulate_colored_balls,
+    "without_replacement": _simulate_without_replacement,
+    "at_least_one": _simulate_at_least_one,
+    "repeated_trials": _simulate_repeated_trials,
+    "coin_tosses": _simulate_coin_tosses,
+    "dice_sum": _simulate_dice_sum,
+}
+
+
+def verify_tasks(tasks: Iterable[Dict], draws: int = 20_000, z: float = 5.0, seed: int = None,
+                 cells: int = 4_000_000) -> Dict:
+    """
+    Проверяет ответы задач симуляцией
+
+    Args:
+        tasks: Задачи в формате генератора (нужны type, condition, answer; id — для отчета)
+        draws: Розыгрышей на задачу
+        z: Допуск в стандартных ошибках биномиальной частоты
+        seed: Seed симуляции
+        cells: Сколько розыгрышей держать в памяти за раз (задач в блоке = cells // draws)
+
+    Returns:
+        Отчет: по типам (задач, максимум |z|) и список несовпадений
+    """
+    rng = np.random.default_rng(seed)
+    groups = {task_type: [] for task_type in PARSERS}
+    failures = []
+    for position, task in enumerate(tasks):
+        task_id = task.get("id", position + 1)
+        parser = PARSERS.get(task["type"])
+        parsed = parser(task["condition"]) if parser else None
+        if parsed is None:
+            failures.append({"id": task_id, "type": task["type"], "reason": "условие не разобрано"})
+            continue
+        groups[task["type"]].append((task_id, parsed, float(task["answer"])))
+
+    report = {}
+    block = max(1, cells // draws)
+    for task_type, items in groups.items():
+        if not items:
+            continue
+        max_z = 0.0
+        for begin in range(0, len(items), block):
+            chunk = items[begin:begin + block]
+            frequency = SIMULATORS[task_type](rng, [item[1] for item in chunk], draws)
+            answer = np.array([item[2] for item in chunk])
+            # Стандартная ошибка частоты; + 0.5/draws — поправка на дискретность
+            p = np.clip(answer, 0.0, 1.0)
+            error = np.sqrt(p * (1 - p) / draws) + 0.5 / draws
+            deviation = np.abs(frequency - answer) / error
+            max_z = max(max_z, float(deviation.max()))
+            for j in np.flatnonzero(deviation > z):
+                failures.append({
+                    "id": chunk[j][0], "type": task_type, "reason": "частота не совпадает с ответом",
+                    "answer": chunk[j][2], "frequency": float(frequency[j]), "z": float(deviation[j]),
+                })
+        report[task_type] = {"tasks": len(items), "max_z": max_z}
+
+    return {"draws": draws, "z": z, "types": report, "failures": failures}
+
+
+def _read_jsonl(path: str) -> Iterable[Dict]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка ответов задач методом Монте-Карло")
+    parser.add_argument('--input', default=None, help="JSONL-выгрузка (по умолчанию — сгенерировать задачи)")
+    parser.add_argument('--count', type=int, default=10_000, help="Сколько задач сгенерировать")
+    parser.add_argument('--difficulty', default='all', choices=['easy', 'medium', 'hard', 'all'])
+    parser.add_argument('--task-type', default=None, help="Тип задачи (по умолчанию — микс)")
+    parser.add_argument('--seed', type=int, default=None, help="Seed генератора и симуляции")
+    parser.add_argument('--draws', type=int, default=20_000, help="Розыгрышей на задачу")
+    parser.add_argument('--z', type=float, default=5.0, help="Допуск в стандартных ошибках")
+    args = parser.parse_args()
+
+    if args.input:
+        tasks = list(_read_jsonl(args.input))
+    else:
+        generator = ProbabilityTaskGenerator(args.seed)
+        difficulties = ['easy', 'medium', 'hard'] if args.difficulty == 'all' else [args.difficulty]
+        tasks = []
+        for difficulty in difficulties:
+            count = args.count // len(difficulties)
+            tasks.extend(generator.iter_tasks(count, args.task_type, difficulty))
+
+    started = time.perf_counter()
+    result = verify_tasks(tasks, draws=args.draws, z=args.z, seed=args.seed)
+    elapsed = time.perf_counter() - started
+
+    print("=" * 80)
+    print(f"Проверено задач: {len(tasks):,}, розыгрышей: {len(tasks) * args.draws:,}, {elapsed:.1f} с")
+    print(f"{'Тип':<20}{'Задач':>10}{'max |z|':>10}")
+    for task_type, stats in result["types"].items():
+        print(f"{task_type:<20}{stats['tasks']:>10,}{stats['max_z']:>10.2f}")
+    print("=" * 80)
+
+    if result["failures"]:
+        print(f"Несовпадений: {len(result['failures'])} (допуск {args.z} σ)")
+        for failure in result["failures"][:20]:
+            print(f"   #{failure['id']} {failure['type']}: {failure['reason']}"
+                  + (f" (ответ {failure['answer']:.4f}, частота {failure['frequency']:.4f})" if "answer" in failure else ""))
+        sys.exit(1)
+    print("✅ Все ответы согласуются с условиями")
+
+
+if __name__ == "__main__":
+    main()
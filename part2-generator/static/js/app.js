@@ -100,7 +100,12 @@ document.addEventListener('DOMContentLoaded', function() {
             'tv_channels': 'bi-tv',
             'lottery': 'bi-ticket-perforated',
             'objects_selection': 'bi-boxes',
-            'colored_balls': 'bi-circle-fill'
+            'colored_balls': 'bi-circle-fill',
+            'without_replacement': 'bi-basket',
+            'at_least_one': 'bi-exclamation-triangle',
+            'repeated_trials': 'bi-bullseye',
+            'coin_tosses': 'bi-coin',
+            'dice_sum': 'bi-dice-5'
         };
 
         const icon = typeIcons[task.type] || 'bi-question-circle';
@@ -111,10 +116,15 @@ document.addEventListener('DOMContentLoaded', function() {
             'tv_channels': 'Телеканалы',
             'lottery': 'Лотерея',
             'objects_selection': 'Выбор объектов',
-            'colored_balls': 'Цветные шары'
+            'colored_balls': 'Цветные шары',
+            'without_replacement': 'Выбор без возвращения',
+            'at_least_one': 'Хотя бы один',
+            'repeated_trials': 'Повторные испытания'
         };
 
-        const typeName = typeNames[task.type] || 'Другое';
+        // Типы из спецификаций — по названию в списке выбора
+        const typeOption = document.querySelector(`#taskType option[value="${task.type}"]`);
+        const typeName = typeNames[task.type] || (typeOption ? typeOption.textContent : 'Другое');
 
         // Сложность
         const difficultyBadges = {